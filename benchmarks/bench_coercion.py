@@ -0,0 +1,71 @@
+"""Compare the old per-column coercion loop with the schema-driven pass.
+
+Run from the repo root:  python benchmarks/bench_coercion.py [rows]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portfolio.schema import CLOSED_SCHEMA, coerce_frame  # noqa: E402
+
+
+def raw_closed_positions(rows, seed=0):
+    """Closed positions as they arrive from get_all_records()"""
+    rng = np.random.default_rng(seed)
+    bought = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3000, rows), unit='D')
+    held = rng.integers(1, 900, rows)
+    invested = rng.integers(1_000, 500_000, rows).astype(float)
+    pl = np.round(invested * rng.normal(0.05, 0.2, rows), 2)
+    return pd.DataFrame({
+        'Stock Name': rng.choice([f'STOCK{i}' for i in range(500)], rows),
+        'Industry': rng.choice(['Technology', 'Banking', 'Pharma', 'FMCG', 'Energy', 'Automotive'], rows),
+        'Buying Date': bought.strftime('%Y-%m-%d'),
+        'Selling Date': (bought + pd.to_timedelta(held, unit='D')).strftime('%Y-%m-%d'),
+        'Investment Amount': invested,
+        'Selling Value': invested + pl,
+        'Profit/Loss Booked': pl,
+        'Growth(%)': np.round(pl / invested * 100, 2),
+        'Investment Days': held,
+        'Reason for selling': rng.choice(['Profit booking', 'Target achieved', 'Stop loss', ''], rows),
+        'Possible Profit/Loss': np.round(pl * 1.1, 2),
+    }).astype(object)
+
+
+def legacy_coerce(df):
+    date_cols = ['Buying Date', 'Selling Date']
+    num_cols = ['Buying Price', 'Investment Amount', 'Profit/Loss', 'Growth(%)',
+                'Selling Value', 'Profit/Loss Booked', 'Investment Days']
+    for col in date_cols:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in num_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+def measure(fn, raw, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        df = raw.copy()
+        start = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best, out.memory_usage(deep=True).sum()
+
+
+def main(rows=100_000):
+    raw = raw_closed_positions(rows)
+    print(f'{rows:,} closed positions, raw frame {raw.memory_usage(deep=True).sum() / 1e6:.1f} MB')
+    for label, fn in (('legacy loop', legacy_coerce), ('schema pass', lambda df: coerce_frame(df, CLOSED_SCHEMA))):
+        seconds, memory = measure(fn, raw)
+        print(f'{label:<12} {seconds * 1000:8.1f} ms  {memory / 1e6:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
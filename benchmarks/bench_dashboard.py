@@ -0,0 +1,194 @@
+"""Time the dashboard pipeline on synthetic portfolios of growing size.
+
+Every size runs the stages the app runs on a cold load: schema coercion and
+headline metrics (process_data), empty-column pruning for the tables
+(clean_and_format_dataframe minus its Streamlit column config), the Analytics
+aggregations, quarterly sector attribution against a synthetic benchmark, and
+building plus serializing every chart. Each stage reports
+its best wall time and its peak traced memory; the results are written as
+JSON so two commits can be compared.
+
+Run from the repo root:
+    python benchmarks/bench_dashboard.py                         # 1k/10k/100k/1M rows
+    python benchmarks/bench_dashboard.py --rows 1000 10000 -o before.json
+    python benchmarks/bench_dashboard.py --rows 1000 10000 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_coercion import raw_closed_positions  # noqa: E402
+from portfolio import charts  # noqa: E402
+from portfolio.attribution import brinson  # noqa: E402
+from portfolio.engine import compute_aggregates, process_data  # noqa: E402
+from portfolio.tables import prune_empty_columns  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def raw_open_positions(rows, seed=0):
+    """Open positions as they arrive from get_all_records()"""
+    rng = np.random.default_rng(seed)
+    bought = pd.Timestamp('2018-01-01') + pd.to_timedelta(rng.integers(0, 2500, rows), unit='D')
+    buying_price = np.round(rng.uniform(10, 5000, rows), 2)
+    shares = rng.integers(1, 500, rows)
+    invested = np.round(buying_price * shares, 2)
+    current_price = np.round(buying_price * rng.lognormal(0.05, 0.3, rows), 2)
+    pl = np.round((current_price - buying_price) * shares, 2)
+    return pd.DataFrame({
+        'Stock Name': rng.choice([f'STOCK{i}' for i in range(500)], rows),
+        'Industry': rng.choice(['Technology', 'Banking', 'Pharma', 'FMCG', 'Energy', 'Automotive'], rows),
+        'Buying Date': bought.strftime('%Y-%m-%d'),
+        'Buying Price': buying_price,
+        'Current Share Price': current_price,
+        'Investment Amount': invested,
+        'Profit/Loss': pl,
+        'Growth(%)': np.round(pl / invested * 100, 2),
+        'Investment Days': (pd.Timestamp('2026-01-01') - bought).days,
+    }).astype(object)
+
+
+def synthetic_portfolio(rows, seed=0):
+    """(open_df, closed_df) in the worksheet schema, rows of each, reproducible from the seed"""
+    return raw_open_positions(rows, seed), raw_closed_positions(rows, seed + 1)
+
+
+def synthetic_benchmark(industries, seed=0, start='2017-01-01', end='2026-12-31'):
+    """Daily sector index levels and weights in the benchmark file layout"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, end)
+    levels = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, (len(dates), len(industries))), axis=0))
+    return pd.DataFrame({
+        'Date': np.repeat(dates, len(industries)),
+        'Industry': np.tile(industries, len(dates)),
+        'Close': levels.ravel(),
+        'Weight': np.tile(rng.uniform(1, 10, len(industries)), len(dates)),
+    })
+
+
+def _figures(open_df, closed_df, aggregates):
+    """Build every dashboard chart the data allows"""
+    figures = []
+    if len(open_df):
+        figures += [charts.industry_pie(open_df), charts.pl_bar(open_df),
+                    charts.sector_treemap(aggregates['sector_allocation'])]
+    if len(closed_df):
+        figures += [charts.holding_scatter(closed_df), charts.sector_box(closed_df)]
+    if aggregates['monthly_pl'] is not None:
+        figures.append(charts.monthly_line(aggregates['monthly_pl']))
+    if len(aggregates['equity_curve']) > 1:
+        figures.append(charts.equity_chart(aggregates['equity_curve']))
+    return figures
+
+
+def measure(fn, repeat):
+    """(result, best seconds, peak traced MB); memory is traced on a separate run"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    # tracemalloc slows Python-heavy code down, so it never overlaps the timed runs
+    del result
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, best, peak / 1e6
+
+
+def run_size(rows, seed=0, repeat=3):
+    """Stage timings for one portfolio size"""
+    raw_open, raw_closed = synthetic_portfolio(rows, seed)
+    stages = {}
+
+    def stage(name, fn, **extra):
+        result, seconds, peak = measure(fn, repeat)
+        stages[name] = {'seconds': round(seconds, 6), 'peak_mb': round(peak, 3), **extra}
+        print(f"{rows:>10,}  {name:<16} {seconds * 1000:10.1f} ms  {peak:9.1f} MB", file=sys.stderr)
+        return result
+
+    open_df, closed_df, _ = stage('process_data', lambda: process_data(raw_open, raw_closed))
+    stage('clean_and_format', lambda: (prune_empty_columns(open_df), prune_empty_columns(closed_df)))
+    aggregates = stage('aggregates', lambda: compute_aggregates(open_df, closed_df))
+    industries = sorted(set(open_df['Industry'].astype(str)) | set(closed_df['Industry'].astype(str)))
+    benchmark = synthetic_benchmark(industries, seed)
+    stage('attribution', lambda: brinson(open_df, closed_df, benchmark, 'Q'))
+    figures = stage('figures', lambda: _figures(open_df, closed_df, aggregates))
+    payload = stage('figures_json', lambda: [fig.to_json() for fig in figures])
+    stages['figures_json']['bytes'] = sum(len(text) for text in payload)
+    return {
+        'rows': rows,
+        'raw_mb': round((raw_open.memory_usage(deep=True).sum() + raw_closed.memory_usage(deep=True).sum()) / 1e6, 3),
+        'typed_mb': round((open_df.memory_usage(deep=True).sum() + closed_df.memory_usage(deep=True).sum()) / 1e6, 3),
+        'stages': stages,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Print each stage's time against a previous results file"""
+    before = {(size['rows'], name): stage['seconds']
+              for size in baseline['sizes'] for name, stage in size['stages'].items()}
+    print(f"{'rows':>10}  {'stage':<16} {'before':>10} {'after':>10} {'change':>8}")
+    for size in results['sizes']:
+        for name, stage in size['stages'].items():
+            old = before.get((size['rows'], name))
+            if old is None:
+                continue
+            change = (stage['seconds'] / old - 1) * 100 if old else 0.0
+            print(f"{size['rows']:>10,}  {name:<16} {old * 1000:8.1f}ms {stage['seconds'] * 1000:8.1f}ms {change:+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=SIZES, help='open and closed rows per run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage (best is kept)')
+    parser.add_argument('-o', '--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--compare', metavar='JSON', help='print the change against an earlier results file')
+    args = parser.parse_args(argv)
+
+    results = {
+        'commit': _commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'sizes': [run_size(rows, args.seed, args.repeat) for rows in args.rows],
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    elif not args.compare:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Replay a synthetic transaction ledger under every cost basis method.
+
+Run from the repo root:  python benchmarks/bench_ledger.py [transactions]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portfolio.ledger import METHODS, Ledger  # noqa: E402
+
+
+def synthetic_transactions(rows, tickers=2000, seed=0):
+    """Buys and partial sells that never sell more than is held"""
+    rng = np.random.default_rng(seed)
+    symbol = rng.integers(0, tickers, rows)
+    day = pd.Timestamp('2010-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 5000, rows)), unit='D')
+    quantity = rng.integers(1, 100, rows).astype(float)
+    sell = rng.random(rows) < 0.4
+
+    # Clip every sell to what the ticker holds at that point
+    frame = pd.DataFrame({'symbol': symbol, 'quantity': quantity, 'sell': sell})
+    held = frame['quantity'].where(~frame['sell'], 0).groupby(frame['symbol']).cumsum()
+    sold = frame['quantity'].where(frame['sell'], 0).groupby(frame['symbol']).cumsum()
+    over = frame['sell'] & (sold > held)
+    frame.loc[over, 'sell'] = False
+
+    return pd.DataFrame({
+        'Date': day,
+        'Stock Name': np.char.add('STOCK', symbol.astype(str)),
+        'Side': np.where(frame['sell'], 'Sell', 'Buy'),
+        'Quantity': quantity,
+        'Price': np.round(rng.uniform(10, 5000, rows), 2),
+        'Fees': np.round(rng.uniform(0, 20, rows), 2),
+    })
+
+
+def main(rows=1_000_000):
+    transactions = synthetic_transactions(rows)
+    print(f"{rows:,} transactions, {int((transactions['Side'] == 'Sell').sum()):,} sells")
+    for method in METHODS:
+        start = time.perf_counter()
+        ledger = Ledger(transactions, method)
+        replayed = time.perf_counter()
+        open_df, closed_df = ledger.frames()
+        done = time.perf_counter()
+        check = ledger.reconcile()
+        print(f"{method:8} replay {replayed - start:6.2f}s  frames {done - replayed:5.2f}s  "
+              f"open {len(open_df):>9,}  closed {len(closed_df):>9,}  "
+              f"unreconciled {abs(check['cost_difference']) + abs(check['realized_difference']):.6f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,231 @@
+"""Simulate many concurrent dashboard sessions and report latency and memory.
+
+A seeded synthetic portfolio is written to a temporary SQLite database and
+configured as the only account, then the dashboard is started as a real,
+headless Streamlit server. Each simulated viewer opens its own websocket
+session and asks for script runs the way a browser does, so every session
+goes through the server's shared caches exactly as browser tabs would. The
+first run and every later rerun of each session are timed, and the server's
+resident memory is sampled before the sessions connect and once they have all
+finished (while still connected), so the growth divided by the number of
+sessions is what each extra viewer costs. Memory is read from /proc, so RSS is
+only reported on Linux.
+
+Run from the repo root:
+    python benchmarks/load_test.py                               # 1/10/25 sessions, 100k rows
+    python benchmarks/load_test.py --sessions 1 10 50 --rows 1000000 -o after.json
+    python benchmarks/load_test.py --app /path/to/other/checkout/dashboard.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.asyncio.client import connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_dashboard import synthetic_portfolio  # noqa: E402
+from portfolio.engine import process_data  # noqa: E402
+from portfolio.sqlite_store import SQLiteStore  # noqa: E402
+
+SESSIONS = [1, 10, 25]
+ACCOUNT = 'Load test'
+SECRETS = '''[[portfolios]]
+name = "{name}"
+source = "sqlite"
+path = "{path}"
+
+# No background polling: only the simulated viewers should be doing work
+[refresh]
+interval = 0
+'''
+
+
+def rss_mb(pid):
+    """Resident set size of a process, None where /proc is not available"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def write_database(path, rows, seed):
+    open_df, closed_df, _ = process_data(*synthetic_portfolio(rows, seed))
+    SQLiteStore(path).write(open_df, closed_df)
+
+
+def start_server(app, port, secrets, timeout=120):
+    """A headless Streamlit server for app; returns the process once it answers health checks"""
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', app, '--server.headless', 'true', '--server.port', str(port),
+         '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false', '--logger.level', 'error',
+         '--secrets.files', secrets],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'streamlit exited with code {server.returncode}')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError(f'streamlit did not start within {timeout}s')
+
+
+class Session:
+    """One browser tab: a websocket session that requests script runs"""
+
+    def __init__(self, port):
+        self.url = f'ws://127.0.0.1:{port}/_stcore/stream'
+        self.websocket = None
+        self.timings = []
+        self.errors = []
+
+    async def open(self):
+        self.websocket = await connect(self.url, subprotocols=['streamlit'], max_size=None)
+
+    async def run(self):
+        """Request a full script run and wait until the server reports it finished"""
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.page_script_hash = ''
+        start = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.websocket.recv())
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                if forward.delta.new_element.WhichOneof('type') == 'exception':
+                    self.errors.append(forward.delta.new_element.exception.message)
+            elif kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.errors.append('compile error')
+                break
+        self.timings.append(time.perf_counter() - start)
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+
+
+def _percentiles(values):
+    if not len(values):
+        return None
+    return {'p50': round(float(np.percentile(values, 50)), 1), 'p95': round(float(np.percentile(values, 95)), 1)}
+
+
+async def run_sessions(port, pid, count, reruns):
+    """Latency and memory for count sessions running at the same time"""
+    before = rss_mb(pid)
+    sessions = [Session(port) for _ in range(count)]
+    await asyncio.gather(*(session.open() for session in sessions))
+
+    async def viewer(session):
+        for _ in range(reruns + 1):
+            await session.run()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(viewer(session) for session in sessions))
+    elapsed = time.perf_counter() - start
+    after = rss_mb(pid)
+    await asyncio.gather(*(session.close() for session in sessions))
+
+    return {
+        'sessions': count,
+        'wall_seconds': round(elapsed, 3),
+        'first_run_ms': _percentiles(np.array([session.timings[0] for session in sessions]) * 1000),
+        'rerun_ms': _percentiles(np.array([t for session in sessions for t in session.timings[1:]]) * 1000),
+        'rss_before_mb': None if before is None else round(before, 1),
+        'rss_after_mb': None if after is None else round(after, 1),
+        'rss_per_session_mb': None if before is None or after is None else round((after - before) / count, 2),
+        'errors': sorted({error for session in sessions for error in session.errors}),
+    }
+
+
+async def load_test(port, pid, counts, reruns):
+    # A warm-up session fills the process-wide caches, as the first viewer of a deployment would
+    warmup = Session(port)
+    await warmup.open()
+    await warmup.run()
+    await warmup.close()
+
+    rounds = []
+    for count in counts:
+        result = await run_sessions(port, pid, count, reruns)
+        first, rerun = result['first_run_ms'], result['rerun_ms'] or {'p50': float('nan'), 'p95': float('nan')}
+        rss = 'n/a' if result['rss_after_mb'] is None else \
+            f"{result['rss_after_mb']:8.1f} MB  (+{result['rss_per_session_mb']:.2f} MB/session)"
+        print(f"{count:>4} sessions  first p50 {first['p50']:8.1f} ms  rerun p50 {rerun['p50']:8.1f} ms  "
+              f"p95 {rerun['p95']:8.1f} ms  RSS {rss}", file=sys.stderr)
+        rounds.append(result)
+    return rounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=SESSIONS, help='concurrent sessions per round')
+    parser.add_argument('--rows', type=int, default=100_000, help='open and closed positions in the portfolio')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reruns', type=int, default=5, help='reruns per session after the first run')
+    parser.add_argument('--app', default=os.path.join(ROOT, 'dashboard.py'), help='dashboard script to serve')
+    parser.add_argument('-o', '--output', help='write the JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    app = os.path.abspath(args.app)
+    workdir = tempfile.mkdtemp(prefix='portfolio-load-')
+    database = os.path.join(workdir, 'portfolio.db')
+    secrets = os.path.join(workdir, 'secrets.toml')
+    snapshots = os.path.join(os.path.dirname(app), '.snapshots', 'load_test')
+    server = None
+    try:
+        write_database(database, args.rows, args.seed)
+        with open(secrets, 'w') as f:
+            f.write(SECRETS.format(name=ACCOUNT, path=database))
+        port = free_port()
+        server = start_server(app, port, secrets)
+        rounds = asyncio.run(load_test(port, server.pid, args.sessions, args.reruns))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+        shutil.rmtree(snapshots, ignore_errors=True)
+
+    text = json.dumps({'rows': args.rows, 'seed': args.seed, 'reruns': args.reruns, 'app': app, 'rounds': rounds},
+                      indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,37 @@
+import os
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import gspread
-from google.oauth2.service_account import Credentials
-from datetime import datetime, date
+import pyarrow as pa
+from datetime import datetime
+
+from portfolio.accounts import AccountLoader, parse_accounts
+from portfolio.aggregates import AggregateCache
+from portfolio.attribution import DEFAULT_PERIOD, PERIODS, Benchmark, attribution_summary, brinson, industry_totals
+from portfolio.charts import SCATTER_POINT_BUDGET, FigureCache, trades_in_bins
+from portfolio.engine import account_breakdown, compute_metrics, sample_portfolio
+from portfolio.filters import PortfolioIndex, filter_key
+from portfolio.prices import PriceStore
+from portfolio.pricing import DEFAULT_TTL, MarkToMarket, QuoteCache, provider_from_config
+from portfolio.report import REPORT_FORMATS, ReportBuilder
+from portfolio.scheduler import DEFAULT_INTERVAL, RefreshScheduler
+from portfolio.shared import SharedData
+from portfolio.sources import Filters, SourceNotConfigured
+from portfolio.tables import TablePager, prune_empty_columns
+from portfolio.telemetry import Registry, Run
+
+try:
+    # The parts st.plotly_chart is made of, so a figure serialized once is sent as is on later reruns
+    from streamlit.elements.lib.form_utils import current_form_id
+    from streamlit.elements.lib.layout_utils import LayoutConfig
+    from streamlit.elements.lib.utils import compute_and_register_element_id
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+except ImportError:
+    PlotlyChartProto = None
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots")
+PRICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".prices")
+BENCHMARK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark.csv")
 
 # Set page config with modern theme
 st.set_page_config(
@@ -157,129 +185,360 @@ def create_metric_card(title, value, delta=None, delta_color="normal"):
     """, unsafe_allow_html=True)
 
 # Function to clean and format dataframe
-def clean_and_format_dataframe(df, format_config=None):
-    """Clean dataframe and apply formatting"""
-    if df.empty:
-        return df
-    
-    # Remove completely empty columns
-    df_clean = df.dropna(axis=1, how='all')
-    
-    # Remove columns that are all zeros or empty strings
-    for col in df_clean.columns:
-        if df_clean[col].dtype == 'object':
-            if df_clean[col].str.strip().eq('').all() or df_clean[col].isna().all():
-                df_clean = df_clean.drop(columns=[col])
-        elif df_clean[col].dtype in ['int64', 'float64']:
-            if df_clean[col].eq(0).all() and col not in ['Profit/Loss', 'Growth(%)']:
-                df_clean = df_clean.drop(columns=[col])
-    
-    # Apply formatting if provided
-    if format_config:
-        display_df = df_clean.copy()
-        for col, formatter in format_config.items():
-            if col in display_df.columns:
-                if 'currency' in formatter:
-                    display_df[col] = display_df[col].apply(lambda x: f'₹{x:,.2f}' if pd.notna(x) else 'N/A')
-                elif 'percentage' in formatter:
-                    display_df[col] = display_df[col].apply(lambda x: f'{x:.2f}%' if pd.notna(x) else 'N/A')
-        return display_df
-    
-    return df_clean
+NUMBER_FORMATS = {
+    'currency': '₹%,.2f',
+    'percentage': '%.2f%%'
+}
+
+@st.cache_resource(max_entries=8)
+def get_pruned_frame(key, version, _df):
+    return prune_empty_columns(_df)
+
+def clean_and_format_dataframe(df, format_config=None, key=None, version=None):
+    """Drop empty columns and build render-time number formats for the rest"""
+    with telemetry.span("format"):
+        # With a data version the pruned table is built once and shared by every session
+        df_clean = get_pruned_frame(key, version, df).copy(deep=False) if version else prune_empty_columns(df)
+        
+        # Values stay numeric so st.dataframe can still sort them; formatting happens in the browser
+        column_config = {}
+        for col, formatter in (format_config or {}).items():
+            if col in df_clean.columns:
+                for kind, number_format in NUMBER_FORMATS.items():
+                    if kind in formatter:
+                        column_config[col] = st.column_config.NumberColumn(col, format=number_format)
+                        break
+    
+    return df_clean, column_config
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+def chart(name, version, data, **options):
+    """Serve a serialized figure from the cache, building it only when its data changed"""
+    with telemetry.span(f"build:{name}"):
+        fig = get_figure_cache().get(name, version, data, **options)
+    telemetry.payload(f"chart:{name}", lambda: len(fig.json))
+    return fig
+
+def send_chart(fig):
+    """st.plotly_chart for a SerializedFigure; st.plotly_chart itself would serialize the figure again"""
+    if PlotlyChartProto is None:
+        st.plotly_chart(fig.figure(), width="stretch")
+        return
+    proto = PlotlyChartProto(spec=fig.json, config="{}", theme="streamlit", form_id=current_form_id(st._main))
+    proto.id = compute_and_register_element_id(
+        "plotly_chart", user_key=None, key_as_main_identity=False, dg=st._main, plotly_spec=proto.spec,
+        plotly_config=proto.config, selection_mode=("points", "box", "lasso"), is_selection_activated=False,
+        theme="streamlit", width="stretch", height="content", alt=None)
+    st._main._enqueue("plotly_chart", proto, layout_config=LayoutConfig(width="stretch", height=fig.height or 450))
+
+def show_chart(name, version, data, **options):
+    """Build (or reuse) a chart and send it to the browser"""
+    fig = chart(name, version, data, **options)
+    with telemetry.span(f"send:{name}"):
+        send_chart(fig)
+
+# Tables above this size are paged on the server instead of sent whole
+PAGINATE_ABOVE = 1000
+PAGE_SIZES = [25, 50, 100, 250]
+
+@st.cache_resource(max_entries=4)
+def get_table_pager(key, version, _df):
+    return TablePager(_df)
+
+def render_table(key, version, df, column_config, height=400):
+    """Render a table, paging it server-side once it gets large"""
+    if len(df) <= PAGINATE_ABOVE:
+        with telemetry.span(f"send:{key}"):
+            st.dataframe(df, column_config=column_config, width="stretch", height=height)
+        telemetry.payload(f"table:{key}", lambda: pa.Table.from_pandas(df, preserve_index=False).nbytes)
+        return
+    
+    pager = get_table_pager(key, version, df)
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    with col1:
+        query = st.text_input("🔍 Search", key=f"{key}_query", placeholder="Stock, industry, reason...")
+    with col2:
+        sort_by = st.selectbox("Sort by", [None, *df.columns], key=f"{key}_sort",
+                               format_func=lambda col: "Sheet order" if col is None else col)
+    with col3:
+        direction = st.selectbox("Order", ["Ascending", "Descending"], key=f"{key}_direction")
+    with col4:
+        page_size = st.selectbox("Rows", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    
+    mask = pager.mask(query)
+    matching = len(pager) if mask is None else int(mask.sum())
+    pages = max(1, -(-matching // page_size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    
+    page = st.number_input("Page", min_value=1, max_value=pages, key=f"{key}_page")
+    page_df, matching = pager.page(page - 1, page_size, sort_by, direction == "Ascending", query)
+    
+    with telemetry.span(f"send:{key}"):
+        st.dataframe(page_df, column_config=column_config, width="stretch", height=height)
+    telemetry.payload(f"table:{key}", lambda: pa.Table.from_pandas(page_df, preserve_index=False).nbytes)
+    first = (page - 1) * page_size + 1 if matching else 0
+    st.caption(f"Rows {first:,}–{first + len(page_df) - 1 if matching else 0:,} of {matching:,} (page {page} of {pages})")
 
 # Google Sheets API setup
-@st.cache_data(ttl=600)
-def load_data():
+# Accounts still loading after this many seconds are left out of this run
+ACCOUNT_LOAD_TIMEOUT = 8
+
+def read_secret(name):
     try:
-        scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-        creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scopes)
-        gc = gspread.authorize(creds)
-        
-        sh = gc.open("My Stock Portfolio")
-        open_pos = pd.DataFrame(sh.worksheet("Open Positions").get_all_records())
-        closed_pos = pd.DataFrame(sh.worksheet("Closed Positions").get_all_records())
-        
-        return open_pos, closed_pos
-    except Exception as e:
-        st.error(f"Data loading error: {str(e)}")
-        # Return sample data for demonstration
-        st.warning("Using sample data for demonstration")
-        
-        sample_open = pd.DataFrame({
-            'Stock Name': ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN'],
-            'Industry': ['Technology', 'Technology', 'Technology', 'Automotive', 'E-commerce'],
-            'Buying Date': ['2023-01-15', '2023-02-20', '2023-03-10', '2023-04-05', '2023-05-12'],
-            'Buying Price': [150.00, 2500.00, 250.00, 200.00, 3000.00],
-            'Investment Amount': [15000, 25000, 12500, 10000, 30000],
-            'Profit/Loss': [2500, -1500, 1800, -800, 2200],
-            'Growth(%)': [16.67, -6.00, 14.40, -8.00, 7.33],
-            'Investment Days': [365, 320, 280, 240, 200]
-        })
-        
-        sample_closed = pd.DataFrame({
-            'Stock Name': ['META', 'NVDA', 'NFLX'],
-            'Industry': ['Technology', 'Technology', 'Entertainment'],
-            'Buying Date': ['2022-01-10', '2022-03-15', '2022-06-20'],
-            'Selling Date': ['2023-01-10', '2023-03-15', '2023-06-20'],
-            'Investment Amount': [20000, 15000, 8000],
-            'Selling Value': [22000, 18000, 7200],
-            'Profit/Loss Booked': [2000, 3000, -800],
-            'Growth(%)': [10.00, 20.00, -10.00],
-            'Investment Days': [365, 365, 365],
-            'Reason for selling': ['Profit booking', 'Target achieved', 'Stop loss'],
-            'Possible Profit/Loss': [2500, 3500, -600]
-        })
-        
-        return sample_open, sample_closed
-
-# Data processing
-def days_until_today(year, month, day):
-    """
-    Calculates the number of days between a specific date and today's date.
-    """
-    # Create a date object for the specific past date
-    x_date = date(year, month, day)
-
-    # Get today's date
-    today = date.today()
-
-    # Calculate the difference (returns a timedelta object)
-    delta = today - x_date
-
-    # Return the number of days
-    return delta.days
-
-def process_data(open_df, closed_df):
-    # Convert dates and numeric columns
-    date_cols = ['Buying Date', 'Selling Date']
-    num_cols = ['Buying Price', 'Investment Amount', 'Profit/Loss', 'Growth(%)', 
-               'Selling Value', 'Profit/Loss Booked', 'Investment Days']
-    
-    for df in [open_df, closed_df]:
-        for col in date_cols:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
-        for col in num_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
-    # Calculate metrics
-    metrics = {
-        'open_invested': open_df['Investment Amount'].sum(),
-        'open_pl': open_df['Profit/Loss'].sum(),
-        'closed_invested': closed_df['Investment Amount'].sum(),
-        'closed_pl': closed_df['Profit/Loss Booked'].sum() if 'Profit/Loss Booked' in closed_df.columns else 0,
-        'possible_pl': closed_df['Possible Profit/Loss'].sum() if 'Possible Profit/Loss' in closed_df.columns else 0,
-        'total_days': days_until_today(2023, 12, 20)
-    }
+        return st.secrets.get(name)
+    except Exception:
+        return None
+
+@st.cache_resource
+def get_account_loader():
+    """One pooled Sheets client and snapshot set per process, shared by every account"""
+    service_account = read_secret("gcp_service_account")
+    return AccountLoader(dict(service_account) if service_account else None, SNAPSHOT_DIR)
+
+def get_accounts():
+    """Accounts from a [[portfolios]] list in secrets, or the single default spreadsheet"""
+    return parse_accounts(read_secret("portfolios"))
+
+@st.cache_resource
+def get_refresh_scheduler():
+    """One background poller per process, configured by a [refresh] secret (interval = 0 turns it off)"""
+    config = dict(read_secret("refresh") or {})
+    scheduler = RefreshScheduler(get_account_loader(), get_accounts(), interval=config.get("interval", DEFAULT_INTERVAL))
+    scheduler.start()
+    return scheduler
+
+# Seconds between each session's look at the scheduler's counter; nothing is reloaded unless it moved
+WATCH_EVERY = 5
+
+def watch_for_changes(seen):
+    """Rerun the app once the scheduler has swapped in data newer than this session rendered"""
+    if get_refresh_scheduler().generation != seen:
+        st.rerun()
+
+@st.cache_resource
+def get_aggregate_cache():
+    return AggregateCache()
+
+@st.cache_resource
+def get_price_store():
+    """Memory-mapped price history, filled with python -m portfolio.prices import"""
+    return PriceStore(PRICE_DIR)
+
+@st.cache_resource
+def get_benchmark():
+    """Sector index levels from a [benchmark] secret's path, or benchmark.csv next to the app"""
+    config = dict(read_secret("benchmark") or {})
+    return Benchmark(config.get("path", BENCHMARK_FILE))
+
+@st.cache_resource(max_entries=4)
+def get_attribution(version, benchmark_version, period, _open_df, _closed_df, _benchmark, _prices):
+    """Brinson attribution per period and industry, computed once per data, price and benchmark version"""
+    attribution = brinson(_open_df, _closed_df, _benchmark, period, prices=_prices)
+    return attribution, attribution_summary(attribution), industry_totals(attribution)
+
+@st.cache_resource
+def get_telemetry_registry():
+    """Span, payload and cache totals across every run in this process"""
+    return Registry()
+
+@st.cache_resource
+def get_report_builder():
+    """Background report writers and finished files, shared by every session"""
+    return ReportBuilder()
+
+# Streamlit keeps a download in memory while serving it, so larger reports are only left on disk
+REPORT_DOWNLOAD_LIMIT_MB = 200
+
+def report_status(version, polling=False):
+    """Progress of this session's report, then its download button"""
+    key = st.session_state.get("report_key")
+    # A report of data that has since changed is not offered
+    if key is None or key[1] != version:
+        return
+    state, result = get_report_builder().status(key)
+    if polling and state != "running":
+        # A full rerun registers the fragment again without run_every, so it stops polling
+        st.rerun()
+    if state == "running":
+        st.caption("⏳ Building report...")
+    elif state == "done":
+        label, ext, mime = REPORT_FORMATS[key[0]]
+        size_mb = os.path.getsize(result) / 1024 / 1024
+        if size_mb > REPORT_DOWNLOAD_LIMIT_MB:
+            st.caption(f"📁 The {label} is {size_mb:,.0f} MB, above the {REPORT_DOWNLOAD_LIMIT_MB} MB download "
+                       f"limit, and was left on the server at {result}")
+            return
+
+        def open_report():
+            # Streamlit reads the handle itself, and only once the button is clicked
+            return open(result, "rb")
+
+        st.download_button(f"⬇️ Download {label}", data=open_report, file_name=f"portfolio_report_{datetime.now():%Y%m%d}{ext}",
+                           mime=mime, width="stretch")
+    elif state == "failed":
+        st.error(f"Report export failed: {str(result)}")
+
+@st.cache_resource
+def get_mark_to_market():
+    """Quote cache and re-pricer from a [quotes] secret, or the local price store; None without either"""
+    config = dict(read_secret("quotes") or {})
+    provider = provider_from_config(config, get_price_store())
+    if provider is None:
+        return None
+    return MarkToMarket(QuoteCache(provider, ttl=config.get("ttl", DEFAULT_TTL), ttls=config.get("ttls")))
+
+def load_data():
+    """Load every account in parallel and return {account name: (open_df, closed_df)}"""
+    accounts = get_accounts()
+    frames, notices, errors, pending = get_account_loader().load(accounts, timeout=ACCOUNT_LOAD_TIMEOUT)
+    label = (lambda name: f"{name}: ") if len(accounts) > 1 else (lambda name: "")
+    
+    for name, notice in notices.items():
+        st.warning(f"{label(name)}{notice}")
+    for name, e in errors.items():
+        st.error(f"{label(name)}Data loading error: {str(e)}")
+    if pending:
+        st.info(f"⏳ Still loading {', '.join(pending)}. Refresh in a moment to include them.")
     
-    return open_df, closed_df, metrics
+    if not frames:
+        # Sample data is only for a fresh install; a configured source that fails stops here
+        if pending or not all(isinstance(e, SourceNotConfigured) for e in errors.values()):
+            st.stop()
+        st.warning("No data source configured, using sample data for demonstration")
+        return {"Sample": sample_portfolio()}
+    return frames
+
+@st.cache_resource
+def get_shared_data():
+    return SharedData()
+
+@st.cache_resource(max_entries=8)
+def get_account_breakdown(version, _open_df, _closed_df):
+    return account_breakdown(_open_df, _closed_df)
+
+@st.cache_resource(max_entries=4)
+def get_filter_index(version, _open_df, _closed_df):
+    return PortfolioIndex(_open_df, _closed_df)
+
+@st.cache_resource(max_entries=8)
+def get_pushed_down(name, source_version, selection, _filters):
+    """One account's rows passing the filters, queried from its source once per source version and selection"""
+    account = next(account for account in get_accounts() if account.name == name)
+    return get_account_loader().fetch(account, _filters)
+
+def push_down(filters, selection):
+    """Shared view of the filtered rows queried from the sources, or None unless every account shown can query"""
+    names = list(loaded) if selected_account is None else [selected_account]
+    accounts = {account.name: account for account in get_accounts()}
+    if not all(name in accounts for name in names):
+        return None
+    loader = get_account_loader()
+    sources = {name: loader.source(accounts[name]) for name in names}
+    if not all(source.pushdown for source in sources.values()):
+        return None
+    frames = {name: get_pushed_down(name, source.version(), selection, filters) for name, source in sources.items()}
+    return get_shared_data().get(frames, selected_account)
+
+FILTER_KEYS = ["filter_dates", "filter_industries", "filter_tickers"]
+
+def clear_filters():
+    for key in FILTER_KEYS:
+        st.session_state.pop(key, None)
 
-# Load and process data
-open_pos, closed_pos, metrics = process_data(*load_data())
+def render_filters(index):
+    """Sidebar date range, industry and ticker pickers; returns a Filters tuple"""
+    start = end = None
+    with st.sidebar.expander("🔎 Filters", expanded=True):
+        bounds = index.date_bounds()
+        if bounds is not None:
+            picked = st.date_input("Bought / sold between", value=bounds, min_value=bounds[0],
+                                   max_value=bounds[1], key="filter_dates")
+            # The picker returns a single date while the second end is being chosen
+            if len(picked) == 2 and tuple(picked) != bounds:
+                start, end = picked
+        industries = st.multiselect("Industry", index.options("Industry"), key="filter_industries",
+                                    placeholder="All industries")
+        tickers = st.multiselect("Ticker", index.options("Stock Name"), key="filter_tickers",
+                                 placeholder="All tickers")
+        st.button("Clear filters", on_click=clear_filters, width="stretch")
+    return Filters(tuple(industries) or None, tuple(tickers) or None, start, end)
+
+# Stage timings for this run; chart and table payload sizes are only measured while the panel is open
+telemetry = Run(measure_payloads=st.session_state.get("show_performance", False))
+
+# Load and process data; the generation is read first so a swap during loading still triggers a rerun
+refresh_generation = get_refresh_scheduler().generation
+with telemetry.span("load_data"):
+    loaded = load_data()
+selected_account = None
+if len(loaded) > 1:
+    choice = st.sidebar.selectbox("📂 Account", ["All accounts", *loaded], key="account")
+    selected_account = None if choice == "All accounts" else choice
+# Typed and stacked frames are built once per snapshot version; every session reads views of the same data
+with telemetry.span("process_data"):
+    shared = get_shared_data().get(loaded, selected_account)
+open_pos, closed_pos, metrics = shared.open, shared.closed, shared.metrics
+open_version, closed_version = shared.open_version, shared.closed_version
+
+# Re-price open positions from quotes; only rows whose quote moved are touched
+mark_to_market = get_mark_to_market()
+marking = mark_to_market is not None and st.sidebar.toggle("📡 Mark to market", value=True, key="mark_to_market")
+
+def mark(open_pos, open_version):
+    """(open_pos, open_version) re-priced from quotes when marking is on, unchanged otherwise"""
+    if marking:
+        try:
+            with telemetry.span("mark_to_market"):
+                return mark_to_market.mark_versioned(open_pos, open_version)
+        except Exception as e:
+            st.warning(f"Quotes unavailable, showing sheet values: {str(e)}")
+    return open_pos, open_version
+
+if marking:
+    open_pos, open_version = mark(open_pos, open_version)
+    metrics.update(compute_metrics(open_pos, closed_pos))
+
+# Everything derived from the frames is computed once per data version
+with telemetry.span("aggregates"):
+    data_version, aggregates = get_aggregate_cache().get(open_pos, closed_pos, get_price_store(),
+                                                         versions=(open_version, closed_version))
+
+# Filters run as SQL on SQLite accounts, and otherwise select rows through indexes built once per data
+# version; the filtered view gets its own aggregates
+filter_index = get_filter_index(data_version, open_pos, closed_pos)
+filters = render_filters(filter_index)
+selection = filter_key(filters)
+all_positions, all_trades = len(open_pos), len(closed_pos)
+if selection:
+    with telemetry.span("filter"):
+        pushed = push_down(filters, selection)
+        if pushed is None:
+            open_pos, closed_pos = filter_index.select(filters)
+            filtered_versions = (f"{aggregates['open_version']}~{selection}", f"{aggregates['closed_version']}~{selection}")
+        else:
+            open_pos, open_version = mark(pushed.open, pushed.open_version)
+            closed_pos = pushed.closed
+            filtered_versions = (open_version, pushed.closed_version)
+        metrics.update(compute_metrics(open_pos, closed_pos))
+    with telemetry.span("aggregates:filtered"):
+        data_version, aggregates = get_aggregate_cache().get(open_pos, closed_pos, get_price_store(),
+                                                             versions=filtered_versions)
+metrics.update(aggregates['risk'])
+metrics.update(aggregates['returns'])
+
+# Per-position XIRR, positionally aligned with the frames the aggregates were built from
+open_pos = open_pos.assign(**{'XIRR(%)': aggregates['open_xirr']})
+closed_pos = closed_pos.assign(**{'XIRR(%)': aggregates['closed_xirr']})
 
 # Main dashboard header
 st.title("📊 Stock Portfolio Dashboard")
+if selection:
+    st.caption(f"🔎 Filtered: {len(open_pos):,} of {all_positions:,} open positions, "
+               f"{len(closed_pos):,} of {all_trades:,} closed trades")
 st.markdown("---")
 
 # Overall portfolio summary
@@ -315,10 +574,110 @@ with col4:
         f"{metrics['total_days']/365:.1f} years" if metrics['total_days'] > 0 else "0 years"
     )
 
-# Create tabs
-tab1, tab2, tab3 = st.tabs(["📈 Open Positions", "📉 Closed Positions", "📊 Analytics"])
+# Timing-aware returns next to the simple Net P&L percentage
+col1, col2, col3 = st.columns(3)
+format_return = lambda value: "n/a" if value is None else f"{value:.2f}%"
 
-with tab1:
+with col1:
+    st.metric("XIRR", format_return(metrics['xirr_pct']), "Money-weighted, annualized", delta_color="off")
+
+with col2:
+    st.metric("Time-Weighted Return", format_return(metrics['twr_pct']), "Cumulative", delta_color="off")
+
+with col3:
+    st.metric("Annualized TWR", format_return(metrics['twr_annualized_pct']), "Per year", delta_color="off")
+
+# Per-account breakdown of the consolidated view
+if 'Account' in open_pos.columns:
+    with st.expander("👥 Per-account breakdown", expanded=True):
+        breakdown = get_account_breakdown(data_version, open_pos, closed_pos)
+        st.dataframe(
+            breakdown,
+            width="stretch",
+            column_config={
+                **{col: st.column_config.NumberColumn(col.replace('_', ' ').title(), format=NUMBER_FORMATS['currency'])
+                   for col in ['open_invested', 'open_pl', 'closed_invested', 'closed_pl', 'possible_pl', 'net_pl']},
+                'active_positions': st.column_config.NumberColumn("Active Positions"),
+                'completed_trades': st.column_config.NumberColumn("Completed Trades"),
+                'net_return_pct': st.column_config.NumberColumn("Net Return", format=NUMBER_FORMATS['percentage'])
+            }
+        )
+
+# Large-data mode for the holding period scatter
+SCATTER_MODES = {
+    "Binned": "binned",
+    "WebGL": "webgl",
+    "Every trade": "svg"
+}
+
+def render_holding_scatter():
+    """Holding period scatter that bins or switches to WebGL past the point budget"""
+    mode = "auto"
+    if len(closed_pos) > SCATTER_POINT_BUDGET:
+        choice = st.radio(
+            f"{len(closed_pos):,} trades, above the {SCATTER_POINT_BUDGET:,} point budget",
+            list(SCATTER_MODES),
+            horizontal=True,
+            key="holding_scatter_mode"
+        )
+        mode = SCATTER_MODES[choice]
+    
+    fig = chart("holding_scatter", aggregates['closed_version'], closed_pos,
+                mode=mode, point_budget=SCATTER_POINT_BUDGET)
+    if mode != "binned":
+        with telemetry.span("send:holding_scatter"):
+            send_chart(fig)
+        return
+    
+    # Selecting bins drills down into the trades behind them; a selectable chart has to go through
+    # st.plotly_chart, which is cheap here since the figure holds bins rather than trades
+    with telemetry.span("send:holding_scatter"):
+        event = st.plotly_chart(fig.figure(), width="stretch", on_select="rerun",
+                                selection_mode=("points", "box", "lasso"), key="holding_scatter_bins")
+    points = event.selection.points if event else []
+    if points:
+        # One mask over every selected bin, so no trade is listed twice
+        drill = trades_in_bins(closed_pos, [point["customdata"][:3] for point in points])
+        st.caption(f"🔎 {len(drill):,} trades in the selected bins")
+        st.dataframe(drill, width="stretch", height=250)
+
+def render_attribution():
+    """Brinson allocation, selection and interaction effects per period against the benchmark file"""
+    st.subheader("🧭 Benchmark Attribution")
+    benchmark = get_benchmark()
+    try:
+        benchmark_version, benchmark_df = benchmark.load()
+    except Exception as e:
+        st.error(f"Could not read benchmark {benchmark.path}: {str(e)}")
+        return
+    if benchmark_df is None:
+        st.info("Add a benchmark to see whether returns came from sector allocation or stock selection: a CSV with "
+                "`Date`, `Industry`, `Close` and optional `Weight` columns (or just `Date` and `Close` for a single "
+                f"index) at `{benchmark.path}`, or point a `[benchmark]` secret's `path` at one.")
+        return
+    
+    period = st.radio("Period", list(PERIODS), index=list(PERIODS).index(DEFAULT_PERIOD), format_func=PERIODS.get,
+                      horizontal=True, key="attribution_period")
+    with telemetry.span("attribution"):
+        attribution, summary, totals = get_attribution(aggregates['performance_version'], benchmark_version, period,
+                                                       open_pos, closed_pos, benchmark_df, get_price_store())
+    if attribution.empty:
+        st.caption("The benchmark does not cover any period in which the portfolio held positions.")
+        return
+    
+    show_chart("attribution", f"{aggregates['performance_version']}-{benchmark_version}-{period}", summary)
+    percent = st.column_config.NumberColumn(format=NUMBER_FORMATS['percentage'])
+    effects = ['Allocation', 'Selection', 'Interaction', 'Active']
+    st.dataframe(totals.assign(**{col: totals[col] * 100 for col in effects}), hide_index=True,
+                 width="stretch", column_config={col: percent for col in effects})
+    st.caption("Effects per industry are added up across periods without compounding.")
+    with st.expander("Per-period detail"):
+        rates = [col for col in attribution.columns if col not in ('Period', 'Industry')]
+        st.dataframe(attribution.assign(**{col: attribution[col] * 100 for col in rates}), hide_index=True,
+                     width="stretch", column_config={col: percent for col in rates})
+
+# Tab views, each only runs when its tab is the selected one
+def render_open_positions():
     st.header("Open Positions Dashboard")
     
     # Performance highlights
@@ -328,7 +687,7 @@ with tab1:
         
         with col1:
             st.markdown("**📈 Top Gainers**")
-            top_gainers = open_pos.nlargest(3, 'Growth(%)')
+            top_gainers = aggregates['top_gainers']
             for _, row in top_gainers.iterrows():
                 create_metric_card(
                     row['Stock Name'],
@@ -339,7 +698,7 @@ with tab1:
         
         with col2:
             st.markdown("**📉 Underperformers**")
-            underperformers = open_pos.nsmallest(3, 'Growth(%)')
+            underperformers = aggregates['underperformers']
             for _, row in underperformers.iterrows():
                 create_metric_card(
                     row['Stock Name'],
@@ -354,44 +713,12 @@ with tab1:
         
         with col1:
             st.markdown('<div class="plot-container">', unsafe_allow_html=True)
-            fig = px.pie(
-                open_pos, 
-                names='Industry', 
-                values='Investment Amount',
-                title='Investment Distribution by Industry',
-                color_discrete_sequence=px.colors.qualitative.Set3
-            )
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#2c3e50', size=12),
-                title_font=dict(color='#2c3e50', size=16),
-                legend=dict(font=dict(color='#2c3e50'))
-            )
-            fig.update_traces(textfont_color='white', textfont_size=12)
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart("industry_pie", aggregates['open_version'], open_pos)
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col2:
             st.markdown('<div class="plot-container">', unsafe_allow_html=True)
-            fig = px.bar(
-                open_pos.sort_values('Profit/Loss'), 
-                x='Stock Name', 
-                y='Profit/Loss',
-                title='Profit/Loss by Stock',
-                color='Profit/Loss',
-                color_continuous_scale='RdYlGn'
-            )
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#2c3e50', size=12),
-                title_font=dict(color='#2c3e50', size=16),
-                xaxis=dict(title_font=dict(color='#2c3e50'), tickfont=dict(color='#2c3e50')),
-                yaxis=dict(title_font=dict(color='#2c3e50'), tickfont=dict(color='#2c3e50')),
-                coloraxis_colorbar=dict(tickfont=dict(color='#2c3e50'))
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart("pl_bar", aggregates['open_version'], open_pos)
             st.markdown('</div>', unsafe_allow_html=True)
         
         # Portfolio details table
@@ -402,18 +729,20 @@ with tab1:
             'Investment Amount': 'currency',
             'Profit/Loss': 'currency',
             'Growth(%)': 'percentage',
+            'XIRR(%)': 'percentage',
             'Buying Price': 'currency',
             'Current Share Price': 'currency'
         }
         
-        display_df = clean_and_format_dataframe(open_pos, format_config)
+        display_df, column_config = clean_and_format_dataframe(open_pos, format_config, "portfolio_details",
+                                                               aggregates['performance_version'])
         
         if len(display_df) > 0:
-            st.dataframe(display_df, use_container_width=True, height=400)
+            render_table("portfolio_details", aggregates['performance_version'], display_df, column_config)
     else:
         st.info("No open positions found.")
 
-with tab2:
+def render_closed_positions():
     st.header("Closed Positions Dashboard")
     
     if len(closed_pos) > 0:
@@ -423,7 +752,7 @@ with tab2:
         
         with col1:
             st.markdown("**🎯 Best Trades**")
-            best_trades = closed_pos.nlargest(3, 'Profit/Loss Booked')
+            best_trades = aggregates['best_trades']
             for _, row in best_trades.iterrows():
                 create_metric_card(
                     row['Stock Name'],
@@ -434,7 +763,7 @@ with tab2:
         
         with col2:
             st.markdown("**📚 Learning Opportunities**")
-            learning_trades = closed_pos.nsmallest(3, 'Profit/Loss Booked')
+            learning_trades = aggregates['learning_trades']
             for _, row in learning_trades.iterrows():
                 create_metric_card(
                     row['Stock Name'],
@@ -449,44 +778,12 @@ with tab2:
         
         with col1:
             st.markdown('<div class="plot-container">', unsafe_allow_html=True)
-            fig = px.scatter(
-                closed_pos, 
-                x='Investment Days', 
-                y='Profit/Loss Booked',
-                color='Industry', 
-                size='Investment Amount',
-                title='Holding Period vs Returns',
-                hover_data=['Stock Name']
-            )
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#2c3e50', size=12),
-                title_font=dict(color='#2c3e50', size=16),
-                xaxis=dict(title_font=dict(color='#2c3e50'), tickfont=dict(color='#2c3e50')),
-                yaxis=dict(title_font=dict(color='#2c3e50'), tickfont=dict(color='#2c3e50')),
-                legend=dict(font=dict(color='#2c3e50'))
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            render_holding_scatter()
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col2:
             st.markdown('<div class="plot-container">', unsafe_allow_html=True)
-            fig = px.box(
-                closed_pos, 
-                x='Industry', 
-                y='Growth(%)', 
-                title='Performance Distribution by Sector'
-            )
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#2c3e50', size=12),
-                title_font=dict(color='#2c3e50', size=16),
-                xaxis=dict(title_font=dict(color='#2c3e50'), tickfont=dict(color='#2c3e50')),
-                yaxis=dict(title_font=dict(color='#2c3e50'), tickfont=dict(color='#2c3e50'))
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart("sector_box", aggregates['closed_version'], closed_pos)
             st.markdown('</div>', unsafe_allow_html=True)
         
         # Transaction history table
@@ -497,17 +794,19 @@ with tab2:
             'Investment Amount': 'currency',
             'Selling Value': 'currency',
             'Profit/Loss Booked': 'currency',
-            'Growth(%)': 'percentage'
+            'Growth(%)': 'percentage',
+            'XIRR(%)': 'percentage'
         }
         
-        display_df = clean_and_format_dataframe(closed_pos, format_config)
+        display_df, column_config = clean_and_format_dataframe(closed_pos, format_config, "transaction_history",
+                                                               aggregates['performance_version'])
         
         if len(display_df) > 0:
-            st.dataframe(display_df, use_container_width=True, height=400)
+            render_table("transaction_history", aggregates['performance_version'], display_df, column_config)
     else:
         st.info("No closed positions found.")
 
-with tab3:
+def render_analytics():
     st.header("Portfolio Analytics")
     
     # Combined analysis
@@ -518,47 +817,42 @@ with tab3:
             # Sector allocation
             st.subheader("🏭 Sector Allocation")
             if len(open_pos) > 0:
-                sector_data = open_pos.groupby('Industry')['Investment Amount'].sum().reset_index()
-                fig = px.treemap(
-                    sector_data,
-                    path=['Industry'],
-                    values='Investment Amount',
-                    title='Current Sector Allocation'
-                )
-                fig.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='#2c3e50', size=12),
-                    title_font=dict(color='#2c3e50', size=16)
-                )
-                fig.update_traces(textfont_color='white', textfont_size=12)
-                st.plotly_chart(fig, use_container_width=True)
+                sector_data = aggregates['sector_allocation']
+                show_chart("sector_treemap", aggregates['open_version'], sector_data)
         
         with col2:
             # Performance trends
             st.subheader("📈 Performance Trends")
             if len(closed_pos) > 0:
-                monthly_performance = closed_pos.copy()
-                if 'Selling Date' in monthly_performance.columns:
-                    monthly_performance['Month'] = pd.to_datetime(monthly_performance['Selling Date']).dt.to_period('M')
-                    monthly_data = monthly_performance.groupby('Month')['Profit/Loss Booked'].sum().reset_index()
-                    monthly_data['Month'] = monthly_data['Month'].astype(str)
-                    
-                    fig = px.line(
-                        monthly_data,
-                        x='Month',
-                        y='Profit/Loss Booked',
-                        title='Monthly P&L Trend'
-                    )
-                    fig.update_layout(
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(color='#2c3e50', size=12),
-                        title_font=dict(color='#2c3e50', size=16),
-                        xaxis=dict(title_font=dict(color='#2c3e50'), tickfont=dict(color='#2c3e50')),
-                        yaxis=dict(title_font=dict(color='#2c3e50'), tickfont=dict(color='#2c3e50'))
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                monthly_data = aggregates['monthly_pl']
+                if monthly_data is not None:
+                    show_chart("monthly_line", aggregates['closed_version'], monthly_data)
+        
+        # Daily equity curve
+        curve = aggregates['equity_curve']
+        if len(curve) > 1:
+            st.subheader("📉 Equity Curve & Drawdown")
+            show_chart("equity_curve", aggregates['performance_version'], curve)
+            
+            col1, col2, col3, col4, col5 = st.columns(5)
+            ratio = lambda value: "n/a" if value is None else f"{value:.2f}"
+            percent = lambda value: "n/a" if value is None else f"{value:.2f}%"
+            with col1:
+                st.metric("Cumulative Return", percent(metrics['cumulative_return_pct']), "Time-weighted")
+            with col2:
+                st.metric("Max Drawdown", percent(metrics['max_drawdown_pct']), "Peak to trough", delta_color="off")
+            with col3:
+                st.metric("Volatility", percent(metrics['volatility_pct']), "Annualized", delta_color="off")
+            with col4:
+                st.metric("Sharpe Ratio", ratio(metrics['sharpe']), "Risk-free 0%", delta_color="off")
+            with col5:
+                st.metric("Sortino Ratio", ratio(metrics['sortino']), "Downside risk", delta_color="off")
+            if not curve.attrs.get('priced_positions'):
+                st.caption("No position has imported price history, so the curve runs on a straight line between "
+                           "buy and current/sell values and drawdown, volatility, Sharpe and Sortino are not shown. "
+                           "Import daily closes with `python -m portfolio.prices import`.")
+        
+        render_attribution()
         
         # Risk metrics
         st.subheader("⚠️ Risk Analysis")
@@ -566,18 +860,65 @@ with tab3:
         
         with col1:
             if len(open_pos) > 0:
-                concentration_risk = (open_pos['Investment Amount'].max() / open_pos['Investment Amount'].sum()) * 100
-                st.metric("Concentration Risk", f"{concentration_risk:.1f}%", "Max position weight")
+                st.metric("Concentration Risk", f"{aggregates['concentration_risk']:.1f}%", "Max position weight")
         
         with col2:
             if len(closed_pos) > 0:
-                win_rate = (closed_pos['Profit/Loss Booked'] > 0).mean() * 100
-                st.metric("Win Rate", f"{win_rate:.1f}%", "Profitable trades")
+                st.metric("Win Rate", f"{aggregates['win_rate']:.1f}%", "Profitable trades")
         
         with col3:
             if len(open_pos) > 0:
-                avg_holding = open_pos['Investment Days'].mean()
-                st.metric("Avg Holding Period", f"{avg_holding:.0f} days", "Current positions")
+                st.metric("Avg Holding Period", f"{aggregates['avg_holding']:.0f} days", "Current positions")
+
+# Create tabs; rerunning on tab change lets the hidden tabs skip their figures and tables
+tab1, tab2, tab3 = st.tabs(
+    ["📈 Open Positions", "📉 Closed Positions", "📊 Analytics"],
+    key="active_view",
+    on_change="rerun"
+)
+
+with tab1:
+    if tab1.open:
+        with telemetry.span("render:open_positions"):
+            render_open_positions()
+
+with tab2:
+    if tab2.open:
+        with telemetry.span("render:closed_positions"):
+            render_closed_positions()
+
+with tab3:
+    if tab3.open:
+        with telemetry.span("render:analytics"):
+            render_analytics()
+
+def render_performance_panel():
+    """Stage timings, payload sizes and cache counters of this run, with exports for monitoring"""
+    with st.expander("⏱️ Performance", expanded=True):
+        total = sum(span['seconds'] for span in telemetry.spans if span['depth'] == 0)
+        st.caption(f"Instrumented stages took {total * 1000:,.0f} ms this run")
+        st.dataframe(
+            pd.DataFrame({
+                "Stage": ["· " * span['depth'] + span['span'].rsplit('/', 1)[-1] for span in telemetry.spans],
+                "ms": [span['seconds'] * 1000 for span in telemetry.spans],
+            }),
+            hide_index=True, width="stretch",
+            column_config={"ms": st.column_config.NumberColumn("ms", format="%.1f")}
+        )
+        if telemetry.payloads:
+            st.dataframe(
+                pd.DataFrame({"Payload": list(telemetry.payloads), "KB": [size / 1024 for size in telemetry.payloads.values()]}),
+                hide_index=True, width="stretch",
+                column_config={"KB": st.column_config.NumberColumn("KB", format="%.1f")}
+            )
+        st.dataframe(pd.Series(telemetry.counters, name="Count").rename_axis("Cache counter"), width="stretch")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Prometheus", get_telemetry_registry().prometheus(), file_name="portfolio_metrics.prom",
+                               mime="text/plain", width="stretch")
+        with col2:
+            st.download_button("JSON log", "\n".join(telemetry.json_lines()),
+                               file_name="portfolio_run.jsonl", mime="application/x-ndjson", width="stretch")
 
 # Enhanced sidebar
 with st.sidebar:
@@ -607,17 +948,58 @@ with st.sidebar:
     
     # Action buttons
     st.subheader("🔧 Actions")
-    if st.button("🔄 Refresh Data", use_container_width=True, type="primary"):
-        st.cache_data.clear()
-        st.rerun()
+    if st.button("🔄 Refresh Data", width="stretch", type="primary"):
+        # Caches are keyed by content versions, so only what depends on changed rows is recomputed
+        with st.spinner("Checking data sources..."):
+            changed, failures = get_refresh_scheduler().poll(force=True)
+        for name, e in failures.items():
+            st.error(f"Refresh failed for {name}: {str(e)}")
+        if changed:
+            st.rerun()
+        elif not failures:
+            st.toast("Already up to date")
     
-    if st.button("📊 Export Report", use_container_width=True):
-        st.success("Report export feature coming soon!")
+    report_kind = st.selectbox("Report format", list(REPORT_FORMATS), format_func=lambda kind: REPORT_FORMATS[kind][0])
+    if st.button("📊 Export Report", width="stretch"):
+        # Built off the UI thread; sessions asking for the same data version share one file
+        st.session_state.report_key = get_report_builder().submit(
+            report_kind, aggregates['performance_version'], open_pos, closed_pos, metrics, aggregates)
+    # Only the status fragment polls while the report is being written
+    building = "report_key" in st.session_state and get_report_builder().status(st.session_state.report_key)[0] == "running"
+    st.fragment(report_status, run_every=0.5 if building else None, key="report_status")(
+        aggregates['performance_version'], building)
     
     st.markdown("---")
     
     # Last updated
-    st.caption(f"📅 Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    # The oldest account snapshot is what the whole view is at least as fresh as
+    saved_times = [get_account_loader().store(account).saved_at for account in get_accounts()]
+    saved_at = min(saved_times) if all(saved_times) else None
+    last_updated = datetime.fromtimestamp(saved_at) if saved_at else datetime.now()
+    st.caption(f"📅 Last updated: {last_updated.strftime('%Y-%m-%d %H:%M:%S')}")
+    if mark_to_market is not None and mark_to_market.quotes.fetched_at:
+        fetched_at = datetime.fromtimestamp(mark_to_market.quotes.fetched_at)
+        st.caption(f"📡 Quotes as of: {fetched_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    scheduler = get_refresh_scheduler()
+    if scheduler.enabled:
+        st.caption(f"🔁 Checking for new trades every {scheduler.interval:g}s")
+        st.fragment(watch_for_changes, run_every=WATCH_EVERY, key="refresh_watch")(refresh_generation)
+    
+    # Cache counters are process-wide totals; the run is recorded once everything above has rendered
+    figure_cache, aggregate_cache = get_figure_cache(), get_aggregate_cache()
+    telemetry.count("figure_hits", figure_cache.hits)
+    telemetry.count("figure_misses", figure_cache.misses)
+    telemetry.count("aggregate_hits", aggregate_cache.hits)
+    telemetry.count("aggregate_misses", aggregate_cache.misses)
+    telemetry.count("shared_data_hits", get_shared_data().hits)
+    telemetry.count("shared_data_misses", get_shared_data().misses)
+    if mark_to_market is not None:
+        telemetry.count("quote_fetches", mark_to_market.quotes.fetches)
+    get_telemetry_registry().record(telemetry)
+    telemetry.log()
+    
+    if st.toggle("⏱️ Show performance", key="show_performance"):
+        render_performance_panel()
     
     st.markdown("---")
     
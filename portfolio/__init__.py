@@ -0,0 +1 @@
+"""Data and analytics helpers for the Stock Portfolio Dashboard"""
@@ -0,0 +1,193 @@
+"""Concurrent loading of several portfolio accounts.
+
+Every account reads from one data source (a Google spreadsheet with the usual
+two worksheets by default, or a local file or SQLite database) and has its
+own snapshot folder. AccountLoader fans the loads out over a thread pool that
+shares a single pooled SheetsClient, and hands back whatever finished within
+the timeout so one slow sheet never holds up the others.
+
+A new snapshot is only written when the rows actually changed: update() skips
+the fetch while the source's version token is unchanged, and every fetch is
+compared against the snapshot's content hash before anything is swapped in.
+"""
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from portfolio.aggregates import frames_version
+from portfolio.engine import normalize
+from portfolio.sheets_client import SheetsClient
+from portfolio.sheets_sync import IncrementalSheetSync
+from portfolio.snapshot_store import Frames, SnapshotStore, mark_typed
+from portfolio.sources import SourceNotConfigured, source_for
+
+# source is 'sheets' (read the spreadsheet), 'file' or 'sqlite' (read path)
+Account = namedtuple('Account', ['name', 'spreadsheet', 'source', 'path'], defaults=['sheets', None])
+
+DEFAULT_ACCOUNTS = [Account('My Portfolio', 'My Stock Portfolio')]
+
+
+def parse_accounts(config):
+    """Accounts from a list of {name, spreadsheet} or {name, source, path} mappings, or the default one"""
+    if not config:
+        return list(DEFAULT_ACCOUNTS)
+    accounts = []
+    for item in config:
+        source = item.get('source', 'sheets')
+        spreadsheet = item.get('spreadsheet')
+        name = item.get('name') or spreadsheet or os.path.basename(item.get('path', ''))
+        accounts.append(Account(name, spreadsheet, source, item.get('path')))
+    return accounts
+
+
+def account_slug(name):
+    return re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_').lower() or 'account'
+
+
+class AccountLoader:
+    """Loads accounts in parallel, stale-while-revalidate per account"""
+
+    def __init__(self, service_account_info, snapshot_root, max_workers=4, max_age=600):
+        self.service_account_info = service_account_info
+        self.snapshot_root = snapshot_root
+        self.max_age = max_age
+        self._client = None
+        self._sources = {}
+        self._syncs = {}
+        self._stores = {}
+        self._inflight = {}
+        self._pulls = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='account-load')
+
+    def client(self):
+        """The one shared, pooled Sheets client"""
+        with self._lock:
+            if self._client is None:
+                if not self.service_account_info:
+                    raise SourceNotConfigured("No Google service account configured")
+                self._client = SheetsClient(self.service_account_info)
+            return self._client
+
+    def store(self, account):
+        with self._lock:
+            if account.name not in self._stores:
+                path = os.path.join(self.snapshot_root, account_slug(account.name))
+                self._stores[account.name] = SnapshotStore(path, max_age=self.max_age)
+            return self._stores[account.name]
+
+    def sync(self, account):
+        with self._lock:
+            sync = self._syncs.get(account.spreadsheet)
+        if sync is None:
+            # Opening the spreadsheet is a network call, so do it outside the lock
+            sync = IncrementalSheetSync(self.client().spreadsheet(account.spreadsheet))
+            with self._lock:
+                sync = self._syncs.setdefault(account.spreadsheet, sync)
+        return sync
+
+    def source(self, account):
+        with self._lock:
+            source = self._sources.get(account.name)
+        if source is None:
+            source = source_for(account, self.sync)
+            with self._lock:
+                source = self._sources.setdefault(account.name, source)
+        return source
+
+    def _pull(self, account, version):
+        """((open_df, closed_df), changed): fetch and coerce once, and save only if the rows changed"""
+        with self._lock:
+            lock = self._pulls.setdefault(account.name, threading.Lock())
+        # One fetch per account at a time, whether it comes from a load, a poll or the Refresh button
+        with lock:
+            store = self.store(account)
+            open_df, closed_df = normalize(*self.source(account).fetch())
+            content = frames_version(open_df, closed_df)
+            if content == store.data_version:
+                store.mark_checked(version)
+                return Frames(mark_typed(open_df), mark_typed(closed_df), content), False
+            return store.save(open_df, closed_df, source_version=version, data_version=content), True
+
+    def fetch(self, account, filters):
+        """Coerced Frames of the account's rows passing the filters, read straight from its source"""
+        open_df, closed_df = normalize(*self.source(account).fetch(filters))
+        return Frames(mark_typed(open_df), mark_typed(closed_df), frames_version(open_df, closed_df))
+
+    def refresh(self, account):
+        """Pull the account from its source, coerce it once and swap in a new snapshot if it changed"""
+        # Read the version first, so a write during the fetch is picked up next time
+        return self._pull(account, self.source(account).version())[0]
+
+    def update(self, account, force=False):
+        """Refresh the account unless its source reports the snapshot's version; True when its rows changed"""
+        version = self.source(account).version()
+        store = self.store(account)
+        if not force and version is not None and store.saved_at is not None and version == store.source_version:
+            store.mark_checked(version)
+            return False
+        return self._pull(account, version)[1]
+
+    def load_one(self, account):
+        """Return ((open_df, closed_df), notice) for one account"""
+        store = self.store(account)
+        snapshot = store.load()
+        try:
+            source = self.source(account)
+            if source.local:
+                # Local files are cheap to check, so the snapshot is reused exactly until they change
+                if snapshot is None or store.source_version != source.version():
+                    return self.refresh(account), None
+                return snapshot, None
+
+            if snapshot is None:
+                # Cold start with nothing on disk, so block on Sheets this once
+                return self.refresh(account), None
+
+            # Serve the snapshot now and refresh it in the background
+            if store.is_stale():
+                store.revalidate_async(lambda: self.refresh(account))
+            return snapshot, None
+        except Exception as e:
+            if snapshot is not None:
+                return snapshot, f"Showing saved snapshot, data source unavailable: {str(e)}"
+            raise
+
+    def load(self, accounts, timeout=None):
+        """Load accounts concurrently.
+
+        Returns (frames, notices, errors, pending): frames maps account name to
+        (open_df, closed_df); accounts still running after ``timeout`` seconds
+        are listed in pending and keep loading for the next call.
+        """
+        with self._lock:
+            futures = {}
+            for account in accounts:
+                if account.name not in self._inflight:
+                    self._inflight[account.name] = self._pool.submit(self.load_one, account)
+                futures[account.name] = self._inflight[account.name]
+
+        wait(futures.values(), timeout=timeout)
+
+        frames, notices, errors, pending = {}, {}, {}, []
+        for name, future in futures.items():
+            if not future.done():
+                pending.append(name)
+                continue
+            with self._lock:
+                self._inflight.pop(name, None)
+            try:
+                frames[name], notice = future.result()
+                if notice:
+                    notices[name] = notice
+            except Exception as e:
+                errors[name] = e
+        return frames, notices, errors, pending
+
+    def update_all(self, accounts, force=False):
+        """Update every account in parallel; returns (names whose rows changed, {name: error})"""
+        futures = {account.name: self._pool.submit(self.update, account, force) for account in accounts}
+        changed = [name for name, future in futures.items() if not future.exception() and future.result()]
+        return changed, {name: future.exception() for name, future in futures.items() if future.exception()}
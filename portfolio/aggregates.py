@@ -0,0 +1,243 @@
+"""Derived aggregates for the dashboard, computed once per data version.
+
+A data version is a content hash of a frame's rows. AggregateCache keeps the
+aggregates for recent versions in a small LRU and, when the closed positions
+only gained rows at the end (the usual case after a sync), folds the new rows
+into the previous closed aggregates instead of recomputing them.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from portfolio.performance import equity_curve, risk_metrics
+from portfolio.returns import return_metrics, xirr_columns
+
+HIGHLIGHT_COUNT = 3
+
+
+def row_hashes(df):
+    """One uint64 per row, independent of the index"""
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def hash_version(hashes, columns=()):
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update('\x1f'.join(map(str, columns)).encode())
+    digest.update(hashes.tobytes())
+    return digest.hexdigest()
+
+
+def data_version(df):
+    """Content hash of a frame"""
+    return hash_version(row_hashes(df), df.columns)
+
+
+def frames_version(open_df, closed_df):
+    """Content version of an (open_df, closed_df) pair, the two frame versions joined as 'open-closed'"""
+    return f'{data_version(open_df)}-{data_version(closed_df)}'
+
+
+def split_version(version):
+    """(open_version, closed_version) from a frames_version() token"""
+    open_version, _, closed_version = version.partition('-')
+    return open_version, closed_version
+
+
+def open_aggregates(open_df):
+    """Sector allocation, concentration and highlights for open positions"""
+    if open_df.empty:
+        return {'sector_allocation': pd.DataFrame(columns=['Industry', 'Investment Amount']),
+                'concentration_risk': None, 'avg_holding': None,
+                'top_gainers': open_df, 'underperformers': open_df}
+
+    invested = open_df['Investment Amount']
+    return {
+        'sector_allocation': open_df.groupby('Industry', observed=True)['Investment Amount'].sum().reset_index(),
+        'concentration_risk': invested.max() / invested.sum() * 100 if invested.sum() else 0.0,
+        'avg_holding': open_df['Investment Days'].mean(),
+        'top_gainers': open_df.nlargest(HIGHLIGHT_COUNT, 'Growth(%)'),
+        'underperformers': open_df.nsmallest(HIGHLIGHT_COUNT, 'Growth(%)'),
+    }
+
+
+def _monthly_sums(closed_df):
+    if 'Selling Date' not in closed_df.columns:
+        return None
+    months = closed_df['Selling Date'].dt.to_period('M')
+    return closed_df['Profit/Loss Booked'].groupby(months).sum()
+
+
+def _closed_summary(state):
+    monthly = state['monthly']
+    if monthly is not None:
+        monthly_data = monthly.rename_axis('Month').reset_index()
+        monthly_data['Month'] = monthly_data['Month'].astype(str)
+    else:
+        monthly_data = None
+    return {
+        **state,
+        'monthly_pl': monthly_data,
+        'win_rate': state['wins'] / state['trades'] * 100 if state['trades'] else None,
+    }
+
+
+def closed_aggregates(closed_df):
+    """Monthly P&L, win rate and best/worst trades for closed positions"""
+    booked = closed_df['Profit/Loss Booked'] if len(closed_df) else pd.Series(dtype=float)
+    return _closed_summary({
+        'monthly': _monthly_sums(closed_df) if len(closed_df) else None,
+        'wins': int((booked > 0).sum()),
+        'trades': len(closed_df),
+        'best_trades': closed_df.nlargest(HIGHLIGHT_COUNT, 'Profit/Loss Booked') if len(closed_df) else closed_df,
+        'learning_trades': closed_df.nsmallest(HIGHLIGHT_COUNT, 'Profit/Loss Booked') if len(closed_df) else closed_df,
+    })
+
+
+def performance_aggregates(open_df, closed_df, prices=None, today=None):
+    """Daily equity curve, risk metrics, and money- and time-weighted returns"""
+    curve = equity_curve(open_df, closed_df, prices, today)
+    open_xirr, closed_xirr = xirr_columns(open_df, closed_df, today)
+    return {
+        'equity_curve': curve,
+        'risk': risk_metrics(curve),
+        'returns': return_metrics(open_df, closed_df, curve, today),
+        'open_xirr': open_xirr.to_numpy(),
+        'closed_xirr': closed_xirr.to_numpy(),
+    }
+
+
+def append_closed(previous, new_rows):
+    """Fold appended closed trades into existing closed aggregates"""
+    if new_rows.empty:
+        return previous
+
+    monthly = previous['monthly']
+    new_monthly = _monthly_sums(new_rows)
+    if monthly is None:
+        monthly = new_monthly
+    elif new_monthly is not None:
+        monthly = monthly.add(new_monthly, fill_value=0).sort_index()
+
+    # The overall top/bottom N must be among the old top/bottom N plus the new rows
+    best = pd.concat([previous['best_trades'], new_rows]).nlargest(HIGHLIGHT_COUNT, 'Profit/Loss Booked')
+    learning = pd.concat([previous['learning_trades'], new_rows]).nsmallest(HIGHLIGHT_COUNT, 'Profit/Loss Booked')
+
+    return _closed_summary({
+        'monthly': monthly,
+        'wins': previous['wins'] + int((new_rows['Profit/Loss Booked'] > 0).sum()),
+        'trades': previous['trades'] + len(new_rows),
+        'best_trades': best,
+        'learning_trades': learning,
+    })
+
+
+class AggregateCache:
+    """LRU of aggregates keyed by the content hash of each frame"""
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._open = OrderedDict()
+        self._closed = OrderedDict()
+        self._performance = OrderedDict()
+        self._last_closed = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _remember(self, entries, version, value):
+        entries[version] = value
+        entries.move_to_end(version)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def _lookup(self, entries, version):
+        with self._lock:
+            value = entries.get(version)
+            if value is not None:
+                entries.move_to_end(version)
+            return value
+
+    def _cached(self, entries, version, build):
+        """entries[version], calling build() on a miss without holding the lookup lock"""
+        # Every get() makes three lookups: open, closed and performance aggregates
+        value = self._lookup(entries, version)
+        if value is None:
+            # Sessions missing together wait for one build; hits from other sessions never wait
+            with self._build_lock:
+                value = self._lookup(entries, version)
+                if value is None:
+                    value = build()
+                    with self._lock:
+                        self.misses += 1
+                        self._remember(entries, version, value)
+                    return value
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def _open_for(self, open_df, version=None):
+        version = version or data_version(open_df)
+        return version, self._cached(self._open, version, lambda: open_aggregates(open_df))
+
+    def _closed_for(self, closed_df, version=None):
+        # A caller-supplied version saves hashing on hits; misses still hash to spot appended rows
+        hashes = None
+        if version is None:
+            hashes = row_hashes(closed_df)
+            version = hash_version(hashes, closed_df.columns)
+
+        def build():
+            nonlocal hashes
+            if hashes is None:
+                hashes = row_hashes(closed_df)
+            with self._lock:
+                last = self._last_closed
+                previous = self._closed.get(last['version']) if last is not None else None
+            if (previous is not None and last['columns'] == list(closed_df.columns)
+                    and len(hashes) > len(last['hashes'])
+                    and np.array_equal(hashes[:len(last['hashes'])], last['hashes'])):
+                # Only new trades were appended, so extend the previous result
+                return append_closed(previous, closed_df.iloc[len(last['hashes']):])
+            return closed_aggregates(closed_df)
+
+        aggregates = self._cached(self._closed, version, build)
+        if hashes is not None:
+            with self._lock:
+                self._last_closed = {'version': version, 'hashes': hashes, 'columns': list(closed_df.columns)}
+        return version, aggregates
+
+    def _performance_for(self, open_df, closed_df, open_version, closed_version, prices):
+        # Open positions are marked up to today, so the curve also moves with the date
+        today = date.today()
+        price_version = prices.version() if prices is not None else None
+        version = f'{open_version}-{closed_version}-{price_version}-{today.isoformat()}'
+        return version, self._cached(self._performance, version,
+                                     lambda: performance_aggregates(open_df, closed_df, prices, today))
+
+    def get(self, open_df, closed_df, prices=None, versions=None):
+        """Return (version, aggregates) for the given frames
+
+        versions=(open_version, closed_version) skips hashing frames whose
+        content version the caller already knows, such as snapshot frames or
+        a filtered view of a known version.
+        """
+        open_version, closed_version = versions or (None, None)
+        open_version, open_aggs = self._open_for(open_df, open_version)
+        closed_version, closed_aggs = self._closed_for(closed_df, closed_version)
+        performance_version, performance_aggs = self._performance_for(
+            open_df, closed_df, open_version, closed_version, prices)
+        return f'{open_version}-{closed_version}', {
+            'open_version': open_version,
+            'closed_version': closed_version,
+            'performance_version': performance_version,
+            **open_aggs,
+            **closed_aggs,
+            **performance_aggs,
+        }
@@ -0,0 +1,382 @@
+"""Brinson-Fachler attribution of the portfolio against a sector benchmark.
+
+The benchmark is a local CSV or Parquet file of index levels: Date, Close and
+optionally Industry (one series per sector) and Weight (the sector's share of
+the index). Without an Industry column the file is a single index; every
+industry is then compared with that index at the portfolio's own weights, so
+all of the active return shows up as selection.
+
+Positions are valued as the equity curve values them: shares times the last
+stored close once their ticker has one, and a straight line from cost to the
+selling or current value before that or without a price history. Each
+position is cut into one segment per period it was held; a segment's capital
+is its value at the start of the segment times the share of the period it
+covers (a modified Dietz denominator) and its gain is the change in value
+over the segment.
+Capital and gain are summed per (period, Industry) in a single groupby, and
+the effects for period t and industry i are
+
+    allocation  = (wp - wb) * (rb - Rb)
+    selection   = wb * (rp - rb)
+    interaction = (wp - wb) * (rp - rb)
+
+which add up to the period's active return Rp - Rb.
+"""
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from portfolio.prices import CLOSE, CSV_COLUMNS, DATE, normalize_symbol, pick_column
+
+PERIODS = {'M': 'Monthly', 'Q': 'Quarterly', 'Y': 'Yearly'}
+DEFAULT_PERIOD = 'Q'
+
+# Industry label of a benchmark file that holds a single index
+TOTAL = 'Total'
+
+BENCHMARK_COLUMNS = {
+    'date': CSV_COLUMNS['date'],
+    'close': CSV_COLUMNS['close'] + ('level', 'index'),
+    'industry': ('industry', 'sector'),
+    'weight': ('weight', 'benchmark weight'),
+}
+
+ATTRIBUTION_COLUMNS = [
+    'Period', 'Industry', 'Portfolio Weight', 'Benchmark Weight', 'Portfolio Return', 'Benchmark Return',
+    'Allocation', 'Selection', 'Interaction', 'Active',
+]
+
+
+def read_benchmark(path):
+    """Long frame of Date, Industry, Close and Weight (NaN when the file has none), sorted by date"""
+    df = pd.read_parquet(path) if path.lower().endswith('.parquet') else pd.read_csv(path)
+    picked = {field: pick_column(df.columns, names) for field, names in BENCHMARK_COLUMNS.items()}
+    if picked['date'] is None or picked['close'] is None:
+        raise ValueError("benchmark data needs at least a date and a close column")
+
+    benchmark = pd.DataFrame({
+        'Date': pd.to_datetime(df[picked['date']], errors='coerce', format='mixed'),
+        'Industry': df[picked['industry']].astype(str).str.strip() if picked['industry'] else TOTAL,
+        'Close': pd.to_numeric(df[picked['close']], errors='coerce'),
+        'Weight': pd.to_numeric(df[picked['weight']], errors='coerce') if picked['weight'] else np.nan,
+    })
+    benchmark = benchmark[benchmark['Date'].notna() & (benchmark['Close'] > 0)]
+    return benchmark.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+class Benchmark:
+    """A benchmark file, re-read only when its modification time or size changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._memo = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+    def load(self):
+        """(version, frame), or (None, None) when the file does not exist"""
+        version = self.version()
+        if version is None:
+            return None, None
+        with self._lock:
+            if self._memo is not None and self._memo[0] == version:
+                return self._memo
+        memo = (version, read_benchmark(self.path))
+        with self._lock:
+            self._memo = memo
+        return memo
+
+
+def _industries(open_df, closed_df):
+    """Industry code of every open then closed row, and the names the codes index (blank last)"""
+    parts = [df['Industry'] if 'Industry' in df.columns else pd.Series('', index=df.index)
+             for df in (open_df, closed_df)]
+    labels = union_categoricals([pd.Categorical(part.astype(str) if not isinstance(part.dtype, pd.CategoricalDtype)
+                                                else part) for part in parts], ignore_order=True)
+    # Categories that only differ by surrounding spaces are one industry
+    remap, names = pd.factorize(np.append(labels.categories.astype(str).str.strip().to_numpy(dtype=object), ''))
+    return remap[np.where(labels.codes >= 0, labels.codes, len(remap) - 1)], np.asarray(names, dtype=object)
+
+
+def _positions(open_df, closed_df, today):
+    """Industry code, ticker, start, end, cost, final value, buying price and closed flag of every
+    position with usable dates"""
+    def column(df, name, default=np.nan):
+        return df[name] if name in df.columns else pd.Series(default, index=df.index)
+
+    def numbers(values):
+        return pd.to_numeric(values, errors='coerce').astype(float).to_numpy()
+
+    open_invested = numbers(column(open_df, 'Investment Amount'))
+    closed_invested = numbers(column(closed_df, 'Investment Amount'))
+    closed_final = numbers(column(closed_df, 'Selling Value'))
+    closed_final = np.where(np.isnan(closed_final),
+                            closed_invested + np.nan_to_num(numbers(column(closed_df, 'Profit/Loss Booked', 0))),
+                            closed_final)
+
+    start = pd.to_datetime(pd.concat([column(open_df, 'Buying Date'), column(closed_df, 'Buying Date')],
+                                     ignore_index=True), errors='coerce')
+    end = pd.to_datetime(pd.concat([pd.Series(pd.Timestamp(today), index=open_df.index),
+                                    column(closed_df, 'Selling Date')], ignore_index=True), errors='coerce')
+    invested = np.r_[open_invested, closed_invested]
+    final = np.r_[open_invested + np.nan_to_num(numbers(column(open_df, 'Profit/Loss', 0))), closed_final]
+    entry = np.r_[numbers(column(open_df, 'Buying Price')), np.full(len(closed_df), np.nan)]
+    closed = np.r_[np.zeros(len(open_df), bool), np.ones(len(closed_df), bool)]
+    # Normalize each distinct name once
+    names_at, uniques = pd.factorize(pd.concat([column(open_df, 'Stock Name', ''), column(closed_df, 'Stock Name', '')],
+                                               ignore_index=True).astype(str))
+    symbols = np.asarray([normalize_symbol(name) for name in uniques], dtype=object)[names_at]
+
+    usable = (start.notna() & end.notna() & (end >= start)).to_numpy() & (invested > 0) & ~np.isnan(final)
+    codes, names = _industries(open_df, closed_df)
+    return (codes[usable], names, symbols[usable], start.to_numpy()[usable], end.to_numpy()[usable],
+            invested[usable], final[usable], entry[usable], closed[usable])
+
+
+def _days(values):
+    """Days since the epoch, as the price store counts them"""
+    return (values - np.datetime64(0, 'D')) / np.timedelta64(1, 'D')
+
+
+def _marks(prices, symbols, start, entry, invested, days):
+    """Closes before each of ``days`` per ticker, and every position's close column, shares and first bar
+
+    Shares are the cost over the buying price, or over the close on the buying
+    day like the equity curve; positions with neither, or whose ticker has no
+    stored history, get NaN shares and an infinite first bar.
+    """
+    column, tickers = pd.factorize(symbols)
+    closes = np.full((len(days), len(tickers)), np.nan)
+    shares = np.full(len(symbols), np.nan)
+    first_bar = np.full(len(symbols), np.inf)
+    if prices is None or not len(symbols):
+        return closes, column, shares, first_bar
+
+    known = set(prices.symbols())
+    order = np.argsort(column, kind='stable')
+    bounds = np.searchsorted(column[order], np.arange(len(tickers) + 1))
+    for j, ticker in enumerate(tickers):
+        bars = prices.slice(ticker, None, None) if ticker in known else None
+        if bars is None or not bars.shape[1]:
+            continue
+        bar_days, bar_closes = np.asarray(bars[DATE]), np.asarray(bars[CLOSE])
+        i = np.searchsorted(bar_days, days, side='left') - 1
+        closes[:, j] = np.where(i >= 0, bar_closes[np.maximum(i, 0)], np.nan)
+        held = order[bounds[j]:bounds[j + 1]]
+        i = np.searchsorted(bar_days, np.floor(start[held]), side='right') - 1
+        price = np.where(entry[held] > 0, entry[held], np.where(i >= 0, bar_closes[np.maximum(i, 0)], np.nan))
+        shares[held] = invested[held] / price
+        first_bar[held] = np.where(np.isnan(shares[held]), np.inf, bar_days[0])
+    return closes, column, shares, first_bar
+
+
+def portfolio_segments(open_df, closed_df, period=DEFAULT_PERIOD, today=None, prices=None):
+    """Capital and gain per (Period, Industry), and the period bounds (one more than the periods)
+
+    A position is marked at shares times its ticker's last close before a
+    bound once the price store has one, and on its straight line before that.
+    Only each position's first and last period, and the period in which it
+    switches from the line to closes, are cut explicitly. Periods in between
+    are held in full: a straight-line position adds a constant plus its slope
+    times the period's start day to the capital, and a marked one adds its
+    shares to a (industry, ticker) holdings table that is multiplied by the
+    closes at the bounds. Both are summed through difference arrays, so the
+    work does not grow with how long positions were held.
+    """
+    today = pd.Timestamp(today or date.today()).normalize()
+    codes, names, symbols, start, end, invested, final, entry, closed = _positions(open_df, closed_df, today)
+    if not len(start):
+        return pd.DataFrame(columns=['Period', 'Industry', 'Capital', 'Gain']), pd.DatetimeIndex([])
+
+    periods = pd.period_range(pd.Timestamp(start.min()), max(pd.Timestamp(end.max()), today), freq=period)
+    bounds = pd.DatetimeIndex(list(periods.start_time) + [periods[-1].end_time.normalize() + pd.Timedelta(days=1)])
+    edges = _days(bounds.to_numpy())
+    length = np.diff(edges)
+    width = len(edges)
+    start, end = _days(start), _days(end)
+
+    first = np.searchsorted(edges, start, side='right') - 1
+    last = np.maximum(np.searchsorted(edges, end, side='left') - 1, first)
+    held = end - start
+    slope = (final - invested) / np.where(held > 0, held, 1)
+
+    # Row `width` of the closes is for today, where open positions end
+    closes, column, shares, first_bar = _marks(prices, symbols, start, entry, invested,
+                                               np.r_[edges, _days(today.to_datetime64())])
+    # First bound with a close before it; the period ending there switches from the line to closes
+    marked_from = np.searchsorted(edges, first_bar, side='right')
+
+    def value_at(rows, at, bound):
+        """Value of positions at a day; ``bound`` indexes the closes, -1 for a buying day"""
+        mark = shares[rows] * closes[bound, column[rows]]
+        line = invested[rows] + slope[rows] * (at - start[rows])
+        return np.where((bound >= marked_from[rows]) & ~np.isnan(mark), mark, line)
+
+    # First and last period of every position, one segment when they are the same, and the switch period
+    switch = marked_from - 1
+    split = np.flatnonzero(last > first)
+    mixed = np.flatnonzero((switch > first) & (switch < last))
+    edge = np.r_[np.arange(len(start)), split, mixed]
+    edge_period = np.r_[first, last[split], switch[mixed]]
+    seg_from = np.maximum(start[edge], edges[edge_period])
+    seg_to = np.minimum(end[edge], edges[edge_period + 1])
+    value_from = value_at(edge, seg_from, np.where(seg_from > start[edge], edge_period, -1))
+    at_end = seg_to >= end[edge]
+    value_to = value_at(edge, seg_to, np.where(at_end, width, edge_period + 1))
+    # A sold position ends at what it sold for; one bought and sold on the same day moves straight there
+    value_to = np.where(at_end & (closed[edge] | (held[edge] <= 0)), final[edge], value_to)
+    share = np.maximum(seg_to - seg_from, 1.0) / length[edge_period]
+
+    def summed(keys, n_keys, lo, hi, weights):
+        """Per-key sums of weights over the periods lo .. hi - 1, as an (n_keys, periods) table"""
+        spans = np.bincount(keys * width + lo, weights, n_keys * width) - np.bincount(keys * width + hi, weights,
+                                                                                     n_keys * width)
+        return np.cumsum(spans.reshape(n_keys, width), axis=1)[:, :-1]
+
+    # Full straight-line periods: capital = (invested - slope * start) + slope * period start
+    lo, hi = first + 1, np.minimum(last, switch)
+    inner = np.flatnonzero(hi > lo)
+    keys, lo, hi = codes[inner], lo[inner], hi[inner]
+    base = summed(keys, len(names), lo, hi, (invested - slope * start)[inner])
+    slopes = summed(keys, len(names), lo, hi, slope[inner])
+    line_industry, line_period = np.nonzero(summed(keys, len(names), lo, hi, np.ones(len(inner))) > 0.5)
+    base, slopes = base[line_industry, line_period], slopes[line_industry, line_period]
+
+    # Full marked periods: shares per (industry, ticker) times the closes at both bounds
+    lo = np.maximum(first + 1, marked_from)
+    inner = np.flatnonzero(last > lo)
+    n_tickers = max(closes.shape[1], 1)
+    pair, pairs = pd.factorize(codes[inner] * n_tickers + column[inner])
+    lo, hi = lo[inner], last[inner]
+    holdings = summed(pair, len(pairs), lo, hi, shares[inner])
+    mark_pair, mark_period = np.nonzero(summed(pair, len(pairs), lo, hi, np.ones(len(inner))) > 0.5)
+    mark_column = pairs[mark_pair] % n_tickers
+    mark_shares = holdings[mark_pair, mark_period]
+    mark_from = mark_shares * closes[mark_period, mark_column]
+
+    segments = pd.DataFrame({
+        'Period': np.r_[edge_period, line_period, mark_period],
+        'Industry': np.r_[codes[edge], line_industry, pairs[mark_pair] // n_tickers],
+        'Capital': np.r_[value_from * share, base + slopes * edges[line_period], mark_from],
+        'Gain': np.r_[value_to - value_from, slopes * length[line_period],
+                      mark_shares * closes[mark_period + 1, mark_column] - mark_from],
+    })
+    totals = segments.groupby(['Period', 'Industry'], sort=True)[['Capital', 'Gain']].sum().reset_index()
+    totals['Industry'] = names[totals['Industry'].to_numpy()]
+    return totals, bounds
+
+
+def benchmark_returns(benchmark, bounds):
+    """Benchmark return and start-of-period weight per (Period, Industry) for the given period bounds"""
+    if benchmark is None or benchmark.empty or len(bounds) < 2:
+        return pd.DataFrame(columns=['Period', 'Industry', 'Benchmark Return', 'Benchmark Weight'])
+
+    # Level (and weight) in force at each bound: the last value on or before it
+    closes = benchmark.pivot_table(index='Date', columns='Industry', values='Close', aggfunc='last').ffill()
+    at = closes.index.searchsorted(bounds - pd.Timedelta(days=1), side='right') - 1
+    levels = np.where(at[:, None] >= 0, closes.to_numpy()[np.maximum(at, 0)], np.nan)
+    returns = levels[1:] / levels[:-1] - 1
+    # Forward filling must not carry a series into periods after its last date
+    last_seen = benchmark.groupby('Industry')['Date'].max().reindex(closes.columns).to_numpy()
+    returns[last_seen[None, :] < bounds[:-1].to_numpy()[:, None]] = np.nan
+
+    weights = np.full_like(returns, np.nan)
+    if benchmark['Weight'].notna().any():
+        table = benchmark.pivot_table(index='Date', columns='Industry', values='Weight', aggfunc='last')
+        table = table.reindex(columns=closes.columns).ffill().to_numpy()
+        weights = np.where(at[:-1, None] >= 0, table[np.maximum(at[:-1], 0)], np.nan)
+    # Sectors without a weight split what the given weights leave of the index (fractions, or percent
+    # when any weight is above 1) equally, and all share equally when none is given; weights are then
+    # normalized over sectors with a return
+    weights = np.where(np.isnan(returns), np.nan, weights)
+    missing = np.isnan(weights) & ~np.isnan(returns)
+    scale = 100.0 if np.nanmax(weights, initial=0) > 1 else 1.0
+    given = np.nansum(weights, axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rest = np.maximum(scale - given, 0) / missing.sum(axis=1, keepdims=True)
+    weights = np.where(missing, np.where(given > 0, rest, 1.0), weights)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = weights / np.nansum(weights, axis=1, keepdims=True)
+
+    result = pd.DataFrame({
+        'Period': np.repeat(np.arange(len(returns)), returns.shape[1]),
+        'Industry': np.tile(closes.columns.astype(str), len(returns)),
+        'Benchmark Return': returns.ravel(),
+        'Benchmark Weight': weights.ravel(),
+    })
+    return result[result['Benchmark Return'].notna()].reset_index(drop=True)
+
+
+def brinson(open_df, closed_df, benchmark, period=DEFAULT_PERIOD, today=None, prices=None):
+    """Allocation, selection and interaction per period and Industry, as fractions of capital
+
+    Periods the benchmark does not cover are left out.
+    """
+    segments, bounds = portfolio_segments(open_df, closed_df, period, today, prices)
+    bench = benchmark_returns(benchmark, bounds)
+    if segments.empty or bench.empty:
+        return pd.DataFrame(columns=ATTRIBUTION_COLUMNS)
+
+    capital = segments.groupby('Period')['Capital'].transform('sum')
+    segments['Portfolio Weight'] = segments['Capital'] / capital
+    segments['Portfolio Return'] = segments['Gain'] / segments['Capital'].where(segments['Capital'] > 0)
+
+    single = set(bench['Industry']) == {TOTAL}
+    total = (bench['Benchmark Weight'] * bench['Benchmark Return']).groupby(bench['Period']).sum()
+    total = total.rename('Total Return').reset_index()
+    if single:
+        # One index: every industry is held against it at the portfolio's own weight
+        frame = segments.merge(total, on='Period')
+        frame['Benchmark Return'] = frame['Total Return']
+        frame['Benchmark Weight'] = frame['Portfolio Weight']
+    else:
+        frame = segments.merge(bench, on=['Period', 'Industry'], how='outer')
+        frame = frame[frame['Period'].isin(segments['Period'])].merge(total, on='Period')
+        frame[['Portfolio Weight', 'Benchmark Weight']] = frame[['Portfolio Weight', 'Benchmark Weight']].fillna(0.0)
+        # Industries the index lacks are compared with the whole index; unheld ones have no selection
+        frame['Benchmark Return'] = frame['Benchmark Return'].fillna(frame['Total Return'])
+        frame['Portfolio Return'] = frame['Portfolio Return'].fillna(frame['Benchmark Return'])
+
+    active_weight = frame['Portfolio Weight'] - frame['Benchmark Weight']
+    excess = frame['Portfolio Return'] - frame['Benchmark Return']
+    frame['Allocation'] = active_weight * (frame['Benchmark Return'] - frame['Total Return'])
+    frame['Selection'] = frame['Benchmark Weight'] * excess
+    frame['Interaction'] = active_weight * excess
+    frame['Active'] = frame['Allocation'] + frame['Selection'] + frame['Interaction']
+    if frame.empty:
+        return pd.DataFrame(columns=ATTRIBUTION_COLUMNS)
+
+    labels = pd.PeriodIndex(bounds[:-1], freq=period).astype(str)
+    frame['Period'] = labels[frame['Period'].to_numpy()]
+    return frame.sort_values(['Period', 'Industry'], kind='stable')[ATTRIBUTION_COLUMNS].reset_index(drop=True)
+
+
+def attribution_summary(attribution):
+    """Per-period portfolio, benchmark and active return with the three effects summed over industries"""
+    if attribution.empty:
+        return pd.DataFrame(columns=['Period', 'Portfolio Return', 'Benchmark Return', 'Allocation', 'Selection',
+                                     'Interaction', 'Active'])
+    weighted = attribution.assign(
+        **{'Portfolio Return': attribution['Portfolio Weight'] * attribution['Portfolio Return'],
+           'Benchmark Return': attribution['Benchmark Weight'] * attribution['Benchmark Return']})
+    columns = ['Portfolio Return', 'Benchmark Return', 'Allocation', 'Selection', 'Interaction', 'Active']
+    return weighted.groupby('Period', sort=True)[columns].sum().reset_index()
+
+
+def industry_totals(attribution):
+    """Each industry's effects added up over every period (arithmetic, not compounded)"""
+    columns = ['Allocation', 'Selection', 'Interaction', 'Active']
+    if attribution.empty:
+        return pd.DataFrame(columns=['Industry', *columns])
+    totals = attribution.groupby('Industry', sort=False)[columns].sum()
+    return totals.sort_values('Active', ascending=False).reset_index()
@@ -0,0 +1,237 @@
+"""Plotly chart factory with a shared theme and a per-data-version cache of serialized figures"""
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+TEXT_COLOR = '#2c3e50'
+
+# Above this many trades the holding-period scatter switches to a large-data mode
+SCATTER_POINT_BUDGET = 5000
+SCATTER_BINS = 40
+
+# Register the dashboard look once; every chart layers it on top of "plotly"
+pio.templates['portfolio'] = go.layout.Template(
+    layout=dict(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color=TEXT_COLOR, size=12),
+        title_font=dict(color=TEXT_COLOR, size=16),
+        xaxis=dict(title_font=dict(color=TEXT_COLOR), tickfont=dict(color=TEXT_COLOR)),
+        yaxis=dict(title_font=dict(color=TEXT_COLOR), tickfont=dict(color=TEXT_COLOR)),
+        legend=dict(font=dict(color=TEXT_COLOR)),
+        coloraxis_colorbar=dict(tickfont=dict(color=TEXT_COLOR))
+    ),
+    data=dict(
+        pie=[go.Pie(textfont=dict(color='white', size=12))],
+        treemap=[go.Treemap(textfont=dict(color='white', size=12))]
+    )
+)
+TEMPLATE = 'plotly+portfolio'
+
+
+def industry_pie(open_df):
+    return px.pie(
+        open_df,
+        names='Industry',
+        values='Investment Amount',
+        title='Investment Distribution by Industry',
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        template=TEMPLATE
+    )
+
+
+def pl_bar(open_df):
+    return px.bar(
+        open_df.sort_values('Profit/Loss'),
+        x='Stock Name',
+        y='Profit/Loss',
+        title='Profit/Loss by Stock',
+        color='Profit/Loss',
+        color_continuous_scale='RdYlGn',
+        template=TEMPLATE
+    )
+
+
+def _bins(values, bins):
+    """Half-open bin of every value (the last bin also takes the maximum) and the bin edges"""
+    edges = np.histogram_bin_edges(values, bins)
+    return np.clip(np.searchsorted(edges, values, side='right') - 1, 0, bins - 1), edges
+
+
+def bin_trades(closed_df, bins=SCATTER_BINS):
+    """Aggregate trades into an Investment Days x Profit/Loss grid per Industry"""
+    day_bin, day_edges = _bins(closed_df['Investment Days'].to_numpy(dtype=float), bins)
+    pl_bin, pl_edges = _bins(closed_df['Profit/Loss Booked'].to_numpy(dtype=float), bins)
+
+    binned = pd.DataFrame({
+        'Industry': closed_df['Industry'].to_numpy(),
+        'day_bin': day_bin,
+        'pl_bin': pl_bin,
+        'Investment Amount': closed_df['Investment Amount'].to_numpy(),
+    }).groupby(['Industry', 'day_bin', 'pl_bin'], observed=True).agg(
+        Trades=('Investment Amount', 'size'),
+        Invested=('Investment Amount', 'sum'),
+    ).reset_index()
+
+    # Plot each bin at its centre and keep its bounds for drill-down
+    binned['Days From'] = day_edges[binned['day_bin']]
+    binned['Days To'] = day_edges[binned['day_bin'] + 1]
+    binned['P&L From'] = pl_edges[binned['pl_bin']]
+    binned['P&L To'] = pl_edges[binned['pl_bin'] + 1]
+    binned['Investment Days'] = (binned['Days From'] + binned['Days To']) / 2
+    binned['Profit/Loss Booked'] = (binned['P&L From'] + binned['P&L To']) / 2
+    return binned
+
+
+def trades_in_bins(closed_df, selected, bins=SCATTER_BINS):
+    """The trades behind the selected (Industry, day_bin, pl_bin) points, binned exactly as bin_trades() does"""
+    days, _ = _bins(closed_df['Investment Days'].to_numpy(dtype=float), bins)
+    booked, _ = _bins(closed_df['Profit/Loss Booked'].to_numpy(dtype=float), bins)
+    industry = closed_df['Industry'].to_numpy()
+    mask = np.zeros(len(closed_df), dtype=bool)
+    for name, day_bin, pl_bin in selected:
+        mask |= (industry == name) & (days == int(day_bin)) & (booked == int(pl_bin))
+    return closed_df[mask]
+
+
+def holding_scatter(closed_df, mode='auto', point_budget=SCATTER_POINT_BUDGET):
+    """One marker per trade, or WebGL / binned markers once over the point budget"""
+    if mode == 'auto':
+        mode = 'svg' if len(closed_df) <= point_budget else 'binned'
+
+    if mode == 'binned':
+        return px.scatter(
+            bin_trades(closed_df),
+            x='Investment Days',
+            y='Profit/Loss Booked',
+            color='Industry',
+            size='Trades',
+            title=f'Holding Period vs Returns ({len(closed_df):,} trades, binned)',
+            hover_data=['Trades', 'Invested'],
+            custom_data=['Industry', 'day_bin', 'pl_bin'],
+            render_mode='webgl',
+            template=TEMPLATE
+        )
+
+    return px.scatter(
+        closed_df,
+        x='Investment Days',
+        y='Profit/Loss Booked',
+        color='Industry',
+        size='Investment Amount',
+        title='Holding Period vs Returns',
+        hover_data=['Stock Name'],
+        render_mode='webgl' if mode == 'webgl' else 'svg',
+        template=TEMPLATE
+    )
+
+
+def sector_box(closed_df):
+    return px.box(
+        closed_df,
+        x='Industry',
+        y='Growth(%)',
+        title='Performance Distribution by Sector',
+        template=TEMPLATE
+    )
+
+
+def sector_treemap(sector_data):
+    return px.treemap(
+        sector_data,
+        path=['Industry'],
+        values='Investment Amount',
+        title='Current Sector Allocation',
+        template=TEMPLATE
+    )
+
+
+def monthly_line(monthly_data):
+    return px.line(
+        monthly_data,
+        x='Month',
+        y='Profit/Loss Booked',
+        title='Monthly P&L Trend',
+        template=TEMPLATE
+    )
+
+
+def equity_chart(curve):
+    """Cumulative return with drawdown and rolling volatility underneath"""
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.65, 0.35], vertical_spacing=0.06)
+    fig.add_trace(go.Scatter(x=curve.index, y=curve['Cumulative Return(%)'], name='Cumulative Return (%)',
+                             line=dict(color='#667eea')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=curve.index, y=curve['Drawdown(%)'], name='Drawdown (%)', fill='tozeroy',
+                             line=dict(color='#e74c3c')), row=2, col=1)
+    fig.add_trace(go.Scatter(x=curve.index, y=curve['Rolling Volatility(%)'], name='Rolling Volatility (%)',
+                             line=dict(color='#f39c12', dash='dot')), row=2, col=1)
+    fig.update_layout(title='Equity Curve & Drawdown', hovermode='x unified', template=TEMPLATE)
+    fig.update_yaxes(title_text='Return (%)', row=1, col=1)
+    fig.update_yaxes(title_text='Drawdown / Vol (%)', row=2, col=1)
+    return fig
+
+
+def attribution_bar(summary):
+    """Allocation, selection and interaction per period, stacked, with the active return on top"""
+    fig = go.Figure()
+    for effect, color in (('Allocation', '#667eea'), ('Selection', '#2ecc71'), ('Interaction', '#f39c12')):
+        fig.add_trace(go.Bar(x=summary['Period'], y=summary[effect] * 100, name=effect, marker_color=color))
+    fig.add_trace(go.Scatter(x=summary['Period'], y=summary['Active'] * 100, name='Active Return',
+                             mode='lines+markers', line=dict(color=TEXT_COLOR)))
+    fig.update_layout(title='Return Attribution vs Benchmark', barmode='relative', hovermode='x unified',
+                      yaxis_title='Contribution (%)', template=TEMPLATE)
+    return fig
+
+
+CHARTS = {
+    'industry_pie': industry_pie,
+    'pl_bar': pl_bar,
+    'holding_scatter': holding_scatter,
+    'sector_box': sector_box,
+    'sector_treemap': sector_treemap,
+    'monthly_line': monthly_line,
+    'equity_curve': equity_chart,
+    'attribution': attribution_bar,
+}
+
+
+class SerializedFigure(namedtuple('SerializedFigure', ['json', 'height'])):
+    """A figure as the JSON sent to the browser, and its layout height (None for Plotly's default)"""
+
+    def figure(self):
+        return pio.from_json(self.json)
+
+
+class FigureCache:
+    """LRU of serialized figures keyed by chart type and data version"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chart, version, data, **options):
+        """Return the SerializedFigure for chart over data, building and serializing it only on a miss"""
+        key = (chart, version, tuple(sorted(options.items())))
+        with self._lock:
+            if key in self._figures:
+                self.hits += 1
+                self._figures.move_to_end(key)
+                return self._figures[key]
+
+        fig = CHARTS[chart](data, **options)
+        fig = SerializedFigure(pio.to_json(fig, validate=False), fig.layout.height)
+        with self._lock:
+            self.misses += 1
+            self._figures[key] = fig
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return fig
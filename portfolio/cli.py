@@ -0,0 +1,131 @@
+"""Batch command line interface for the analytics engine.
+
+    python -m portfolio holdings.xlsx family/ client.xlsx --jobs 4
+    python -m portfolio --sample --format table
+    python -m portfolio history.db --industry Banking --since 2024-01-01
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from portfolio.engine import sample_portfolio, summarize
+from portfolio.ledger import METHODS
+from portfolio.prices import PriceStore
+from portfolio.pricing import PriceStoreQuoteProvider
+from portfolio.sources import Filters, apply_filters, source_from_path
+
+TABLE_COLUMNS = [
+    ('source', 'Portfolio'),
+    ('total_invested', 'Invested'),
+    ('net_pl', 'Net P&L'),
+    ('net_return_pct', 'Return %'),
+    ('xirr_pct', 'XIRR %'),
+    ('active_positions', 'Open'),
+    ('completed_trades', 'Closed'),
+    ('win_rate', 'Win %'),
+    ('max_drawdown_pct', 'Max DD %'),
+    ('sharpe', 'Sharpe'),
+]
+
+
+def analyze(path, prices_dir=None, method='fifo', filters=None):
+    """Summarize one portfolio file, reporting failures instead of raising"""
+    start = time.perf_counter()
+    try:
+        prices = PriceStore(prices_dir) if prices_dir else None
+        quotes = PriceStoreQuoteProvider(prices).quotes(prices.symbols()) if prices else None
+        if path == '<sample>':
+            open_df, closed_df = sample_portfolio()
+            frames = apply_filters('open', open_df, filters), apply_filters('closed', closed_df, filters)
+        else:
+            # SQLite databases evaluate the filters in SQL; other files are filtered after loading
+            frames = source_from_path(path, method, quotes).fetch(filters)
+        result = {'source': path, **summarize(*frames, prices=prices)}
+    except Exception as e:
+        result = {'source': path, 'error': str(e)}
+    result['seconds'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _json_default(value):
+    # numpy scalars and timestamps from the highlight rows
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def format_table(results):
+    def cell(result, key):
+        value = result.get(key)
+        if 'error' in result and key != 'source':
+            return 'error' if key == 'total_invested' else ''
+        if isinstance(value, float):
+            return f'{value:,.2f}'
+        return '' if value is None else str(value)
+
+    rows = [[title for _, title in TABLE_COLUMNS]]
+    rows += [[cell(result, key) for key, _ in TABLE_COLUMNS] for result in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(TABLE_COLUMNS))]
+    return '\n'.join(
+        '  '.join(value.ljust(width) if i == 0 else value.rjust(width)
+                  for i, (value, width) in enumerate(zip(row, widths)))
+        for row in rows
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m portfolio',
+        description='Compute every dashboard metric for one or more portfolio files.'
+    )
+    parser.add_argument('paths', nargs='*',
+                        help='Excel workbooks with "Open Positions"/"Closed Positions" or "Transactions" sheets, '
+                             'transaction CSV files, SQLite databases, or folders holding CSV files or a dashboard snapshot')
+    parser.add_argument('--sample', action='store_true', help='include the built-in sample portfolio')
+    parser.add_argument('--prices', help='price store directory used to mark positions for the equity curve')
+    parser.add_argument('--method', choices=METHODS, default='fifo',
+                        help='cost basis for transaction ledgers')
+    parser.add_argument('--industry', action='append', help='only this industry (repeatable)')
+    parser.add_argument('--ticker', action='append', help='only this stock (repeatable)')
+    parser.add_argument('--since', help='open positions bought / trades sold on or after this date')
+    parser.add_argument('--until', help='open positions bought / trades sold on or before this date')
+    parser.add_argument('--jobs', type=int, default=1, help='portfolios to process in parallel')
+    parser.add_argument('--format', choices=['json', 'jsonl', 'table'], default='json')
+    parser.add_argument('-o', '--output', help='write results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    paths = list(args.paths) + (['<sample>'] if args.sample else [])
+    if not paths:
+        parser.error('give at least one portfolio path or --sample')
+
+    filters = None
+    if args.industry or args.ticker or args.since or args.until:
+        filters = Filters(args.industry, args.ticker, args.since, args.until)
+
+    if args.jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(partial(analyze, prices_dir=args.prices, method=args.method, filters=filters), paths))
+    else:
+        results = [analyze(path, args.prices, args.method, filters) for path in paths]
+
+    if args.format == 'table':
+        text = format_table(results)
+    elif args.format == 'jsonl':
+        text = '\n'.join(json.dumps(result, default=_json_default) for result in results)
+    else:
+        text = json.dumps(results, indent=2, default=_json_default)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    return 1 if any('error' in result for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
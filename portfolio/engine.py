@@ -0,0 +1,229 @@
+"""Headless portfolio analytics: load -> normalize -> metrics -> aggregates.
+
+Nothing here imports Streamlit, Plotly or gspread, so the same numbers the
+dashboard shows can be computed from a cron job, a profiler or the CLI in
+portfolio/cli.py.
+"""
+import os
+from datetime import date
+
+import pandas as pd
+
+from portfolio.aggregates import closed_aggregates, open_aggregates, performance_aggregates
+from portfolio.ledger import Ledger
+from portfolio.schema import CLOSED_SCHEMA, OPEN_SCHEMA, coerce_frame
+from portfolio.snapshot_store import MANIFEST_FILE, SnapshotStore, is_typed, mark_typed
+
+OPEN_SHEET = "Open Positions"
+CLOSED_SHEET = "Closed Positions"
+TRANSACTIONS_SHEET = "Transactions"
+TRANSACTIONS_FILE = "transactions.csv"
+ACCOUNT_COLUMN = "Account"
+
+# First day capital was deployed, used for "Total Trading Days"
+TRADING_START = date(2023, 12, 20)
+
+
+def sample_portfolio():
+    """Small demo portfolio used when no real data is available"""
+    sample_open = pd.DataFrame({
+        'Stock Name': ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN'],
+        'Industry': ['Technology', 'Technology', 'Technology', 'Automotive', 'E-commerce'],
+        'Buying Date': ['2023-01-15', '2023-02-20', '2023-03-10', '2023-04-05', '2023-05-12'],
+        'Buying Price': [150.00, 2500.00, 250.00, 200.00, 3000.00],
+        'Investment Amount': [15000, 25000, 12500, 10000, 30000],
+        'Profit/Loss': [2500, -1500, 1800, -800, 2200],
+        'Growth(%)': [16.67, -6.00, 14.40, -8.00, 7.33],
+        'Investment Days': [365, 320, 280, 240, 200]
+    })
+
+    sample_closed = pd.DataFrame({
+        'Stock Name': ['META', 'NVDA', 'NFLX'],
+        'Industry': ['Technology', 'Technology', 'Entertainment'],
+        'Buying Date': ['2022-01-10', '2022-03-15', '2022-06-20'],
+        'Selling Date': ['2023-01-10', '2023-03-15', '2023-06-20'],
+        'Investment Amount': [20000, 15000, 8000],
+        'Selling Value': [22000, 18000, 7200],
+        'Profit/Loss Booked': [2000, 3000, -800],
+        'Growth(%)': [10.00, 20.00, -10.00],
+        'Investment Days': [365, 365, 365],
+        'Reason for selling': ['Profit booking', 'Target achieved', 'Stop loss'],
+        'Possible Profit/Loss': [2500, 3500, -600]
+    })
+
+    return sample_open, sample_closed
+
+
+def load_portfolio_file(path, method='fifo', quotes=None):
+    """Read (open_df, closed_df) from an Excel workbook, a CSV folder, a snapshot folder or a transaction ledger.
+
+    Ledgers (a Transactions sheet, transactions.csv, or any single CSV file)
+    are replayed with the given cost basis method and marked with ``quotes``.
+    """
+    if os.path.isdir(path):
+        if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+            frames = SnapshotStore(path).load()
+            if frames is None:
+                raise ValueError(f"{path}: snapshot was written by another schema version")
+            return frames
+        if os.path.exists(os.path.join(path, TRANSACTIONS_FILE)):
+            return Ledger(pd.read_csv(os.path.join(path, TRANSACTIONS_FILE)), method).frames(quotes)
+        return (
+            pd.read_csv(os.path.join(path, 'open_positions.csv')),
+            pd.read_csv(os.path.join(path, 'closed_positions.csv')),
+        )
+
+    if path.lower().endswith('.csv'):
+        return Ledger(pd.read_csv(path), method).frames(quotes)
+
+    if path.lower().endswith(('.xlsx', '.xlsm', '.xls')):
+        with pd.ExcelFile(path) as workbook:
+            if TRANSACTIONS_SHEET in workbook.sheet_names:
+                return Ledger(workbook.parse(TRANSACTIONS_SHEET), method).frames(quotes)
+            sheets = workbook.parse([OPEN_SHEET, CLOSED_SHEET])
+        return sheets[OPEN_SHEET], sheets[CLOSED_SHEET]
+
+    raise ValueError(f"{path}: expected an Excel workbook, a transactions CSV or a folder of CSV/snapshot files")
+
+
+def days_until_today(year, month, day):
+    """
+    Calculates the number of days between a specific date and today's date.
+    """
+    # Create a date object for the specific past date
+    x_date = date(year, month, day)
+
+    # Get today's date
+    today = date.today()
+
+    # Calculate the difference (returns a timedelta object)
+    delta = today - x_date
+
+    # Return the number of days
+    return delta.days
+
+
+def normalize(open_df, closed_df):
+    """Coerce both frames to the declared schema"""
+    # Snapshot frames are stored typed, so there is nothing to redo
+    if not is_typed(open_df):
+        open_df = coerce_frame(open_df, OPEN_SCHEMA)
+    if not is_typed(closed_df):
+        closed_df = coerce_frame(closed_df, CLOSED_SCHEMA)
+
+    return open_df, closed_df
+
+
+def compute_metrics(open_df, closed_df):
+    """Headline totals shown in the overview and sidebar"""
+    return {
+        'open_invested': open_df['Investment Amount'].sum(),
+        'open_pl': open_df['Profit/Loss'].sum(),
+        'closed_invested': closed_df['Investment Amount'].sum(),
+        'closed_pl': closed_df['Profit/Loss Booked'].sum() if 'Profit/Loss Booked' in closed_df.columns else 0,
+        'possible_pl': closed_df['Possible Profit/Loss'].sum() if 'Possible Profit/Loss' in closed_df.columns else 0,
+        'total_days': days_until_today(TRADING_START.year, TRADING_START.month, TRADING_START.day)
+    }
+
+
+def process_data(open_df, closed_df):
+    open_df, closed_df = normalize(open_df, closed_df)
+    return open_df, closed_df, compute_metrics(open_df, closed_df)
+
+
+def combine_accounts(frames_by_account):
+    """Stack normalized (open_df, closed_df) pairs into consolidated frames with an Account column"""
+    names = list(frames_by_account)
+    combined = []
+    for i in range(2):
+        parts = [frames_by_account[name][i].assign(**{ACCOUNT_COLUMN: name}) for name in names]
+        frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        # concat falls back to object when category sets differ, so restore them
+        for col in frame.columns:
+            if all(isinstance(part[col].dtype, pd.CategoricalDtype) for part in parts if col in part.columns):
+                frame[col] = frame[col].astype('category')
+        if ACCOUNT_COLUMN in frame.columns:
+            frame[ACCOUNT_COLUMN] = pd.Categorical(frame[ACCOUNT_COLUMN], categories=names)
+        if parts and all(is_typed(part) for part in parts):
+            mark_typed(frame)
+        combined.append(frame)
+    return tuple(combined)
+
+
+def account_breakdown(open_df, closed_df):
+    """compute_metrics() for every account at once, one row per account"""
+    accounts = pd.Index(
+        open_df[ACCOUNT_COLUMN].cat.categories if ACCOUNT_COLUMN in open_df.columns else [],
+        name=ACCOUNT_COLUMN
+    )
+
+    def sums(df, column):
+        if column not in df.columns or ACCOUNT_COLUMN not in df.columns:
+            return pd.Series(0.0, index=accounts)
+        return df.groupby(ACCOUNT_COLUMN, observed=False)[column].sum().reindex(accounts, fill_value=0)
+
+    def counts(df):
+        if ACCOUNT_COLUMN not in df.columns:
+            return pd.Series(0, index=accounts)
+        return df[ACCOUNT_COLUMN].value_counts().reindex(accounts, fill_value=0)
+
+    breakdown = pd.DataFrame({
+        'open_invested': sums(open_df, 'Investment Amount'),
+        'open_pl': sums(open_df, 'Profit/Loss'),
+        'closed_invested': sums(closed_df, 'Investment Amount'),
+        'closed_pl': sums(closed_df, 'Profit/Loss Booked'),
+        'possible_pl': sums(closed_df, 'Possible Profit/Loss'),
+        'active_positions': counts(open_df),
+        'completed_trades': counts(closed_df),
+    }, index=accounts)
+    invested = breakdown['open_invested'] + breakdown['closed_invested']
+    breakdown['net_pl'] = breakdown['open_pl'] + breakdown['closed_pl']
+    breakdown['net_return_pct'] = (breakdown['net_pl'] / invested.where(invested > 0) * 100).fillna(0)
+    return breakdown
+
+
+def compute_aggregates(open_df, closed_df, prices=None):
+    """Analytics aggregates without any caching"""
+    return {**open_aggregates(open_df), **closed_aggregates(closed_df), **performance_aggregates(open_df, closed_df, prices)}
+
+
+def _records(df, columns):
+    return df[[col for col in columns if col in df.columns]].to_dict(orient='records')
+
+
+def summarize(open_df, closed_df, prices=None):
+    """Every dashboard number for one portfolio as plain, JSON-friendly values"""
+    open_df, closed_df, metrics = process_data(open_df, closed_df)
+    aggregates = compute_aggregates(open_df, closed_df, prices)
+
+    invested = metrics['open_invested'] + metrics['closed_invested']
+    total_pl = metrics['open_pl'] + metrics['closed_pl']
+    monthly = aggregates['monthly_pl']
+    highlights = ['Stock Name', 'Industry', 'Profit/Loss', 'Profit/Loss Booked', 'Growth(%)', 'Investment Days']
+
+    summary = {
+        **{key: value.item() if hasattr(value, 'item') else value for key, value in metrics.items()},
+        'total_invested': float(invested),
+        'net_pl': float(total_pl),
+        'net_return_pct': float(total_pl / invested * 100) if invested > 0 else 0.0,
+        'active_positions': len(open_df),
+        'completed_trades': len(closed_df),
+        'concentration_risk': aggregates['concentration_risk'],
+        'win_rate': aggregates['win_rate'],
+        'avg_holding': aggregates['avg_holding'],
+        **aggregates['risk'],
+        **aggregates['returns'],
+        'sector_allocation': dict(zip(
+            aggregates['sector_allocation']['Industry'].astype(str),
+            aggregates['sector_allocation']['Investment Amount'].astype(float),
+        )),
+        'monthly_pl': {} if monthly is None else dict(zip(monthly['Month'], monthly['Profit/Loss Booked'].astype(float))),
+        'top_gainers': _records(aggregates['top_gainers'], highlights),
+        'underperformers': _records(aggregates['underperformers'], highlights),
+        'best_trades': _records(aggregates['best_trades'], highlights),
+        'learning_trades': _records(aggregates['learning_trades'], highlights),
+    }
+    for key in ('concentration_risk', 'win_rate', 'avg_holding'):
+        if summary[key] is not None:
+            summary[key] = float(summary[key])
+    return summary
@@ -0,0 +1,147 @@
+"""Row selection for the dashboard's date, industry and ticker filters.
+
+A PortfolioIndex is built once per data version. For each frame it keeps the
+row positions sorted by date (Buying Date for open positions, Selling Date
+for closed trades) and the integer codes of the Industry and Stock Name
+categories. A date range then becomes two binary searches, an industry or
+ticker choice a lookup table indexed by category code, and the partial masks
+are combined with bitwise AND; no column is compared value by value. Recent
+selections are kept, so reruns that do not touch the filters cost nothing.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from portfolio.sqlite_store import DATE_COLUMNS
+
+# (column, Filters field) pairs matched through category codes
+CATEGORY_FILTERS = (('Industry', 'industries'), ('Stock Name', 'tickers'))
+
+
+def is_filtered(filters):
+    return filters is not None and any(value not in (None, (), []) for value in filters)
+
+
+def filter_key(filters):
+    """Short stable token for a Filters tuple, '' when it restricts nothing"""
+    if not is_filtered(filters):
+        return ''
+    parts = [sorted(map(str, filters.industries or ())), sorted(map(str, filters.tickers or ())),
+             None if filters.start is None else pd.Timestamp(filters.start).isoformat(),
+             None if filters.end is None else pd.Timestamp(filters.end).isoformat()]
+    return hashlib.blake2b(repr(parts).encode(), digest_size=6).hexdigest()
+
+
+def _and(mask, selected):
+    if mask is None:
+        return selected
+    np.logical_and(mask, selected, out=mask)
+    return mask
+
+
+class FrameIndex:
+    """Date order and category codes of one frame"""
+
+    def __init__(self, df, date_column):
+        self.rows = len(df)
+        self.codes = {}
+        self.categories = {}
+        for column, _ in CATEGORY_FILTERS:
+            if column in df.columns:
+                values = df[column]
+                if not isinstance(values.dtype, pd.CategoricalDtype):
+                    values = values.astype('category')
+                self.codes[column] = values.cat.codes.to_numpy()
+                self.categories[column] = values.cat.categories
+
+        # Rows without a date are left out of the order, so any date range excludes them
+        self.order = np.empty(0, dtype=np.intp)
+        self.dates = np.empty(0, dtype='datetime64[ns]')
+        if date_column in df.columns:
+            dates = pd.to_datetime(df[date_column], errors='coerce').to_numpy(dtype='datetime64[ns]')
+            dated = np.flatnonzero(~np.isnat(dates))
+            self.order = dated[np.argsort(dates[dated], kind='stable')]
+            self.dates = dates[self.order]
+
+    def date_bounds(self):
+        return (self.dates[0], self.dates[-1]) if len(self.dates) else None
+
+    def mask(self, filters):
+        """Boolean mask of the rows passing the filters, None when every row does"""
+        mask = None
+        for column, field in CATEGORY_FILTERS:
+            values = getattr(filters, field)
+            if not values:
+                continue
+            # One slot per category plus a trailing False one, which blank rows (code -1) land on
+            lookup = np.zeros(len(self.categories.get(column, ())) + 1, dtype=bool)
+            if column in self.categories:
+                found = self.categories[column].get_indexer([str(value) for value in values])
+                lookup[found[found >= 0]] = True
+            codes = self.codes.get(column, np.full(self.rows, -1, dtype=np.int8))
+            mask = _and(mask, lookup[codes])
+
+        if filters.start is not None or filters.end is not None:
+            first, last = 0, len(self.dates)
+            if filters.start is not None:
+                first = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(filters.start), 'ns'), side='left')
+            if filters.end is not None:
+                last = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(filters.end), 'ns'), side='right')
+            selected = np.zeros(self.rows, dtype=bool)
+            selected[self.order[first:last]] = True
+            mask = _and(mask, selected)
+        return mask
+
+
+class PortfolioIndex:
+    """Filter indexes over one version of the open and closed positions"""
+
+    def __init__(self, open_df, closed_df, max_selections=8):
+        self.frames = {'open': open_df, 'closed': closed_df}
+        self.indexes = {kind: FrameIndex(df, DATE_COLUMNS[kind]) for kind, df in self.frames.items()}
+        self.max_selections = max_selections
+        self._selections = OrderedDict()
+        self._lock = threading.Lock()
+
+    def options(self, column):
+        """Sorted values of a category column across both frames"""
+        values = set()
+        for index in self.indexes.values():
+            if column in index.categories:
+                values.update(map(str, index.categories[column]))
+        return sorted(values)
+
+    def date_bounds(self):
+        """(first, last) date over both frames as datetime.date, None without dates"""
+        bounds = [index.date_bounds() for index in self.indexes.values()]
+        bounds = [bound for bound in bounds if bound is not None]
+        if not bounds:
+            return None
+        return (pd.Timestamp(min(first for first, _ in bounds)).date(),
+                pd.Timestamp(max(last for _, last in bounds)).date())
+
+    def select(self, filters):
+        """(open_df, closed_df) restricted to the filters; the frames themselves when nothing is filtered"""
+        key = filter_key(filters)
+        if not key:
+            return self.frames['open'], self.frames['closed']
+        with self._lock:
+            if key in self._selections:
+                self._selections.move_to_end(key)
+                return self._selections[key]
+
+        selected = []
+        for kind, df in self.frames.items():
+            mask = self.indexes[kind].mask(filters)
+            selected.append(df if mask is None else df.iloc[np.flatnonzero(mask)])
+        selected = tuple(selected)
+
+        with self._lock:
+            self._selections[key] = selected
+            while len(self._selections) > self.max_selections:
+                self._selections.popitem(last=False)
+        return selected
+
@@ -0,0 +1,333 @@
+"""Lot-level cost basis from a ledger of buy and sell transactions.
+
+Every buy is a lot. Sells are matched against lots first-in-first-out,
+last-in-first-out or at the running average cost, and the result is emitted
+as the same open/closed position frames the sheets provide, one row per open
+lot (per ticker for average cost) and one row per matched piece of a sale.
+
+All state lives in flat NumPy arrays sorted by ticker and date. FIFO matching
+is an interval intersection of cumulative bought and sold quantities, done
+with two binary searches per sale; LIFO and average cost need the order of
+events and run as a single pass over those arrays.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from portfolio.prices import normalize_symbol, pick_column
+from portfolio.snapshot_store import mark_typed
+
+METHODS = ('fifo', 'lifo', 'average')
+
+# Accepted headers for each transaction field, compared case-insensitively
+TRANSACTION_COLUMNS = {
+    'date': ('date', 'trade date', 'transaction date'),
+    'symbol': ('stock name', 'symbol', 'ticker'),
+    'side': ('side', 'type', 'action', 'transaction type'),
+    'quantity': ('quantity', 'qty', 'shares'),
+    'price': ('price', 'trade price'),
+    'fees': ('fees', 'charges', 'brokerage'),
+    'industry': ('industry', 'sector'),
+    'reason': ('reason for selling', 'reason', 'notes'),
+}
+
+# Quantities below this are float noise from summing fractional shares
+EPSILON = 1e-6
+
+
+def parse_transactions(df):
+    """Flat arrays of valid transactions sorted by ticker, date and ledger order"""
+    picked = {key: pick_column(df.columns, names) for key, names in TRANSACTION_COLUMNS.items()}
+    missing = [key for key in ('date', 'symbol', 'quantity', 'price') if picked[key] is None]
+    if missing:
+        raise ValueError(f"transactions need {', '.join(missing)} columns")
+
+    quantity = pd.to_numeric(df[picked['quantity']], errors='coerce').to_numpy(dtype=float)
+    if picked['side'] is not None:
+        sells = df[picked['side']].astype(str).str.strip().str.lower().str.startswith('s').to_numpy()
+    else:
+        # Without a side column, negative quantities are sells
+        sells = quantity < 0
+    quantity = np.abs(quantity)
+    price = pd.to_numeric(df[picked['price']], errors='coerce').to_numpy(dtype=float)
+    fees = (pd.to_numeric(df[picked['fees']], errors='coerce').fillna(0).to_numpy(dtype=float)
+            if picked['fees'] is not None else np.zeros(len(df)))
+    days = pd.to_datetime(df[picked['date']], errors='coerce', format='mixed').to_numpy().astype('datetime64[D]')
+
+    valid = ~np.isnat(days) & (quantity > EPSILON) & ~np.isnan(price)
+    # Normalize each distinct ticker once, then remap the codes
+    raw_codes, raw_symbols = pd.factorize(df[picked['symbol']].to_numpy()[valid])
+    label_codes, symbols = pd.factorize(pd.Index(raw_symbols).astype(str).map(normalize_symbol))
+    codes = label_codes[raw_codes]
+    order = np.lexsort((np.arange(len(codes)), days[valid], codes))
+
+    industries = np.full(len(symbols), None, dtype=object)
+    if picked['industry'] is not None:
+        labels = df[picked['industry']].to_numpy()[valid]
+        known = pd.notna(labels)
+        # The last industry written for a ticker wins
+        industries[codes[known]] = labels[known]
+
+    reasons = df[picked['reason']].to_numpy()[valid][order] if picked['reason'] is not None else np.full(len(order), None)
+    return {
+        'symbols': pd.Index(symbols),
+        'industries': industries,
+        'symbol': codes[order].astype(np.int32),
+        'day': days[valid][order],
+        'sell': sells[valid][order],
+        'quantity': quantity[valid][order],
+        'price': price[valid][order],
+        'fees': fees[valid][order],
+        'reason': reasons,
+    }
+
+
+def _holdings(symbol, signed):
+    """Shares held after each transaction, restarting at every new ticker"""
+    running = np.cumsum(signed)
+    starts = np.flatnonzero(np.r_[True, symbol[1:] != symbol[:-1]])
+    before = np.r_[0.0, running][starts]
+    return running - np.repeat(before, np.diff(np.r_[starts, len(symbol)]))
+
+
+def _match_fifo(lot_symbol, lot_qty, sell_symbol, sell_qty, symbols):
+    """(lot, sale, quantity) pieces, oldest lot first"""
+    bought = np.bincount(lot_symbol, lot_qty, minlength=symbols)
+    sold = np.bincount(sell_symbol, sell_qty, minlength=symbols)
+    offset = np.cumsum(bought) - bought
+
+    # Lay every ticker's lots and sales on one shared quantity axis
+    lot_end = np.cumsum(lot_qty)
+    lot_start = lot_end - lot_qty
+    sell_end = np.cumsum(sell_qty) - (np.cumsum(sold) - sold)[sell_symbol] + offset[sell_symbol]
+    sell_start = sell_end - sell_qty
+
+    first = np.searchsorted(lot_end, sell_start + EPSILON, side='right')
+    last = np.searchsorted(lot_start, sell_end - EPSILON, side='left')
+    counts = np.maximum(last - first, 0)
+    sale = np.repeat(np.arange(len(sell_qty)), counts)
+    lot = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    qty = np.minimum(lot_end[lot], sell_end[sale]) - np.maximum(lot_start[lot], sell_start[sale])
+    keep = qty > EPSILON
+    return lot[keep], sale[keep], qty[keep]
+
+
+def _match_lifo(sell, symbol, quantity):
+    """(lot, sale, quantity) pieces, newest lot first"""
+    lots, sales, pieces = [], [], []
+    stack, remaining = [], []
+    current = None
+    lot_i = sale_i = 0
+    for is_sell, code, qty in zip(sell.tolist(), symbol.tolist(), quantity.tolist()):
+        if code != current:
+            current, stack = code, []
+        if not is_sell:
+            stack.append(lot_i)
+            remaining.append(qty)
+            lot_i += 1
+            continue
+        while qty > EPSILON:
+            top = stack[-1]
+            take = min(remaining[top], qty)
+            lots.append(top)
+            sales.append(sale_i)
+            pieces.append(take)
+            remaining[top] -= take
+            qty -= take
+            if remaining[top] <= EPSILON:
+                stack.pop()
+        sale_i += 1
+    return np.array(lots, dtype=np.int64), np.array(sales, dtype=np.int64), np.array(pieces, dtype=float)
+
+
+def _average_cost(sell, symbol, quantity, amount, symbols):
+    """Cost of every sale at the running average, and the cost still held per ticker"""
+    sold_cost = []
+    held_cost = np.zeros(symbols)
+    current, shares, cost = None, 0.0, 0.0
+    for is_sell, code, qty, value in zip(sell.tolist(), symbol.tolist(), quantity.tolist(), amount.tolist()):
+        if code != current:
+            if current is not None:
+                held_cost[current] = cost
+            current, shares, cost = code, 0.0, 0.0
+        if is_sell:
+            # Selling at the average leaves the average unchanged
+            taken = cost * qty / shares
+            sold_cost.append(taken)
+            cost -= taken
+            shares -= qty
+            if shares <= EPSILON:
+                shares, cost = 0.0, 0.0
+        else:
+            shares += qty
+            cost += value
+    if current is not None:
+        held_cost[current] = cost
+    return np.array(sold_cost, dtype=float), held_cost
+
+
+class Ledger:
+    """Replayed transaction ledger with per-lot positions"""
+
+    def __init__(self, transactions, method='fifo'):
+        if method not in METHODS:
+            raise ValueError(f"unknown cost basis method {method!r}, expected one of {', '.join(METHODS)}")
+        self.method = method
+        t = parse_transactions(transactions)
+        self.symbols = t['symbols']
+        self.industries = t['industries']
+
+        sell = t['sell']
+        signed = np.where(sell, -t['quantity'], t['quantity'])
+        held = _holdings(t['symbol'], signed)
+        if (held < -EPSILON).any():
+            i = int(np.argmax(held < -EPSILON))
+            raise ValueError(f"{self.symbols[t['symbol'][i]]}: sell on {t['day'][i]} exceeds the "
+                             f"{held[i] + t['quantity'][i]:g} shares held")
+
+        gross = t['quantity'] * t['price']
+        buy = ~sell
+        self.lots = {
+            'symbol': t['symbol'][buy],
+            'day': t['day'][buy],
+            'quantity': t['quantity'][buy],
+            'cost': gross[buy] + t['fees'][buy],
+        }
+        self.sales = {
+            'symbol': t['symbol'][sell],
+            'day': t['day'][sell],
+            'quantity': t['quantity'][sell],
+            'proceeds': gross[sell] - t['fees'][sell],
+            'reason': t['reason'][sell],
+        }
+
+        if method == 'lifo':
+            self.matches = _match_lifo(sell, t['symbol'], t['quantity'])
+        else:
+            self.matches = _match_fifo(self.lots['symbol'], self.lots['quantity'],
+                                       self.sales['symbol'], self.sales['quantity'], len(self.symbols))
+        lot, _, qty = self.matches
+        self.remaining = self.lots['quantity'] - np.bincount(lot, qty, minlength=len(self.lots['quantity']))
+
+        if method == 'average':
+            self.sold_cost, self.held_cost = _average_cost(
+                sell, t['symbol'], t['quantity'], np.where(sell, 0.0, gross + t['fees']), len(self.symbols))
+
+    def _prices(self, prices):
+        """Current price per ticker code, NaN where unknown"""
+        prices = prices or {}
+        return np.array([prices.get(symbol, np.nan) for symbol in self.symbols], dtype=float)
+
+    def _labels(self, codes):
+        industries, names = pd.factorize(pd.Series(self.industries, dtype=object))
+        return (
+            pd.Categorical.from_codes(codes, categories=self.symbols.astype(str)),
+            pd.Categorical.from_codes(industries[codes], categories=pd.Index(names).astype(str)),
+        )
+
+    def open_positions(self, prices=None, today=None):
+        """Open lots as an Open Positions frame; P&L is marked where a price is given"""
+        today = np.datetime64(today or date.today(), 'D')
+        unit_cost = self.lots['cost'] / self.lots['quantity']
+        held = self.remaining > EPSILON
+        lots = np.flatnonzero(held)
+
+        if self.method == 'average':
+            # One row per ticker at its average cost, dated by its oldest lot still held
+            codes = np.unique(self.lots['symbol'][lots])
+            quantity = np.bincount(self.lots['symbol'][lots], self.remaining[lots], minlength=len(self.symbols))[codes]
+            invested = self.held_cost[codes]
+            # Lots are sorted by ticker then date, so the first held lot of each ticker is its oldest
+            first = np.unique(self.lots['symbol'][lots], return_index=True)[1]
+            bought = self.lots['day'][lots[first]]
+        else:
+            codes = self.lots['symbol'][lots]
+            quantity = self.remaining[lots]
+            invested = quantity * unit_cost[lots]
+            bought = self.lots['day'][lots]
+
+        current = self._prices(prices)[codes]
+        pl = quantity * current - invested
+        stock, industry = self._labels(codes)
+        return mark_typed(pd.DataFrame({
+            'Stock Name': stock,
+            'Industry': industry,
+            'Buying Date': bought.astype('datetime64[ns]'),
+            'Buying Price': invested / quantity,
+            'Quantity': quantity,
+            'Current Share Price': current,
+            'Investment Amount': invested,
+            'Profit/Loss': np.nan_to_num(pl),
+            'Growth(%)': np.nan_to_num(pl / invested * 100).astype('float32'),
+            'Investment Days': (today - bought).astype(np.int64).astype('int32'),
+        }))
+
+    def closed_positions(self, prices=None):
+        """Realized sales as a Closed Positions frame, one row per matched piece (per sale for average cost)"""
+        lot, sale, qty = self.matches
+        unit_proceeds = self.sales['proceeds'] / self.sales['quantity']
+
+        if self.method == 'average':
+            # The matched pieces only date the sale: the oldest lot it drew from
+            starts = np.flatnonzero(np.r_[True, sale[1:] != sale[:-1]]) if len(sale) else np.empty(0, int)
+            rows = sale[starts]
+            bought = np.minimum.reduceat(self.lots['day'][lot].view(np.int64), starts).view('datetime64[D]') \
+                if len(starts) else np.empty(0, 'datetime64[D]')
+            quantity = self.sales['quantity'][rows]
+            invested = self.sold_cost[rows]
+        else:
+            rows = sale
+            bought = self.lots['day'][lot]
+            quantity = qty
+            invested = qty * self.lots['cost'][lot] / self.lots['quantity'][lot]
+
+        codes = self.sales['symbol'][rows]
+        proceeds = quantity * unit_proceeds[rows]
+        booked = proceeds - invested
+        sold = self.sales['day'][rows]
+        stock, industry = self._labels(codes)
+        return mark_typed(pd.DataFrame({
+            'Stock Name': stock,
+            'Industry': industry,
+            'Buying Date': bought.astype('datetime64[ns]'),
+            'Selling Date': sold.astype('datetime64[ns]'),
+            'Quantity': quantity,
+            'Investment Amount': invested,
+            'Selling Value': proceeds,
+            'Profit/Loss Booked': booked,
+            'Growth(%)': (np.divide(booked, invested, out=np.zeros_like(booked), where=invested > 0) * 100).astype('float32'),
+            'Investment Days': (sold - bought).astype(np.int64).astype('int32'),
+            'Reason for selling': pd.Categorical(self.sales['reason'][rows]),
+            # What the shares would be worth today had they been held
+            'Possible Profit/Loss': np.nan_to_num(quantity * self._prices(prices)[codes] - invested),
+        }))
+
+    def frames(self, prices=None, today=None):
+        """(open_df, closed_df) in the shape the dashboard reads from the sheets"""
+        return self.open_positions(prices, today), self.closed_positions(prices)
+
+    def reconcile(self, prices=None, closed_df=None):
+        """Check that every rupee bought is either still held or was sold, and split realized/unrealized P&L"""
+        open_df, closed_df_ledger = self.frames(prices)
+        bought = float(self.lots['cost'].sum())
+        proceeds = float(self.sales['proceeds'].sum())
+        cost_of_sold = float(closed_df_ledger['Investment Amount'].sum())
+        open_cost = float(open_df['Investment Amount'].sum())
+        realized = float(closed_df_ledger['Profit/Loss Booked'].sum())
+        result = {
+            'method': self.method,
+            'bought': bought,
+            'proceeds': proceeds,
+            'cost_of_sold': cost_of_sold,
+            'open_cost': open_cost,
+            'realized_pl': realized,
+            'unrealized_pl': float(open_df['Profit/Loss'].sum()),
+            'cost_difference': bought - cost_of_sold - open_cost,
+            'realized_difference': proceeds - cost_of_sold - realized,
+        }
+        if closed_df is not None and 'Profit/Loss Booked' in closed_df.columns:
+            # Against the sheet's own booked P&L
+            result['sheet_realized_pl'] = float(closed_df['Profit/Loss Booked'].sum())
+            result['sheet_difference'] = realized - result['sheet_realized_pl']
+        return result
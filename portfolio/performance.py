@@ -0,0 +1,209 @@
+"""Daily equity curve, drawdown and risk ratios for the whole portfolio.
+
+Every position is marked daily: shares times the stored close where the price
+store has the ticker, otherwise a straight line from the amount invested to
+the selling value (closed) or current value (open). Positions are summed per
+day through difference arrays, so memory grows with days x tickers rather
+than days x positions, and daily P&L, capital at work and the time-weighted
+return index follow from those totals with no loop over positions.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from portfolio.prices import CLOSE, DATE, normalize_symbol
+
+TRADING_DAYS = 252
+ROLLING_WINDOW = 63
+
+CURVE_COLUMNS = [
+    'Value', 'Capital', 'P&L', 'Cumulative P&L', 'Daily Return', 'Equity',
+    'Cumulative Return(%)', 'Drawdown(%)', 'Rolling Volatility(%)',
+]
+
+
+def _symbols(names):
+    # Normalize each distinct name once
+    codes, uniques = pd.factorize(names.astype(str))
+    return pd.Series(np.asarray([normalize_symbol(name) for name in uniques], dtype=object)[codes], index=names.index)
+
+
+def _positions(open_df, closed_df, today):
+    """Start/end dates, invested and final value for every position with usable dates"""
+    def column(df, name, default=np.nan):
+        return df[name] if name in df.columns else pd.Series(default, index=df.index)
+
+    def numbers(values):
+        return pd.to_numeric(values, errors='coerce').astype(float)
+
+    open_invested = numbers(column(open_df, 'Investment Amount'))
+    closed_invested = numbers(column(closed_df, 'Investment Amount'))
+    closed_final = numbers(column(closed_df, 'Selling Value'))
+    closed_final = closed_final.fillna(closed_invested + numbers(column(closed_df, 'Profit/Loss Booked', 0)))
+
+    positions = pd.DataFrame({
+        'symbol': _symbols(pd.concat([column(open_df, 'Stock Name', ''), column(closed_df, 'Stock Name', '')],
+                                     ignore_index=True)),
+        'start': pd.to_datetime(pd.concat([column(open_df, 'Buying Date'), column(closed_df, 'Buying Date')],
+                                          ignore_index=True), errors='coerce'),
+        'end': pd.to_datetime(pd.concat([pd.Series(pd.Timestamp(today), index=open_df.index),
+                                         column(closed_df, 'Selling Date')], ignore_index=True), errors='coerce'),
+        'invested': pd.concat([open_invested, closed_invested], ignore_index=True),
+        'final': pd.concat([open_invested + numbers(column(open_df, 'Profit/Loss', 0)).fillna(0), closed_final],
+                           ignore_index=True),
+        'entry_price': pd.concat([numbers(column(open_df, 'Buying Price')),
+                                  pd.Series(np.nan, index=closed_df.index)], ignore_index=True),
+        'closed': np.r_[np.zeros(len(open_df), bool), np.ones(len(closed_df), bool)],
+    })
+    usable = positions['start'].notna() & positions['end'].notna() & (positions['invested'] > 0)
+    positions = positions[usable].reset_index(drop=True)
+    positions['final'] = positions['final'].fillna(positions['invested'])
+    return positions
+
+
+def _close_matrix(prices, symbols, days):
+    """Forward-filled closes, one column per symbol, NaN before a ticker's first bar"""
+    closes = np.full((len(days), len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        bars = prices.slice(symbol, None, None)
+        if not bars.shape[1]:
+            continue
+        i = np.searchsorted(bars[DATE], days, side='right') - 1
+        closes[:, j] = np.where(i >= 0, np.asarray(bars[CLOSE])[np.maximum(i, 0)], np.nan)
+    return closes
+
+
+def _spans(starts, ends, days):
+    """(n_days + 1) difference-array indices for inclusive day ranges"""
+    return np.minimum(starts, days), np.minimum(ends + 1, days)
+
+
+def _daily_values(positions, dates, prices):
+    """Total marked value of held positions per day, every position's value on its last day, and
+    how many positions were marked from stored closes.
+
+    Positions are never expanded to a days x positions matrix. Unpriced days
+    move in a straight line from cost to the final value, so each position adds
+    a constant and a slope over its holding range (two difference arrays);
+    priced days add shares to a days x symbols holdings matrix that is
+    multiplied by the closes.
+    """
+    n_days = len(dates)
+    start = positions['start_i'].to_numpy()
+    end = positions['end_i'].to_numpy()
+    invested = positions['invested'].to_numpy()
+    final = positions['final'].to_numpy()
+    slope = (final - invested) / np.maximum(end - start, 1)
+
+    # Day from which each position is marked at the stored close (n_days: never)
+    priced_from = np.full(len(positions), n_days)
+    value = np.zeros(n_days)
+    last_value = invested + slope * (end - start)
+    if prices is not None:
+        known = set(prices.symbols())
+        priced = np.flatnonzero(positions['symbol'].isin(known).to_numpy())
+        if len(priced):
+            column, symbols = pd.factorize(positions['symbol'].to_numpy()[priced])
+            days = np.asarray(dates.values.astype('datetime64[D]').astype(np.int64), dtype=float)
+            closes = _close_matrix(prices, symbols, days)
+            first_bar = np.where(np.isnan(closes).all(axis=0), n_days, np.isnan(closes).argmin(axis=0))
+            entry = positions['entry_price'].to_numpy()[priced]
+            entry = np.where(entry > 0, entry, closes[start[priced], column])
+            shares = invested[priced] / entry
+            usable = ~np.isnan(shares)
+            priced, column, shares = priced[usable], column[usable], shares[usable]
+
+            begin = np.maximum(start[priced], first_bar[column])
+            marked = begin <= end[priced]
+            priced, column, shares, begin = priced[marked], column[marked], shares[marked], begin[marked]
+            priced_from[priced] = begin
+            last_value[priced] = closes[end[priced], column] * shares
+
+            held = np.zeros((n_days + 1, len(symbols)))
+            lo, hi = _spans(begin, end[priced], n_days + 1)
+            np.add.at(held, (lo, column), shares)
+            np.add.at(held, (hi, column), -shares)
+            value += (np.cumsum(held, axis=0)[:n_days] * np.nan_to_num(closes)).sum(axis=1)
+
+    # Straight-line days: value = (invested - slope * start) + slope * day
+    ramp_end = np.minimum(end, priced_from - 1)
+    ramped = start <= ramp_end
+    lo, hi = _spans(start[ramped], ramp_end[ramped], n_days + 1)
+    base = (invested - slope * start)[ramped]
+    intercept = np.bincount(lo, base, n_days + 1) - np.bincount(hi, base, n_days + 1)
+    gradient = np.bincount(lo, slope[ramped], n_days + 1) - np.bincount(hi, slope[ramped], n_days + 1)
+    value += np.cumsum(intercept)[:n_days] + np.cumsum(gradient)[:n_days] * np.arange(n_days)
+
+    # A closed position is worth exactly what it sold for on its last day
+    closed = positions['closed'].to_numpy()
+    value += np.bincount(end[closed], (final - last_value)[closed], n_days)
+    last_value = np.where(closed, final, last_value)
+    return value, last_value, int((priced_from < n_days).sum())
+
+
+def equity_curve(open_df, closed_df, prices=None, today=None, window=ROLLING_WINDOW):
+    """Daily value, P&L and time-weighted return index of the portfolio"""
+    today = today or date.today()
+    positions = _positions(open_df, closed_df, today)
+    if positions.empty:
+        return pd.DataFrame(columns=CURVE_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+
+    dates = pd.bdate_range(positions['start'].min(), max(positions['end'].max(), positions['start'].max()), name='Date')
+    positions['start_i'] = np.minimum(dates.searchsorted(positions['start'], side='left'), len(dates) - 1)
+    positions['end_i'] = np.maximum(dates.searchsorted(positions['end'], side='right') - 1, positions['start_i'])
+    value, last_value, priced = _daily_values(positions, dates, prices)
+
+    # Capital at the start of a day: yesterday's value of everything still held, plus today's buys
+    n_days = len(dates)
+    bought = np.bincount(positions['start_i'], positions['invested'], n_days)
+    ended = np.bincount(positions['end_i'], last_value, n_days)
+    capital = bought + np.r_[0.0, (value - ended)[:-1]]
+
+    pnl = value - capital
+    returns = np.divide(pnl, capital, out=np.zeros_like(pnl), where=capital > 0)
+    equity = np.cumprod(1 + returns)
+
+    curve = pd.DataFrame({
+        'Value': value,
+        'Capital': capital,
+        'P&L': pnl,
+        'Cumulative P&L': np.cumsum(pnl),
+        'Daily Return': returns,
+        'Equity': equity,
+        'Cumulative Return(%)': (equity - 1) * 100,
+        'Drawdown(%)': (equity / np.maximum.accumulate(equity) - 1) * 100,
+    }, index=dates)
+    curve['Rolling Volatility(%)'] = (
+        curve['Daily Return'].where(capital > 0).rolling(window, min_periods=window // 3).std()
+        * np.sqrt(TRADING_DAYS) * 100
+    )
+    curve.attrs['priced_positions'] = priced
+    return curve
+
+
+def risk_metrics(curve, risk_free=0.0):
+    """Cumulative return, max drawdown, volatility, Sharpe and Sortino from an equity curve
+
+    A curve with no position marked from stored closes is a set of straight
+    lines, so only its cumulative return is reported; the risk figures would
+    describe the interpolation, not the market.
+    """
+    metrics = dict.fromkeys(['cumulative_return_pct', 'max_drawdown_pct', 'volatility_pct', 'sharpe', 'sortino'])
+    returns = curve['Daily Return'][curve['Capital'] > 0].to_numpy()
+    if len(returns) < 2:
+        return metrics
+    metrics['cumulative_return_pct'] = float(curve['Cumulative Return(%)'].iloc[-1])
+    if not curve.attrs.get('priced_positions'):
+        return metrics
+
+    excess = returns - risk_free / TRADING_DAYS
+    volatility = returns.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2))
+    metrics.update({
+        'max_drawdown_pct': float(curve['Drawdown(%)'].min()),
+        'volatility_pct': float(volatility * np.sqrt(TRADING_DAYS) * 100),
+        'sharpe': float(excess.mean() / volatility * np.sqrt(TRADING_DAYS)) if volatility > 0 else None,
+        'sortino': float(excess.mean() / downside * np.sqrt(TRADING_DAYS)) if downside > 0 else None,
+    })
+    return metrics
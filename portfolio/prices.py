@@ -0,0 +1,246 @@
+"""Daily OHLC price history, one memory-mapped NumPy file per ticker.
+
+Each ticker is a single ``<SYMBOL>.npy`` holding a (6, n) float64 matrix whose
+rows are date (days since 1970-01-01), open, high, low, close and volume,
+sorted by date. Every field is contiguous on disk, so a date range is two
+binary searches over the date row and a zero-copy view of the columns in
+between; only the pages that are actually read get loaded into memory.
+
+    python -m portfolio.prices import .prices quotes.csv AAPL.csv
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ('date', 'open', 'high', 'low', 'close', 'volume')
+DATE, OPEN, HIGH, LOW, CLOSE, VOLUME = range(len(FIELDS))
+
+# CSV headers accepted for each field, compared case-insensitively
+CSV_COLUMNS = {
+    'symbol': ('symbol', 'ticker', 'stock name'),
+    'date': ('date', 'datetime', 'timestamp'),
+    'open': ('open',),
+    'high': ('high',),
+    'low': ('low',),
+    'close': ('close', 'adj close', 'price'),
+    'volume': ('volume',),
+}
+
+
+def normalize_symbol(symbol):
+    return str(symbol).strip().upper()
+
+
+def _file_name(symbol):
+    return re.sub(r'[^A-Z0-9._-]', '_', normalize_symbol(symbol)) + '.npy'
+
+
+def to_day(value):
+    """Days since the epoch for a date-like value"""
+    return float(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+
+def to_dates(days):
+    return np.asarray(days).astype(np.int64).astype('datetime64[D]')
+
+
+def pick_column(columns, names):
+    """First of ``names`` present in columns, matched case-insensitively"""
+    lowered = {str(col).strip().lower(): col for col in columns}
+    for name in names:
+        if name in lowered:
+            return lowered[name]
+    return None
+
+
+def price_matrix(df):
+    """(6, n) matrix from a frame with date and close columns, open/high/low/volume optional"""
+    picked = {field: pick_column(df.columns, CSV_COLUMNS[field]) for field in FIELDS}
+    if picked['date'] is None or picked['close'] is None:
+        raise ValueError("price data needs at least a date and a close column")
+
+    dates = pd.to_datetime(df[picked['date']], errors='coerce', format='mixed')
+    close = pd.to_numeric(df[picked['close']], errors='coerce').to_numpy(dtype=float)
+    valid = dates.notna().to_numpy() & ~np.isnan(close)
+
+    matrix = np.empty((len(FIELDS), int(valid.sum())))
+    matrix[DATE] = dates[valid].to_numpy().astype('datetime64[D]').astype(np.int64)
+    matrix[CLOSE] = close[valid]
+    for field in ('open', 'high', 'low', 'volume'):
+        row = FIELDS.index(field)
+        if picked[field] is None:
+            # Close-only sources still get a usable bar
+            matrix[row] = np.nan if field == 'volume' else matrix[CLOSE]
+        else:
+            matrix[row] = pd.to_numeric(df[picked[field]], errors='coerce').to_numpy(dtype=float)[valid]
+    return matrix
+
+
+def merge_prices(existing, new):
+    """Sorted union of two price matrices; on a repeated date the new bar wins"""
+    combined = new if existing is None else np.concatenate([existing, new], axis=1)
+    combined = combined[:, np.argsort(combined[DATE], kind='stable')]
+    # Within a run of equal dates keep the last one, which came from ``new``
+    keep = np.append(combined[DATE, 1:] != combined[DATE, :-1], True) if combined.shape[1] else np.ones(0, bool)
+    return np.ascontiguousarray(combined[:, keep])
+
+
+class PriceStore:
+    """Directory of memory-mapped per-ticker OHLC histories"""
+
+    def __init__(self, path):
+        self.path = path
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def _file(self, symbol):
+        return os.path.join(self.path, _file_name(symbol))
+
+    def symbols(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.path) if name.endswith('.npy'))
+
+    def version(self):
+        """Cheap fingerprint of the store that changes whenever a ticker is rewritten"""
+        if not os.path.isdir(self.path):
+            return None
+        stamps = sorted((entry.name, entry.stat().st_mtime_ns) for entry in os.scandir(self.path)
+                        if entry.name.endswith('.npy'))
+        if not stamps:
+            return None
+        return hashlib.blake2b(repr(stamps).encode(), digest_size=8).hexdigest()
+
+    def series(self, symbol):
+        """The whole (6, n) memory map for a ticker, or None if it has no history"""
+        path = self._file(symbol)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        # Re-map whenever the file was rewritten by write()
+        prices = np.load(path, mmap_mode='r')
+        with self._lock:
+            self._maps[path] = (mtime, prices)
+        return prices
+
+    def window(self, symbol, start=None, end=None):
+        """Column bounds (lo, hi) of the bars from start to end inclusive"""
+        prices = self.series(symbol)
+        if prices is None:
+            return 0, 0
+        days = prices[DATE]
+        lo = 0 if start is None else int(np.searchsorted(days, to_day(start), side='left'))
+        hi = len(days) if end is None else int(np.searchsorted(days, to_day(end), side='right'))
+        return lo, max(lo, hi)
+
+    def slice(self, symbol, start=None, end=None):
+        """Zero-copy (6, k) view of the bars from start to end inclusive"""
+        prices = self.series(symbol)
+        if prices is None:
+            return np.empty((len(FIELDS), 0))
+        lo, hi = self.window(symbol, start, end)
+        return prices[:, lo:hi]
+
+    def frame(self, symbol, start=None, end=None):
+        """Bars as a DataFrame indexed by date"""
+        bars = self.slice(symbol, start, end)
+        return pd.DataFrame(
+            {field.title(): np.asarray(bars[i]) for i, field in enumerate(FIELDS) if i != DATE},
+            index=pd.DatetimeIndex(to_dates(bars[DATE]), name='Date'),
+        )
+
+    def close_on(self, symbol, when):
+        """Last close on or before ``when``, NaN without one"""
+        prices = self.series(symbol)
+        if prices is None:
+            return np.nan
+        i = int(np.searchsorted(prices[DATE], to_day(when), side='right')) - 1
+        return float(prices[CLOSE, i]) if i >= 0 else np.nan
+
+    def closes_on(self, symbols, when):
+        """close_on() for many tickers at once as a Series"""
+        return pd.Series({symbol: self.close_on(symbol, when) for symbol in symbols}, dtype=float)
+
+    def latest(self, symbol):
+        """(date, close) of the newest bar, or None"""
+        prices = self.series(symbol)
+        if prices is None or not prices.shape[1]:
+            return None
+        return to_dates(prices[DATE, -1:])[0], float(prices[CLOSE, -1])
+
+    def write(self, symbol, matrix):
+        """Merge a (6, n) price matrix into the ticker's history; returns its bar count"""
+        os.makedirs(self.path, exist_ok=True)
+        existing = self.series(symbol)
+        merged = merge_prices(None if existing is None else np.array(existing), matrix)
+
+        # Write next to the target and swap it in, so readers never see a partial file
+        path = self._file(symbol)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, merged)
+        os.replace(tmp, path)
+        with self._lock:
+            self._maps.pop(path, None)
+        return merged.shape[1]
+
+    def write_frame(self, symbol, df):
+        return self.write(symbol, price_matrix(df))
+
+    def import_csv(self, path, symbol=None):
+        """Bulk import a CSV of daily bars; returns {symbol: bar count}.
+
+        Files with a Symbol/Ticker column may hold many tickers; otherwise the
+        ticker is ``symbol`` or the file name.
+        """
+        df = pd.read_csv(path)
+        symbol_col = pick_column(df.columns, CSV_COLUMNS['symbol'])
+        if symbol_col is None:
+            symbol = symbol or os.path.splitext(os.path.basename(path))[0]
+            return {normalize_symbol(symbol): self.write_frame(symbol, df)}
+
+        counts = {}
+        for name, rows in df.groupby(df[symbol_col].astype(str).map(normalize_symbol), sort=False):
+            counts[name] = self.write_frame(name, rows)
+        return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m portfolio.prices', description='Manage the local price history store.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    imports = commands.add_parser('import', help='import daily OHLC CSV files')
+    imports.add_argument('store', help='price store directory')
+    imports.add_argument('files', nargs='+', help='CSV files with Date and Close columns (Symbol optional)')
+    imports.add_argument('--symbol', help='ticker for single-ticker files without a Symbol column')
+
+    show = commands.add_parser('show', help='print bars for a ticker')
+    show.add_argument('store')
+    show.add_argument('symbol')
+    show.add_argument('--start')
+    show.add_argument('--end')
+    args = parser.parse_args(argv)
+
+    store = PriceStore(args.store)
+    if args.command == 'import':
+        for path in args.files:
+            for symbol, count in store.import_csv(path, args.symbol).items():
+                print(f'{symbol}: {count:,} bars')
+    else:
+        print(store.frame(args.symbol, args.start, args.end).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""Mark-to-market pricing for open positions.
+
+Quotes come from a pluggable provider that answers one bulk request for many
+tickers. QuoteCache keeps each quote for a per-symbol TTL so a rerun only asks
+the provider for symbols that expired, and MarkToMarket rewrites Current Share
+Price, Profit/Loss and Growth(%) for just the rows whose quote moved.
+
+A provider is any object with ``quotes(symbols) -> {symbol: price}``; missing
+symbols are simply left out of the result.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from portfolio.aggregates import data_version
+from portfolio.prices import normalize_symbol
+from portfolio.snapshot_store import is_typed, mark_typed
+
+DEFAULT_TTL = 60
+
+MARKED_COLUMNS = ['Current Share Price', 'Profit/Loss', 'Growth(%)']
+
+
+class StaticQuoteProvider:
+    """In-memory quotes, for offline use and tests"""
+
+    def __init__(self, prices=None):
+        self.prices = {normalize_symbol(symbol): float(price) for symbol, price in (prices or {}).items()}
+        self.requests = 0
+
+    def set(self, symbol, price):
+        self.prices[normalize_symbol(symbol)] = float(price)
+
+    def quotes(self, symbols):
+        self.requests += 1
+        return {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+
+
+class FileQuoteProvider:
+    """Quotes from a CSV (Symbol, Price) or JSON ({symbol: price}) file, re-read when it changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._prices = {}
+
+    def _read(self):
+        if self.path.lower().endswith('.json'):
+            with open(self.path) as f:
+                return {normalize_symbol(symbol): float(price) for symbol, price in json.load(f).items()}
+        df = pd.read_csv(self.path)
+        columns = {str(col).strip().lower(): col for col in df.columns}
+        symbol_col = next(columns[name] for name in ('symbol', 'ticker', 'stock name') if name in columns)
+        price_col = next(columns[name] for name in ('price', 'last', 'close') if name in columns)
+        prices = pd.to_numeric(df[price_col], errors='coerce')
+        return {normalize_symbol(symbol): float(price)
+                for symbol, price in zip(df[symbol_col], prices) if not np.isnan(price)}
+
+    def quotes(self, symbols):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            self._prices, self._mtime = self._read(), mtime
+        return {symbol: self._prices[symbol] for symbol in symbols if symbol in self._prices}
+
+
+class PriceStoreQuoteProvider:
+    """Latest stored close from a PriceStore"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def quotes(self, symbols):
+        latest = {symbol: self.store.latest(symbol) for symbol in symbols}
+        return {symbol: bar[1] for symbol, bar in latest.items() if bar is not None}
+
+
+def provider_from_config(config, price_store=None):
+    """Provider from a {provider, path} mapping; the price store when there is no config"""
+    config = dict(config or {})
+    kind = config.get('provider', 'prices' if price_store is not None and price_store.symbols() else None)
+    if kind == 'file':
+        return FileQuoteProvider(config['path'])
+    if kind == 'static':
+        return StaticQuoteProvider(config.get('prices'))
+    if kind == 'prices' and price_store is not None:
+        return PriceStoreQuoteProvider(price_store)
+    return None
+
+
+class QuoteCache:
+    """Per-symbol TTL cache in front of a provider, refilled with one bulk request"""
+
+    def __init__(self, provider, ttl=DEFAULT_TTL, ttls=None):
+        self.provider = provider
+        self.ttl = ttl
+        self.ttls = {normalize_symbol(symbol): seconds for symbol, seconds in (ttls or {}).items()}
+        self.fetches = 0
+        self.fetched_at = None
+        self._quotes = {}
+        # symbol -> Event set once the request fetching it returns
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbols, now=None):
+        """Return {symbol: price} for the symbols that have a quote"""
+        now = time.time() if now is None else now
+        symbols = [normalize_symbol(symbol) for symbol in symbols]
+        while True:
+            with self._lock:
+                expired = [symbol for symbol in dict.fromkeys(symbols)
+                           if symbol not in self._quotes or self._quotes[symbol][1] <= now]
+                # A symbol another session is already fetching is waited for, not requested again
+                waits = {self._inflight[symbol] for symbol in expired if symbol in self._inflight}
+                claimed = [symbol for symbol in expired if symbol not in self._inflight]
+                done = threading.Event()
+                for symbol in claimed:
+                    self._inflight[symbol] = done
+            if not claimed and not waits:
+                break
+            if claimed:
+                try:
+                    fresh = self.provider.quotes(claimed)
+                    with self._lock:
+                        self.fetches += 1
+                        self.fetched_at = now
+                        for symbol in claimed:
+                            # Symbols the provider does not know are remembered as misses until they expire too
+                            self._quotes[symbol] = (fresh.get(symbol), now + self.ttls.get(symbol, self.ttl))
+                finally:
+                    with self._lock:
+                        for symbol in claimed:
+                            del self._inflight[symbol]
+                    done.set()
+            for event in waits:
+                event.wait()
+            # Symbols whose fetch failed elsewhere are still expired and get claimed on the next pass
+        with self._lock:
+            return {symbol: self._quotes[symbol][0] for symbol in symbols
+                    if self._quotes.get(symbol, (None,))[0] is not None}
+
+
+class _Marked:
+    """One open-positions frame with its last marks and rows grouped by symbol"""
+
+    def __init__(self, open_df):
+        self.frame = open_df.copy()
+        if is_typed(open_df):
+            mark_typed(self.frame)
+        if 'Current Share Price' not in self.frame.columns:
+            self.frame['Current Share Price'] = np.nan
+        self.frame['Current Share Price'] = self.frame['Current Share Price'].astype('float64')
+
+        codes, symbols = pd.factorize(self.frame['Stock Name'].astype(str).map(normalize_symbol))
+        self.symbols = list(symbols)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(symbols) + 1))
+        self.rows = {symbol: order[bounds[i]:bounds[i + 1]] for i, symbol in enumerate(symbols)}
+
+        invested = self.frame['Investment Amount'].to_numpy(dtype=float)
+        buying = self.frame['Buying Price'].to_numpy(dtype=float) if 'Buying Price' in self.frame.columns else np.full(len(invested), np.nan)
+        self.invested = invested
+        self.shares = np.divide(invested, buying, out=np.full(len(invested), np.nan), where=buying > 0)
+        self.prices = {}
+        # Token of the prices applied so far; the marked frame is a function of the input and these
+        self.marks = ''
+
+
+class MarkToMarket:
+    """Re-prices open positions, touching only rows whose quote changed"""
+
+    def __init__(self, quotes, max_frames=4):
+        self.quotes = quotes
+        self.max_frames = max_frames
+        self.rows_updated = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, open_df, version=None):
+        version = version or data_version(open_df)
+        if version not in self._frames:
+            self._frames[version] = _Marked(open_df)
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+        self._frames.move_to_end(version)
+        return self._frames[version]
+
+    def mark(self, open_df, now=None):
+        """Return (marked open_df, number of rows re-priced)"""
+        frame, rows, _ = self._mark(open_df, now)
+        return frame, rows
+
+    def mark_versioned(self, open_df, version, now=None):
+        """(marked open_df, its content version) for an open_df whose version is already known"""
+        frame, _, marks = self._mark(open_df, now, version)
+        return frame, f'{version}~{marks}' if marks else version
+
+    def _mark(self, open_df, now=None, version=None):
+        if open_df.empty or 'Stock Name' not in open_df.columns:
+            return open_df, 0, ''
+
+        with self._lock:
+            symbols = self._state(open_df, version).symbols
+        # Quotes may come over the network, so no session waits on another's request while holding the lock
+        quotes = self.quotes.get(symbols, now)
+        with self._lock:
+            state = self._state(open_df, version)
+            changed = [symbol for symbol, price in quotes.items() if state.prices.get(symbol) != price]
+            # Sessions share the marked frame, so each gets its own copy-on-write view
+            if not changed:
+                return state.frame.copy(deep=False), 0, state.marks
+
+            rows = np.concatenate([state.rows[symbol] for symbol in changed])
+            price = np.concatenate([np.full(len(state.rows[symbol]), quotes[symbol]) for symbol in changed])
+            pl = state.shares[rows] * price - state.invested[rows]
+            # Rows without a usable Buying Price keep the sheet's P&L
+            priced = ~np.isnan(pl)
+            rows, price, pl = rows[priced], price[priced], pl[priced]
+
+            frame = state.frame.copy(deep=False)
+            for col in MARKED_COLUMNS:
+                frame[col] = frame[col].copy()
+            frame.iloc[rows, frame.columns.get_loc('Current Share Price')] = price
+            frame.iloc[rows, frame.columns.get_loc('Profit/Loss')] = pl
+            growth = np.divide(pl, state.invested[rows], out=np.zeros_like(pl), where=state.invested[rows] > 0) * 100
+            frame.iloc[rows, frame.columns.get_loc('Growth(%)')] = growth.astype(frame['Growth(%)'].dtype)
+
+            state.frame = frame
+            state.prices.update({symbol: quotes[symbol] for symbol in changed})
+            state.marks = hashlib.blake2b(repr(sorted(state.prices.items())).encode(), digest_size=6).hexdigest()
+            self.rows_updated += len(rows)
+            return frame.copy(deep=False), len(rows), state.marks
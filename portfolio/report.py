@@ -0,0 +1,222 @@
+"""Downloadable portfolio reports, written off the UI thread.
+
+Reports are written straight to a temporary file in row chunks, so a large
+history is never held as both a DataFrame and a rendered file in memory.
+ReportBuilder runs the writers on a small thread pool and keeps finished
+files per data version, so every session asking for the same report shares
+one file.
+"""
+import html
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from portfolio import charts
+from portfolio.tables import prune_empty_columns
+
+CHUNK_ROWS = 10_000
+
+# kind: (label, file extension, MIME type)
+REPORT_FORMATS = {
+    'excel': ('Excel workbook', '.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('CSV tables (zip)', '.zip', 'application/zip'),
+    'html': ('HTML summary with charts', '.html', 'text/html'),
+}
+
+
+def report_frames(open_df, closed_df):
+    """The tables as the dashboard shows them, empty columns pruned"""
+    return {
+        'Open Positions': prune_empty_columns(open_df),
+        'Closed Positions': prune_empty_columns(closed_df),
+    }
+
+
+def summary_rows(metrics, open_df, closed_df):
+    """(label, value) pairs for the headline numbers"""
+    invested = metrics['open_invested'] + metrics['closed_invested']
+    net_pl = metrics['open_pl'] + metrics['closed_pl']
+
+    def rounded(key):
+        value = metrics.get(key)
+        return None if value is None else round(float(value), 2)
+
+    return [
+        ('Generated', datetime.now().strftime('%Y-%m-%d %H:%M')),
+        ('Total Invested', float(invested)),
+        ('Active Invested', float(metrics['open_invested'])),
+        ('Net P&L', float(net_pl)),
+        ('Net Return (%)', round(float(net_pl / invested * 100), 2) if invested > 0 else 0.0),
+        ('Unrealized P&L', float(metrics['open_pl'])),
+        ('Realized P&L', float(metrics['closed_pl'])),
+        ('Possible P&L', float(metrics['possible_pl'])),
+        ('XIRR (%)', rounded('xirr_pct')),
+        ('Time-Weighted Return (%)', rounded('twr_pct')),
+        ('Max Drawdown (%)', rounded('max_drawdown_pct')),
+        ('Sharpe Ratio', rounded('sharpe')),
+        ('Sortino Ratio', rounded('sortino')),
+        ('Active Positions', len(open_df)),
+        ('Completed Trades', len(closed_df)),
+    ]
+
+
+def _cell_values(df):
+    """Rows of plain Python values, CHUNK_ROWS at a time"""
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        columns = []
+        for col in chunk.columns:
+            values = chunk[col]
+            if values.dtype == 'float32':
+                # Compact float32 columns would otherwise print as 16.67000007629395
+                values = values.astype('float64').round(4)
+            # Blanks (NaN, NaT, missing categories) become empty cells
+            columns.append(values.astype(object).where(values.notna(), None).tolist())
+        yield from zip(*columns)
+
+
+def write_excel(path, frames, summary):
+    """Write-only openpyxl workbook: rows go straight to disk as they are produced"""
+    workbook = Workbook(write_only=True)
+    bold = Font(bold=True)
+
+    def header(sheet, names):
+        cells = []
+        for name in names:
+            cell = WriteOnlyCell(sheet, value=str(name))
+            cell.font = bold
+            cells.append(cell)
+        sheet.append(cells)
+
+    sheet = workbook.create_sheet('Summary')
+    header(sheet, ['Metric', 'Value'])
+    for row in summary:
+        sheet.append(list(row))
+
+    for name, df in frames.items():
+        sheet = workbook.create_sheet(name)
+        sheet.freeze_panes = 'A2'
+        header(sheet, df.columns)
+        for row in _cell_values(df):
+            sheet.append(row)
+    workbook.save(path)
+
+
+def write_csv_zip(path, frames, summary):
+    """One CSV per table plus the summary, zipped"""
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('summary.csv', 'w') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as f:
+            pd.DataFrame(summary, columns=['Metric', 'Value']).to_csv(f, index=False)
+        for name, df in frames.items():
+            file_name = name.lower().replace(' ', '_') + '.csv'
+            with archive.open(file_name, 'w') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as f:
+                for start in range(0, max(len(df), 1), CHUNK_ROWS):
+                    df.iloc[start:start + CHUNK_ROWS].to_csv(f, index=False, header=start == 0)
+
+
+def _html_table(df, columns):
+    df = df[[col for col in columns if col in df.columns]]
+    return df.to_html(index=False, border=0, classes='table', float_format=lambda value: f'{value:,.2f}')
+
+
+def write_html(path, frames, summary, aggregates):
+    """Self-contained summary page with the dashboard charts (print it to PDF from the browser)"""
+    open_df, closed_df = frames['Open Positions'], frames['Closed Positions']
+    figures = []
+    if len(open_df):
+        figures += [charts.industry_pie(open_df), charts.pl_bar(open_df)]
+    if aggregates.get('monthly_pl') is not None:
+        figures.append(charts.monthly_line(aggregates['monthly_pl']))
+    if len(aggregates.get('equity_curve', ())) > 1:
+        figures.append(charts.equity_chart(aggregates['equity_curve']))
+
+    highlights = ['Stock Name', 'Industry', 'Investment Amount', 'Profit/Loss', 'Profit/Loss Booked', 'Growth(%)', 'XIRR(%)']
+    summary_html = ''.join(
+        f'<tr><th>{html.escape(label)}</th><td>{html.escape(f"{value:,.2f}" if isinstance(value, float) else str(value))}</td></tr>'
+        for label, value in summary
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html><html><head><meta charset="utf-8"><title>Portfolio Report</title><style>'
+                'body{font-family:Segoe UI,Helvetica,sans-serif;color:#2c3e50;margin:2rem auto;max-width:1100px}'
+                'table{border-collapse:collapse;margin-bottom:1.5rem}th,td{padding:.35rem .8rem;border-bottom:1px solid #e9ecef;text-align:left}'
+                'h1,h2{color:#667eea}</style></head><body>')
+        f.write(f'<h1>📊 Portfolio Report</h1><h2>Summary</h2><table>{summary_html}</table>')
+        for i, fig in enumerate(figures):
+            # Plotly's JavaScript is loaded once for the whole page
+            f.write(fig.to_html(full_html=False, include_plotlyjs='cdn' if i == 0 else False))
+        for title, key in [('Top Gainers', 'top_gainers'), ('Underperformers', 'underperformers'),
+                           ('Best Trades', 'best_trades'), ('Learning Opportunities', 'learning_trades')]:
+            table = aggregates.get(key)
+            if table is not None and len(table):
+                f.write(f'<h2>{title}</h2>' + _html_table(table, highlights))
+        f.write('</body></html>')
+
+
+def build_report(kind, path, open_df, closed_df, metrics, aggregates):
+    frames = report_frames(open_df, closed_df)
+    summary = summary_rows(metrics, open_df, closed_df)
+    if kind == 'excel':
+        write_excel(path, frames, summary)
+    elif kind == 'csv':
+        write_csv_zip(path, frames, summary)
+    elif kind == 'html':
+        write_html(path, frames, summary, aggregates)
+    else:
+        raise ValueError(f"unknown report format {kind!r}")
+    return path
+
+
+def _remove_report(future):
+    # Evicted reports are deleted once their writer has finished
+    if future.exception() is None and os.path.exists(future.result()):
+        os.remove(future.result())
+
+
+class ReportBuilder:
+    """Generates reports in background threads and keeps the latest few on disk"""
+
+    def __init__(self, directory=None, max_workers=2, max_reports=8):
+        self.directory = directory or tempfile.mkdtemp(prefix='portfolio-reports-')
+        self.max_reports = max_reports
+        self._jobs = OrderedDict()
+        self._count = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+
+    def submit(self, kind, version, open_df, closed_df, metrics, aggregates):
+        """Start (or reuse) the report for this data version; returns its key"""
+        key = (kind, version)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not (job.done() and job.exception() is not None):
+                self._jobs.move_to_end(key)
+                return key
+            self._count += 1
+            path = os.path.join(self.directory, f'report-{self._count}{REPORT_FORMATS[kind][1]}')
+            self._jobs[key] = self._pool.submit(build_report, kind, path, open_df, closed_df, dict(metrics), aggregates)
+            while len(self._jobs) > self.max_reports:
+                _, old = self._jobs.popitem(last=False)
+                old.add_done_callback(_remove_report)
+        return key
+
+    def status(self, key):
+        """('missing' | 'running' | 'done' | 'failed', path or error)"""
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return 'missing', None
+        if not job.done():
+            return 'running', None
+        if job.exception() is not None:
+            return 'failed', job.exception()
+        return 'done', job.result()
@@ -0,0 +1,195 @@
+"""Money-weighted (XIRR) and time-weighted returns.
+
+xirr() solves many IRR problems at once: cash flows from every group sit in
+flat arrays and each Newton step is a pair of bincounts over them. The solver
+works on the log growth rate ln(1 + r), which keeps very short, very
+profitable holdings from overflowing, and any group Newton cannot settle is
+finished by a vectorized bisection on a fixed bracket.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+DAYS_PER_YEAR = 365.0
+
+# Bracket for the log growth rate: -100% up to e^700 per year (day trades annualize steeply)
+LOG_RATE_BOUNDS = (-20.0, 700.0)
+
+
+def _npv(groups, amounts, years, log_rate, n_groups):
+    discount = np.exp(-years * log_rate[groups])
+    value = np.bincount(groups, amounts * discount, minlength=n_groups)
+    slope = np.bincount(groups, -years * amounts * discount, minlength=n_groups)
+    return value, slope
+
+
+def _bisect(groups, amounts, years, pending, conventional, n_groups, tol):
+    """Log rates for the pending groups by bisection, and whether a rate was found"""
+    index = np.full(n_groups, -1)
+    index[pending] = np.arange(len(pending))
+    flows = index[groups] >= 0
+    groups, amounts, years = index[groups[flows]], amounts[flows], years[flows]
+    n_groups = len(pending)
+
+    low = np.full(n_groups, LOG_RATE_BOUNDS[0])
+    high = np.full(n_groups, LOG_RATE_BOUNDS[1])
+    low_value = _npv(groups, amounts, years, low, n_groups)[0]
+    high_value = _npv(groups, amounts, years, high, n_groups)[0]
+    bracketed = np.sign(low_value) != np.sign(high_value)
+    while np.any((high - low)[bracketed] > tol):
+        mid = (low + high) / 2
+        mid_value = _npv(groups, amounts, years, mid, n_groups)[0]
+        left = np.sign(mid_value) == np.sign(low_value)
+        low = np.where(left, mid, low)
+        low_value = np.where(left, mid_value, low_value)
+        high = np.where(left, high, mid)
+    rates = (low + high) / 2
+
+    # A buy-then-sell pattern has exactly one root, so a missing sign change means
+    # it lies past a bound: report that bound (about -100% or an enormous gain)
+    conventional = conventional[pending]
+    beyond = ~bracketed & conventional
+    rates[beyond] = np.where(np.abs(low_value) < np.abs(high_value), LOG_RATE_BOUNDS[0], LOG_RATE_BOUNDS[1])[beyond]
+    return rates, bracketed | conventional
+
+
+def xirr(groups, amounts, years, n_groups=None, tol=1e-10, max_iter=50):
+    """Annual IRR of every group of cash flows, NaN where there is none.
+
+    A group that paid money out and got nothing back (a position written down
+    to zero) returns -100%, however long it was held.
+
+    ``amounts`` are signed (money out negative) and ``years`` is each flow's
+    time from the group's first flow.
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=float)
+    years = np.asarray(years, dtype=float)
+    n_groups = int(groups.max()) + 1 if n_groups is None and len(groups) else (n_groups or 0)
+
+    # An IRR needs money both in and out, spread over some time
+    paid = np.bincount(groups, np.where(amounts < 0, -amounts, 0), minlength=n_groups)
+    received = np.bincount(groups, np.where(amounts > 0, amounts, 0), minlength=n_groups)
+    span = np.zeros(n_groups)
+    np.maximum.at(span, groups, years)
+    solvable = (paid > 0) & (received > 0) & (span > 0)
+
+    # Every outflow before every inflow
+    last_out = np.full(n_groups, -np.inf)
+    first_in = np.full(n_groups, np.inf)
+    np.maximum.at(last_out, groups[amounts < 0], years[amounts < 0])
+    np.minimum.at(first_in, groups[amounts > 0], years[amounts > 0])
+    conventional = last_out <= first_in
+
+    # The money multiple over the cash-weighted holding time is exact for one buy and one sell
+    weighted = np.bincount(groups, np.abs(amounts) * years, minlength=n_groups) / np.maximum(paid + received, 1e-300)
+    duration = np.where(weighted > 0, 2 * weighted, np.maximum(span, 1e-12))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_rate = np.where(solvable, np.log(received / paid) / duration, 0.0)
+    log_rate = np.clip(np.nan_to_num(log_rate), *LOG_RATE_BOUNDS)
+
+    settled = ~solvable
+    stuck = np.zeros(n_groups, dtype=bool)
+    with np.errstate(over='ignore', invalid='ignore'):
+        for _ in range(max_iter):
+            value, slope = _npv(groups, amounts, years, log_rate, n_groups)
+            step = np.where(settled | (slope == 0), 0.0, value / np.where(slope == 0, 1, slope))
+            proposed = log_rate - step
+            log_rate = np.clip(proposed, *LOG_RATE_BOUNDS)
+            converged = np.abs(step) < tol
+            # Groups Newton pushes out of the bracket go straight to bisection
+            stuck |= ~settled & ~converged & ((proposed <= LOG_RATE_BOUNDS[0]) | (proposed >= LOG_RATE_BOUNDS[1]))
+            settled |= converged | stuck
+            if settled.all():
+                break
+
+        # Anything Newton did not settle is bisected between the bounds
+        pending = np.flatnonzero(solvable & (stuck | ~settled))
+        if len(pending):
+            rates, found = _bisect(groups, amounts, years, pending, conventional, n_groups, tol)
+            log_rate[pending] = rates
+            solvable[pending[~found]] = False
+
+    rates = np.where(solvable, np.expm1(log_rate), np.nan)
+    rates[(paid > 0) & (received == 0)] = -1.0
+    return rates
+
+
+def position_xirr(invested, final, bought, ended):
+    """XIRR of single buy / single exit positions, one value per row"""
+    invested = np.asarray(invested, dtype=float)
+    rows = np.arange(len(invested))
+    held = (pd.to_datetime(ended) - pd.to_datetime(bought)).to_numpy().astype('timedelta64[D]').astype(float)
+    years = np.where(np.isnan(held), 0.0, held) / DAYS_PER_YEAR
+    return xirr(
+        np.r_[rows, rows],
+        np.r_[-invested, np.asarray(final, dtype=float)],
+        np.r_[np.zeros(len(rows)), years],
+        n_groups=len(rows),
+    )
+
+
+def _final_values(open_df, closed_df):
+    open_final = open_df['Investment Amount'] + open_df['Profit/Loss']
+    if 'Selling Value' in closed_df.columns:
+        closed_final = closed_df['Selling Value']
+    else:
+        closed_final = closed_df['Investment Amount'] + closed_df['Profit/Loss Booked']
+    return open_final.to_numpy(dtype=float), closed_final.to_numpy(dtype=float)
+
+
+def xirr_columns(open_df, closed_df, today=None):
+    """Annualized XIRR(%) per open position (valued today) and per closed trade"""
+    today = pd.Timestamp(today or date.today())
+    open_final, closed_final = _final_values(open_df, closed_df)
+    open_xirr = position_xirr(open_df['Investment Amount'], open_final, open_df['Buying Date'],
+                              np.full(len(open_df), today)) if len(open_df) else np.empty(0)
+    closed_xirr = position_xirr(closed_df['Investment Amount'], closed_final, closed_df['Buying Date'],
+                                closed_df['Selling Date']) if len(closed_df) else np.empty(0)
+    return (
+        pd.Series(open_xirr * 100, index=open_df.index, name='XIRR(%)'),
+        pd.Series(closed_xirr * 100, index=closed_df.index, name='XIRR(%)'),
+    )
+
+
+def portfolio_xirr(open_df, closed_df, today=None):
+    """Money-weighted return of the whole portfolio: every buy, every sale and today's open value"""
+    today = pd.Timestamp(today or date.today())
+    open_final, closed_final = _final_values(open_df, closed_df)
+    dates = pd.to_datetime(pd.concat([
+        open_df['Buying Date'], closed_df['Buying Date'],
+        pd.Series(today, index=open_df.index), closed_df['Selling Date'],
+    ], ignore_index=True))
+    amounts = np.r_[-open_df['Investment Amount'].to_numpy(dtype=float),
+                    -closed_df['Investment Amount'].to_numpy(dtype=float), open_final, closed_final]
+    usable = dates.notna().to_numpy() & ~np.isnan(amounts)
+    if not usable.any():
+        return None
+    dates = dates[usable]
+    years = (dates - dates.min()).dt.days.to_numpy(dtype=float) / DAYS_PER_YEAR
+    rate = xirr(np.zeros(len(years), dtype=np.int64), amounts[usable], years, n_groups=1)[0]
+    return None if np.isnan(rate) else float(rate)
+
+
+def time_weighted_return(curve):
+    """(cumulative, annualized) TWR from the equity curve's daily return index"""
+    active = curve[curve['Capital'] > 0]
+    if active.empty:
+        return None, None
+    cumulative = float(curve['Equity'].iloc[-1]) - 1
+    days = (active.index[-1] - active.index[0]).days
+    annualized = (1 + cumulative) ** (DAYS_PER_YEAR / days) - 1 if days > 0 and cumulative > -1 else None
+    return cumulative, annualized
+
+
+def return_metrics(open_df, closed_df, curve, today=None):
+    """Portfolio XIRR and time-weighted return, in percent"""
+    rate = portfolio_xirr(open_df, closed_df, today)
+    cumulative, annualized = time_weighted_return(curve)
+    percent = lambda value: None if value is None else value * 100
+    return {
+        'xirr_pct': percent(rate),
+        'twr_pct': percent(cumulative),
+        'twr_annualized_pct': percent(annualized),
+    }
@@ -0,0 +1,89 @@
+"""Background polling of every account's data source.
+
+A RefreshScheduler wakes up every ``interval`` seconds and asks the
+AccountLoader to update each account. That costs one cheap version check per
+account (the spreadsheet's Drive modified time, or a local file's mtime and
+size); only when the token moved, or the source cannot report one, are the
+rows fetched, and a snapshot is swapped in only when their content hash
+differs. Every poll that changed something bumps ``generation``, which
+sessions compare against the value they last rendered to decide whether to
+rerun.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 60
+
+
+class RefreshScheduler:
+    """Daemon thread that keeps account snapshots in step with their sources"""
+
+    def __init__(self, loader, accounts, interval=DEFAULT_INTERVAL):
+        self.loader = loader
+        self.accounts = list(accounts)
+        self.interval = interval
+        self.generation = 0
+        self.changed = {}
+        self.errors = {}
+        self.polled_at = None
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.interval) and self.interval > 0
+
+    def subscribe(self, callback):
+        """Call callback(generation, changed names) after every poll that changed data"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def poll(self, force=False):
+        """Update every account once; returns (names whose rows changed, {name: error})
+
+        force re-reads sources whose version token looks unchanged; identical
+        rows still do not count as a change.
+        """
+        changed, errors = self.loader.update_all(self.accounts, force=force)
+        with self._lock:
+            self.polled_at = time.time()
+            self.errors = errors
+            if changed:
+                self.generation += 1
+                for name in changed:
+                    self.changed[name] = self.generation
+            generation, listeners = self.generation, list(self._listeners)
+        if changed:
+            for callback in listeners:
+                try:
+                    callback(generation, changed)
+                except Exception:
+                    logger.exception("Refresh listener failed")
+        return changed, errors
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Scheduled refresh failed")
+
+    def start(self):
+        """Start polling in a daemon thread; a no-op when disabled or already running"""
+        with self._lock:
+            if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='refresh-scheduler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
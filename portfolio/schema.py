@@ -0,0 +1,100 @@
+"""Declared column schema for the portfolio worksheets.
+
+Each column names its target dtype, the date format used in the sheet and
+whether blanks become zero or stay missing. coerce_frame() applies the whole
+schema in one pass and returns a new, compactly typed frame.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+# Bump whenever a dtype or column changes so stale snapshots are re-coerced
+SCHEMA_VERSION = 3
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# fill: 'zero' fills blanks/unparseable values with 0, 'null' keeps them missing
+Column = namedtuple('Column', ['dtype', 'date_format', 'fill'], defaults=[None, 'null'])
+
+# Money stays float64 so sums of large amounts keep paise precision; ratios
+# and day counts are small enough for 32-bit types
+OPEN_SCHEMA = {
+    'Stock Name': Column('category'),
+    'Industry': Column('category'),
+    'Buying Date': Column('datetime64[ns]', DATE_FORMAT),
+    'Buying Price': Column('float64', fill='zero'),
+    'Current Share Price': Column('float64'),
+    'Investment Amount': Column('float64', fill='zero'),
+    'Profit/Loss': Column('float64', fill='zero'),
+    'Growth(%)': Column('float32', fill='zero'),
+    'Investment Days': Column('int32', fill='zero'),
+}
+
+CLOSED_SCHEMA = {
+    'Stock Name': Column('category'),
+    'Industry': Column('category'),
+    'Buying Date': Column('datetime64[ns]', DATE_FORMAT),
+    'Selling Date': Column('datetime64[ns]', DATE_FORMAT),
+    'Investment Amount': Column('float64', fill='zero'),
+    'Selling Value': Column('float64', fill='zero'),
+    'Profit/Loss Booked': Column('float64', fill='zero'),
+    'Growth(%)': Column('float32', fill='zero'),
+    'Investment Days': Column('int32', fill='zero'),
+    'Reason for selling': Column('category'),
+    'Possible Profit/Loss': Column('float64', fill='zero'),
+}
+
+
+def _to_datetime(values, date_format):
+    # Sheets repeat the same dates a lot, so parse each distinct value once
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.to_datetime(uniques, format=date_format, errors='coerce')
+
+    # Only values that missed the declared format pay for per-element inference
+    missed = parsed.isna() & uniques.astype(str).str.strip().ne('')
+    if missed.any():
+        parsed[missed] = pd.to_datetime(uniques[missed], format='mixed', errors='coerce')
+
+    return pd.Series(take(parsed.array, codes, allow_fill=True), index=values.index)
+
+
+def _to_category(values):
+    # Clean the distinct labels rather than every cell, then remap the codes
+    codes, uniques = pd.factorize(values)
+    labels = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    # Blank labels are missing (code -1), not an empty category
+    label_codes, categories = pd.factorize(labels.where(labels != ''))
+    # A trailing -1 lets missing values (code -1) map to missing, even when every value is blank
+    codes = np.append(label_codes, -1)[codes]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=values.index)
+
+
+def _to_numeric(values, column):
+    # Columns that are already all numbers skip to_numeric's per-object parsing
+    numbers = pd.to_numeric(values.infer_objects(), errors='coerce')
+    if column.fill == 'zero':
+        return numbers.fillna(0).astype(column.dtype)
+    if column.dtype.startswith('int'):
+        return numbers.astype(column.dtype.capitalize())
+    return numbers.astype(column.dtype)
+
+
+def coerce_column(values, column):
+    if column.dtype.startswith('datetime'):
+        return _to_datetime(values, column.date_format)
+    if column.dtype == 'category':
+        return _to_category(values)
+    return _to_numeric(values, column)
+
+
+def coerce_frame(df, schema):
+    """Return a copy of df with every schema column cast in one pass"""
+    converted = {
+        col: coerce_column(df[col], column)
+        for col, column in schema.items()
+        if col in df.columns
+    }
+    return df.assign(**converted)
@@ -0,0 +1,81 @@
+"""Process-wide, read-only portfolio data shared by every dashboard session.
+
+Each session used to redo the same work on every rerun: copy the snapshot
+frames, stack the accounts, total them and hash the result to key the caches.
+SharedData does that once per combination of snapshot versions and gives
+every session copy-on-write views of the result together with its content
+versions, so memory stays flat as sessions are added and a rerun does no
+work proportional to the number of rows before it starts rendering.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+from portfolio.aggregates import frames_version, split_version
+from portfolio.engine import combine_accounts, normalize, process_data
+
+SharedView = namedtuple('SharedView', ['open', 'closed', 'metrics', 'open_version', 'closed_version'])
+
+
+def _combined_version(parts):
+    return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+
+def _views(shared):
+    # Views share every column buffer; a session that assigns to one only copies what it touches
+    return SharedView(shared.open.copy(deep=False), shared.closed.copy(deep=False), dict(shared.metrics),
+                      shared.open_version, shared.closed_version)
+
+
+class SharedData:
+    """LRU of processed frames and metrics, keyed by the snapshot versions they were built from"""
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _build(self, frames_by_account, names):
+        typed = {name: normalize(*frames_by_account[name]) for name in names}
+        versions = {name: split_version(getattr(frames_by_account[name], 'version', None) or frames_version(*typed[name]))
+                    for name in names}
+        if len(names) > 1:
+            open_df, closed_df = combine_accounts(typed)
+            open_version = _combined_version([(name, versions[name][0]) for name in names])
+            closed_version = _combined_version([(name, versions[name][1]) for name in names])
+        else:
+            open_df, closed_df = typed[names[0]]
+            open_version, closed_version = versions[names[0]]
+        open_df, closed_df, metrics = process_data(open_df, closed_df)
+        return SharedView(open_df, closed_df, metrics, open_version, closed_version)
+
+    def get(self, frames_by_account, account=None):
+        """SharedView of views for one account, or for every account stacked when account is None"""
+        names = list(frames_by_account) if account is None else [account]
+        versions = tuple((name, getattr(frames_by_account[name], 'version', None)) for name in names)
+        if any(version is None for _, version in versions):
+            # Frames that did not come from a snapshot (the sample data) carry no version to key on
+            return _views(self._build(frames_by_account, names))
+
+        with self._lock:
+            shared = self._entries.get(versions)
+            if shared is not None:
+                self.hits += 1
+                self._entries.move_to_end(versions)
+                return _views(shared)
+
+        # Sessions arriving together wait for one build instead of each doing their own
+        with self._build_lock:
+            with self._lock:
+                shared = self._entries.get(versions)
+            if shared is None:
+                shared = self._build(frames_by_account, names)
+                with self._lock:
+                    self.misses += 1
+                    self._entries[versions] = shared
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return _views(shared)
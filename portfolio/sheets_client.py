@@ -0,0 +1,50 @@
+"""Long-lived, pooled Google Sheets client.
+
+One authorized session is built per process and reused across reruns. The
+underlying ``AuthorizedSession`` refreshes the service account token on its
+own, and a mounted ``HTTPAdapter`` keeps connections to the Google APIs alive
+so each sync does not pay for a fresh TLS handshake.
+"""
+import threading
+
+import gspread
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+
+
+def pooled_session(creds, pool_size=10, retries=3):
+    """AuthorizedSession with keep-alive pooling and retry on transient errors"""
+    session = AuthorizedSession(creds)
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    return session
+
+
+class SheetsClient:
+    """Authorized gspread client that caches spreadsheet handles"""
+
+    def __init__(self, service_account_info, pool_size=10):
+        creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
+        self.gc = gspread.Client(creds, session=pooled_session(creds, pool_size))
+        self._spreadsheets = {}
+        self._lock = threading.Lock()
+
+    def spreadsheet(self, title):
+        """Open a spreadsheet by title once and hand back the same handle afterwards"""
+        with self._lock:
+            if title in self._spreadsheets:
+                return self._spreadsheets[title]
+        # Open outside the lock so several accounts can be looked up at once
+        spreadsheet = self.gc.open(title)
+        with self._lock:
+            return self._spreadsheets.setdefault(title, spreadsheet)
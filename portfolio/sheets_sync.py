@@ -0,0 +1,170 @@
+"""Incremental Google Sheets sync for the portfolio worksheets.
+
+The first sync pulls every row of each worksheet. Later syncs only fetch the
+header, the key column (A) of the rows above a trailing window, and the
+window itself, which covers newly appended trades and edits to recent rows,
+and merge that window into the frame held in memory. If the key column shows
+that rows above the window moved (a sale deleting a row, say), the worksheet
+is read in full instead.
+"""
+import threading
+
+import pandas as pd
+from gspread.utils import absolute_range_name, numericise_all, rowcol_to_a1
+
+DEFAULT_WORKSHEETS = ("Open Positions", "Closed Positions")
+
+
+def column_letter(n):
+    """Return the A1 column letter for a 1-based column number"""
+    return rowcol_to_a1(1, max(n, 1))[:-1]
+
+
+def row_keys(rows):
+    """First-column value of each row, '' for blank rows"""
+    return [str(row[0]) if row else '' for row in rows]
+
+
+def records_frame(header, rows):
+    """Build a DataFrame the same way get_all_records() would"""
+    width = len(header)
+    records = [
+        numericise_all((list(row) + [''] * width)[:width])
+        for row in rows
+    ]
+    return pd.DataFrame(records, columns=header)
+
+
+class WorksheetState:
+    """What we know about one worksheet after the last sync"""
+
+    def __init__(self, name):
+        self.name = name
+        self.header = None
+        self.frame = pd.DataFrame()
+        self.keys = []
+        self.synced_rows = 0
+        self.syncs_since_full = 0
+
+    @property
+    def synced(self):
+        return self.header is not None
+
+
+class IncrementalSheetSync:
+    """Keep local DataFrames in step with a spreadsheet's worksheets.
+
+    ``spreadsheet`` only needs a gspread-style ``values_batch_get(ranges)``,
+    so a local fake can stand in for the real client. All worksheets are read
+    in a single batch request per sync.
+    ``tail_rows`` is how many already-synced rows are re-read on every sync to
+    pick up edits; ``full_every`` forces a complete re-read every N syncs so
+    edits to older rows are not missed forever.
+    """
+
+    def __init__(self, spreadsheet, worksheets=DEFAULT_WORKSHEETS, tail_rows=50, full_every=24):
+        self.spreadsheet = spreadsheet
+        self.tail_rows = tail_rows
+        self.full_every = full_every
+        self.states = {name: WorksheetState(name) for name in worksheets}
+        self.revision = None
+        self._lock = threading.Lock()
+
+    def current_revision(self):
+        """Drive's modifiedTime for the spreadsheet, a cheap way to skip a sync when nothing changed"""
+        get_revision = getattr(self.spreadsheet, 'get_lastUpdateTime', None)
+        if get_revision is None:
+            return None
+        try:
+            return get_revision()
+        except Exception:
+            return None
+
+    def _batch_get(self, ranges):
+        # One values_batch_get round trip covers every worksheet
+        if not ranges:
+            return []
+        response = self.spreadsheet.values_batch_get(ranges)
+        return [value_range.get('values', []) for value_range in response.get('valueRanges', [])]
+
+    def _apply_full(self, state, values):
+        header = list(values[0]) if values else []
+        rows = values[1:]
+        state.header = header
+        state.frame = records_frame(header, rows)
+        state.keys = row_keys(rows)
+        state.synced_rows = len(rows)
+        state.syncs_since_full = 0
+
+    def _tail_start(self, state):
+        return max(0, state.synced_rows - self.tail_rows)
+
+    def _tail_ranges(self, state):
+        # Header row, the key column above the window, then the last few synced rows plus anything appended
+        start = self._tail_start(state)
+        return [
+            absolute_range_name(state.name, '1:1'),
+            absolute_range_name(state.name, f'A2:A{start + 1}' if start else 'A1:A1'),
+            absolute_range_name(state.name, f'A{start + 2}:{column_letter(len(state.header))}'),
+        ]
+
+    def _apply_tail(self, state, first_row, head_keys, window):
+        """Merge a tail window into the held frame; False means a full read is needed"""
+        header = list(first_row[0]) if first_row else []
+        if header != state.header:
+            return False
+
+        start = self._tail_start(state)
+        # The API drops trailing blank rows, so pad the keys back to the head's length
+        keys = row_keys(head_keys)[:start] if start else []
+        if keys + [''] * (start - len(keys)) != state.keys[:start]:
+            # A row above the window was deleted or inserted, so every offset after it moved
+            return False
+        if len(window) < state.synced_rows - start:
+            # Rows disappeared from the tail, so the offsets are no longer valid
+            return False
+
+        tail = records_frame(header, window)
+        head = state.frame.iloc[:start]
+        state.frame = pd.concat([head, tail], ignore_index=True) if len(head) else tail
+        state.keys = state.keys[:start] + row_keys(window)
+        state.synced_rows = start + len(window)
+        state.syncs_since_full += 1
+        return True
+
+    def sync(self, full=False):
+        """Bring every worksheet up to date and return {name: DataFrame}"""
+        with self._lock:
+            revision = self.current_revision()
+            unchanged = revision is not None and revision == self.revision
+
+            full_states, tail_states = [], []
+            for state in self.states.values():
+                if full or not state.synced or state.syncs_since_full >= self.full_every:
+                    full_states.append(state)
+                elif not unchanged:
+                    tail_states.append(state)
+
+            ranges = [absolute_range_name(state.name) for state in full_states]
+            for state in tail_states:
+                ranges.extend(self._tail_ranges(state))
+            results = self._batch_get(ranges)
+
+            for state, values in zip(full_states, results):
+                self._apply_full(state, values)
+
+            tail_results = results[len(full_states):]
+            retry = [
+                state for i, state in enumerate(tail_states)
+                if not self._apply_tail(state, *tail_results[3 * i:3 * i + 3])
+            ]
+            # Rare second round trip for sheets whose header, length or row order changed
+            for state, values in zip(retry, self._batch_get([absolute_range_name(s.name) for s in retry])):
+                self._apply_full(state, values)
+
+            self.revision = revision
+            return self.frames()
+
+    def frames(self):
+        """Return copies of the locally held frames"""
+        return {name: state.frame.copy() for name, state in self.states.items()}
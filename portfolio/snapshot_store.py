@@ -0,0 +1,203 @@
+"""On-disk Parquet snapshot of the typed open/closed position frames.
+
+The dashboard renders straight from the snapshot and refreshes it from Google
+Sheets in a background thread once it is older than ``max_age`` seconds
+(stale-while-revalidate). Frames coming out of the store carry
+``attrs['schema_version']`` so process_data() can skip type coercion.
+
+Each save writes its Parquet files under new names and then replaces the
+manifest that points at them, so a reader sees either the old pair of frames
+or the new pair, never one of each.
+
+The frames read from disk are held once per process and handed out as
+shallow views. Under pandas copy-on-write a view shares every column buffer
+with the held frame, and a write to it copies only what it touches, so any
+number of sessions can read a snapshot without copying or altering it.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from portfolio.aggregates import frames_version
+from portfolio.schema import SCHEMA_VERSION
+
+# Older snapshots use these fixed names; newer ones list their files in the manifest
+FRAME_FILES = {
+    'open': 'open_positions.parquet',
+    'closed': 'closed_positions.parquet',
+}
+MANIFEST_FILE = 'manifest.json'
+
+
+def mark_typed(df):
+    """Tag a frame as already coerced to the current schema"""
+    df.attrs['schema_version'] = SCHEMA_VERSION
+    return df
+
+
+def is_typed(df):
+    return df.attrs.get('schema_version') == SCHEMA_VERSION
+
+
+class Frames(tuple):
+    """(open_df, closed_df) that also carries their content version (see aggregates.frames_version)"""
+
+    def __new__(cls, open_df, closed_df, version=None):
+        frames = super().__new__(cls, (open_df, closed_df))
+        frames.version = version
+        return frames
+
+    def views(self):
+        """Shallow copy-on-write views, safe to hand to code that might assign columns"""
+        return Frames(self[0].copy(deep=False), self[1].copy(deep=False), self.version)
+
+
+def _arrow_safe(df):
+    # Parquet needs one type per column; sheets can mix numbers and text
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+class SnapshotStore:
+    """Parquet snapshot directory with a stale-while-revalidate policy"""
+
+    def __init__(self, path, max_age=600):
+        self.path = path
+        self.max_age = max_age
+        self.last_error = None
+        self._memo = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def manifest(self):
+        """Return the manifest dict, or None if there is no usable snapshot"""
+        try:
+            with open(self._file(MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('schema_version') != SCHEMA_VERSION:
+            return None
+        return manifest
+
+    @property
+    def saved_at(self):
+        manifest = self.manifest()
+        return manifest['saved_at'] if manifest else None
+
+    @property
+    def checked_at(self):
+        """When the source was last confirmed to match the snapshot"""
+        manifest = self.manifest()
+        return manifest.get('checked_at', manifest['saved_at']) if manifest else None
+
+    def is_stale(self):
+        checked_at = self.checked_at
+        return checked_at is None or time.time() - checked_at > self.max_age
+
+    def _files(self, manifest):
+        return manifest.get('files', FRAME_FILES)
+
+    def load(self):
+        """Return Frames(open_df, closed_df, version) from disk, or None without a snapshot"""
+        manifest = self.manifest()
+        if manifest is None:
+            return None
+
+        # Only hit the disk again when a newer snapshot has been written
+        memo = self._memo
+        if memo is None or memo[0] != manifest['saved_at']:
+            files = self._files(manifest)
+            try:
+                open_df, closed_df = (mark_typed(pd.read_parquet(self._file(files[key]))) for key in ('open', 'closed'))
+            except (OSError, ValueError):
+                return None
+            # Snapshots written before versions were recorded are hashed once here
+            version = manifest.get('data_version') or frames_version(open_df, closed_df)
+            memo = self._memo = (manifest['saved_at'], Frames(open_df, closed_df, version))
+
+        return memo[1].views()
+
+    @property
+    def source_version(self):
+        """Version token of the source the snapshot was taken from, if it had one"""
+        manifest = self.manifest()
+        return manifest.get('source_version') if manifest else None
+
+    @property
+    def data_version(self):
+        """Content hash of the snapshot's rows, if it was saved with one"""
+        manifest = self.manifest()
+        return manifest.get('data_version') if manifest else None
+
+    def _write_manifest(self, manifest):
+        with open(self._file(MANIFEST_FILE) + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(self._file(MANIFEST_FILE) + '.tmp', self._file(MANIFEST_FILE))
+
+    def _remove_unused(self, *manifests):
+        # The previous generation is kept, so a reader that just read the old manifest can still open its files
+        keep = {MANIFEST_FILE} | {name for manifest in manifests if manifest for name in self._files(manifest).values()}
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.parquet') and entry.name not in keep:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def save(self, open_df, closed_df, source_version=None, data_version=None):
+        """Write both frames under new names, swap the manifest over to them, and return them as typed Frames"""
+        os.makedirs(self.path, exist_ok=True)
+        data_version = data_version or frames_version(open_df, closed_df)
+        previous = self.manifest()
+        generation = uuid.uuid4().hex[:12]
+        files = {key: name.replace('.parquet', f'-{generation}.parquet') for key, name in FRAME_FILES.items()}
+        for key, df in (('open', open_df), ('closed', closed_df)):
+            _arrow_safe(df).to_parquet(self._file(files[key]), index=False)
+
+        # The manifest goes last so readers never see a half-written snapshot
+        saved_at = time.time()
+        manifest = {'schema_version': SCHEMA_VERSION, 'saved_at': saved_at, 'files': files,
+                    'source_version': source_version, 'data_version': data_version}
+        self._write_manifest(manifest)
+        frames = Frames(mark_typed(open_df), mark_typed(closed_df), data_version)
+        # In this process the swap is a single assignment, and the next load() skips the disk
+        self._memo = (saved_at, frames)
+        self._remove_unused(manifest, previous)
+        return frames.views()
+
+    def mark_checked(self, source_version=None):
+        """Record that the source still matches the snapshot, without rewriting the frames"""
+        manifest = self.manifest()
+        if manifest is None:
+            return
+        self._write_manifest({**manifest, 'checked_at': time.time(), 'source_version': source_version})
+
+    def revalidate_async(self, refresh):
+        """Run refresh() in a background thread unless one is already running"""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+
+        def run():
+            try:
+                refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='snapshot-revalidate', daemon=True).start()
+        return True
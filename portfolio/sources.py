@@ -0,0 +1,168 @@
+"""Pluggable data sources for portfolio accounts.
+
+A source answers ``fetch(filters=None) -> (open_df, closed_df)`` and
+``version()``, a cheap token that changes when the underlying data does (None
+when the backend cannot tell, so callers must compare the rows). ``pushdown``
+is True when fetch() evaluates the filters itself rather than loading every
+row first. Three backends exist:
+
+* ``sheets``: the Google spreadsheet, through IncrementalSheetSync
+* ``file``: an Excel workbook, CSV folder or ledger, via load_portfolio_file()
+* ``sqlite``: an indexed SQLiteStore; filters are pushed down as SQL
+
+Local sources need no network. Import a workbook or CSV history into SQLite with:
+
+    python -m portfolio.sources import portfolio.db holdings.xlsx
+"""
+import argparse
+import os
+import sys
+from collections import namedtuple
+
+import pandas as pd
+
+from portfolio.engine import CLOSED_SHEET, OPEN_SHEET, load_portfolio_file, normalize
+from portfolio.ledger import METHODS
+from portfolio.sqlite_store import DATE_COLUMNS, SQLiteStore
+
+SOURCE_KINDS = ('sheets', 'file', 'sqlite')
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+# Empty fields mean "no restriction"; the date range is inclusive
+Filters = namedtuple('Filters', ['industries', 'tickers', 'start', 'end'], defaults=[None, None, None, None])
+
+
+class SourceNotConfigured(RuntimeError):
+    """The account cannot be loaded because its source has no credentials or path"""
+
+
+def apply_filters(kind, df, filters):
+    """In-memory version of the SQLite pushdown, for sources that load whole tables"""
+    if filters is None or df.empty:
+        return df
+    mask = pd.Series(True, index=df.index)
+    if filters.industries and 'Industry' in df.columns:
+        mask &= df['Industry'].astype(str).isin([str(value) for value in filters.industries])
+    if filters.tickers and 'Stock Name' in df.columns:
+        mask &= df['Stock Name'].astype(str).isin([str(value) for value in filters.tickers])
+    date_column = DATE_COLUMNS[kind]
+    if (filters.start is not None or filters.end is not None) and date_column in df.columns:
+        dates = pd.to_datetime(df[date_column], errors='coerce')
+        if filters.start is not None:
+            mask &= dates >= pd.Timestamp(filters.start)
+        if filters.end is not None:
+            mask &= dates <= pd.Timestamp(filters.end)
+    return df if mask.all() else df[mask]
+
+
+class SheetsSource:
+    """Google Sheets through an IncrementalSheetSync"""
+
+    local = False
+    pushdown = False
+
+    def __init__(self, sync):
+        self.sync = sync
+
+    def version(self):
+        # The spreadsheet's last modified time, or None when the client cannot tell
+        return self.sync.current_revision()
+
+    def fetch(self, filters=None):
+        frames = self.sync.sync()
+        return (apply_filters('open', frames[OPEN_SHEET], filters),
+                apply_filters('closed', frames[CLOSED_SHEET], filters))
+
+
+class FileSource:
+    """An Excel workbook, CSV folder, ledger or snapshot folder on disk"""
+
+    local = True
+    pushdown = False
+
+    def __init__(self, path, method='fifo', quotes=None):
+        self.path = path
+        self.method = method
+        self.quotes = quotes
+
+    def version(self):
+        # A folder changes when any file directly inside it does
+        try:
+            paths = [self.path]
+            if os.path.isdir(self.path):
+                paths += [entry.path for entry in os.scandir(self.path) if entry.is_file()]
+            stats = [os.stat(path) for path in paths]
+        except OSError:
+            return None
+        return '-'.join(f'{stat.st_mtime_ns}:{stat.st_size}' for stat in stats)
+
+    def fetch(self, filters=None):
+        open_df, closed_df = load_portfolio_file(self.path, self.method, self.quotes)
+        return apply_filters('open', open_df, filters), apply_filters('closed', closed_df, filters)
+
+
+class SQLiteSource:
+    """An SQLiteStore; filters become indexed WHERE clauses"""
+
+    local = True
+    pushdown = True
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"SQLite database not found: {path}")
+        self.store = SQLiteStore(path)
+
+    def version(self):
+        return self.store.version()
+
+    def fetch(self, filters=None):
+        return self.store.read('open', filters), self.store.read('closed', filters)
+
+
+def source_from_path(path, method='fifo', quotes=None):
+    """SQLite for database files, FileSource for everything load_portfolio_file() reads"""
+    if path.lower().endswith(SQLITE_EXTENSIONS):
+        return SQLiteSource(path)
+    return FileSource(path, method, quotes)
+
+
+def source_for(account, open_sync):
+    """The source an Account describes; open_sync(account) returns its IncrementalSheetSync"""
+    if account.source == 'sheets':
+        return SheetsSource(open_sync(account))
+    if not account.path:
+        raise SourceNotConfigured(f"{account.name}: a {account.source} source needs a path")
+    if account.source == 'sqlite':
+        return SQLiteSource(account.path)
+    if account.source == 'file':
+        return FileSource(account.path)
+    raise ValueError(f"{account.name}: unknown source {account.source!r}, expected one of {', '.join(SOURCE_KINDS)}")
+
+
+def import_to_sqlite(database, paths, method='fifo'):
+    """Load portfolio files, stack them and write them into an indexed database; returns row counts"""
+    frames = [normalize(*load_portfolio_file(path, method)) for path in paths]
+    open_df = pd.concat([frame[0] for frame in frames], ignore_index=True)
+    closed_df = pd.concat([frame[1] for frame in frames], ignore_index=True)
+    SQLiteStore(database).write(open_df, closed_df)
+    return len(open_df), len(closed_df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m portfolio.sources', description='Manage local portfolio data sources.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    imports = commands.add_parser('import', help='write portfolio files into an indexed SQLite database')
+    imports.add_argument('database', help='SQLite file to create or replace')
+    imports.add_argument('files', nargs='+', help='Excel workbooks, CSV folders or transaction ledgers')
+    imports.add_argument('--method', choices=METHODS, default='fifo',
+                         help='cost basis method for transaction ledgers')
+    args = parser.parse_args(argv)
+
+    open_rows, closed_rows = import_to_sqlite(args.database, args.files, args.method)
+    print(f'{args.database}: {open_rows:,} open positions, {closed_rows:,} closed trades')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""SQLite storage for large local portfolio histories.
+
+Positions live in two tables, ``open_positions`` and ``closed_positions``,
+whose columns are named exactly like the worksheet headers. Dates are stored
+as ISO ``YYYY-MM-DD`` text so they sort and compare correctly, and Stock
+Name, Industry, Buying Date and Selling Date are indexed, so filtered and
+date-range reads are answered by SQLite instead of by loading whole tables
+into pandas.
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+
+TABLES = {'open': 'open_positions', 'closed': 'closed_positions'}
+INDEXED_COLUMNS = ['Stock Name', 'Industry', 'Buying Date', 'Selling Date']
+
+# Date range filters apply to when a position was opened, and to when a trade was closed
+DATE_COLUMNS = {'open': 'Buying Date', 'closed': 'Selling Date'}
+
+ISO_DATE = '%Y-%m-%d'
+WRITE_CHUNK_ROWS = 50_000
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_frame(df):
+    # Dates become ISO text and categories plain text; everything else maps to SQLite directly
+    out = {}
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime(ISO_DATE)
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object).where(values.notna(), None)
+        out[col] = values
+    return pd.DataFrame(out, index=df.index)
+
+
+def where_clause(kind, filters):
+    """(SQL condition, parameters) for a sources.Filters tuple, ('', []) without filters"""
+    if filters is None:
+        return '', []
+    conditions, params = [], []
+    for column, values in (('Industry', filters.industries), ('Stock Name', filters.tickers)):
+        if values:
+            values = [str(value) for value in values]
+            conditions.append(f'{_quote(column)} IN ({", ".join("?" * len(values))})')
+            params += values
+    date_column = _quote(DATE_COLUMNS[kind])
+    if filters.start is not None:
+        conditions.append(f'{date_column} >= ?')
+        params.append(pd.Timestamp(filters.start).strftime(ISO_DATE))
+    if filters.end is not None:
+        conditions.append(f'{date_column} <= ?')
+        params.append(pd.Timestamp(filters.end).strftime(ISO_DATE))
+    return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+
+class SQLiteStore:
+    """One SQLite file holding the open and closed position tables"""
+
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def _connect(self, readonly=True):
+        # Readers open the file read-only, so a missing database is an error rather than a new empty file
+        if readonly:
+            con = sqlite3.connect(f'file:{os.path.abspath(self.path)}?mode=ro', uri=True)
+        else:
+            con = sqlite3.connect(self.path)
+        try:
+            yield con
+            con.commit()
+        finally:
+            con.close()
+
+    def version(self):
+        """Changes whenever the database file is written"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return f'{stat.st_mtime_ns}-{stat.st_size}'
+
+    def ensure_indexes(self):
+        """Create the lookup indexes on whichever indexed columns each table has"""
+        with self._connect(readonly=False) as con:
+            for kind, table in TABLES.items():
+                present = {row[1] for row in con.execute(f'PRAGMA table_info({_quote(table)})')}
+                for column in INDEXED_COLUMNS:
+                    if column in present:
+                        index = f"idx_{table}_{column.lower().replace(' ', '_')}"
+                        con.execute(f'CREATE INDEX IF NOT EXISTS {_quote(index)} ON {_quote(table)} ({_quote(column)})')
+
+    def write(self, open_df, closed_df):
+        """Replace both tables with the given frames, then index them"""
+        with self._connect(readonly=False) as con:
+            for kind, df in (('open', open_df), ('closed', closed_df)):
+                _sql_frame(df).to_sql(TABLES[kind], con, if_exists='replace', index=False,
+                                      chunksize=WRITE_CHUNK_ROWS)
+        self.ensure_indexes()
+
+    def read(self, kind, filters=None):
+        """Rows of one table, with any filters evaluated by SQLite"""
+        where, params = where_clause(kind, filters)
+        with self._connect() as con:
+            return pd.read_sql_query(f'SELECT * FROM {_quote(TABLES[kind])}{where}', con, params=params)
+
+    def count(self, kind, filters=None):
+        where, params = where_clause(kind, filters)
+        with self._connect() as con:
+            return con.execute(f'SELECT COUNT(*) FROM {_quote(TABLES[kind])}{where}', params).fetchone()[0]
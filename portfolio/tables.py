@@ -0,0 +1,117 @@
+"""Table helpers shared by the dashboard views and exports"""
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+
+# All-zero P&L is still meaningful, so these numeric columns are never pruned
+KEEP_ZERO_COLUMNS = ['Profit/Loss', 'Growth(%)']
+
+
+def _all_blank(values):
+    uniques = pd.Series(pd.unique(values.dropna()), dtype=object)
+    return uniques.astype(str).str.strip().eq('').all()
+
+
+def empty_column_mask(df, keep_zero=KEEP_ZERO_COLUMNS):
+    """Boolean Series, True for columns that are missing, blank or all zero"""
+    dtypes = df.dtypes
+    empty = df.isna().all()
+
+    is_number = dtypes.map(lambda d: is_numeric_dtype(d) and not is_bool_dtype(d))
+    number_cols = dtypes.index[is_number].difference(keep_zero, sort=False)
+    if len(number_cols):
+        empty[number_cols] |= df[number_cols].eq(0).all()
+
+    is_text = ~is_number & ~dtypes.map(is_datetime64_any_dtype)
+    text_cols = dtypes.index[is_text]
+    if len(text_cols):
+        # Only the distinct values of each text column need stripping
+        empty[text_cols] |= np.array([_all_blank(df[col]) for col in text_cols])
+
+    return empty
+
+
+def prune_empty_columns(df, keep_zero=KEEP_ZERO_COLUMNS):
+    """Drop columns that carry no information"""
+    if df.empty:
+        return df
+    return df.loc[:, ~empty_column_mask(df, keep_zero)]
+
+
+class TablePager:
+    """Serve one page of a frame at a time for the big tables.
+
+    Sort orders are argsorted once per (column, direction) and filter masks
+    are memoized per query, so changing page only slices a few index arrays.
+    One pager serves every session, so the memos are only touched under a lock;
+    the sorting and matching themselves run outside it.
+    """
+
+    def __init__(self, df, max_cached_filters=16):
+        self.df = df
+        self.max_cached_filters = max_cached_filters
+        self._orders = {}
+        self._filters = {}
+        self._lock = threading.Lock()
+        self._text_cols = [col for col in df.columns if not is_numeric_dtype(df[col].dtype)
+                           and not is_datetime64_any_dtype(df[col].dtype)]
+
+    def __len__(self):
+        return len(self.df)
+
+    def order(self, column=None, ascending=True):
+        """Row positions in sorted order, missing values last"""
+        if column is None:
+            return np.arange(len(self.df))
+        key = (column, ascending)
+        with self._lock:
+            order = self._orders.get(key)
+        if order is None:
+            values = self.df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Sort by label, not by the order categories were first seen in
+                values = values.cat.reorder_categories(sorted(values.cat.categories, key=str))
+            order = values.reset_index(drop=True).sort_values(
+                ascending=ascending, na_position='last', kind='stable'
+            ).index.to_numpy()
+            with self._lock:
+                order = self._orders.setdefault(key, order)
+        return order
+
+    def _column_matches(self, values, query):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Match against the handful of labels, then test the codes
+            labels = pd.Series(values.cat.categories.astype(str))
+            hits = np.flatnonzero(labels.str.contains(query, case=False, regex=False))
+            return np.isin(values.cat.codes.to_numpy(), hits)
+        return values.astype(str).str.contains(query, case=False, regex=False).to_numpy()
+
+    def mask(self, query):
+        """Boolean row mask for a case-insensitive search over the text columns"""
+        query = (query or '').strip()
+        if not query:
+            return None
+        with self._lock:
+            mask = self._filters.get(query)
+        if mask is None:
+            mask = np.zeros(len(self.df), dtype=bool)
+            for col in self._text_cols:
+                mask |= self._column_matches(self.df[col], query)
+            with self._lock:
+                if query not in self._filters:
+                    while len(self._filters) >= self.max_cached_filters:
+                        self._filters.pop(next(iter(self._filters)))
+                    self._filters[query] = mask
+                mask = self._filters[query]
+        return mask
+
+    def page(self, number, size, sort_by=None, ascending=True, query=None):
+        """Return (page_df, matching_rows) for a 0-based page number"""
+        positions = self.order(sort_by, ascending)
+        mask = self.mask(query)
+        if mask is not None:
+            positions = positions[mask[positions]]
+        start = max(number, 0) * size
+        return self.df.iloc[positions[start:start + size]], len(positions)
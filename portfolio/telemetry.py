@@ -0,0 +1,122 @@
+"""Lightweight timing spans, counters and payload sizes for the dashboard.
+
+A Run collects one script execution: nested spans (a span opened inside
+another is recorded under its path, e.g. ``render:analytics/build:equity_curve``),
+payload sizes of the charts and tables sent to the browser, and any counters
+the caller reads off its caches. Finished runs are folded into a process-wide
+Registry that renders Prometheus text exposition format, and every run can be
+written to a logger as one JSON line per record.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class Run:
+    """Spans, payloads and counters of a single script run"""
+
+    def __init__(self, measure_payloads=False):
+        self.measure_payloads = measure_payloads
+        self.started = time.time()
+        self.spans = []
+        self.payloads = OrderedDict()
+        self.counters = OrderedDict()
+        self._stack = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block; nested spans are recorded under their parent's path"""
+        self._stack.append(name)
+        path = '/'.join(self._stack)
+        record = {'span': path, 'depth': len(self._stack) - 1,
+                  'offset': time.perf_counter() - self._origin, 'seconds': None}
+        self.spans.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._stack.pop()
+
+    def payload(self, name, measure):
+        """Record the byte size returned by measure(), only when payloads are being measured"""
+        if self.measure_payloads:
+            self.payloads[name] = int(measure())
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    def records(self):
+        """Flat records, ready for structured logging"""
+        base = {'run_started': self.started}
+        return (
+            [{**base, 'kind': 'span', **span} for span in self.spans if span['seconds'] is not None]
+            + [{**base, 'kind': 'payload', 'name': name, 'bytes': size} for name, size in self.payloads.items()]
+            + [{**base, 'kind': 'counter', 'name': name, 'value': value} for name, value in self.counters.items()]
+        )
+
+    def json_lines(self):
+        return [json.dumps(record, default=str) for record in self.records()]
+
+    def log(self, target=logger, level=logging.INFO):
+        """Write every record as a JSON line; free when the logger is disabled"""
+        if target.isEnabledFor(level):
+            for line in self.json_lines():
+                target.log(level, line)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Registry:
+    """Process-wide totals of every finished run, rendered as Prometheus text"""
+
+    def __init__(self, prefix='portfolio'):
+        self.prefix = prefix
+        self.runs = 0
+        self._spans = {}
+        self._payloads = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, run):
+        with self._lock:
+            self.runs += 1
+            for span in run.spans:
+                if span['seconds'] is None:
+                    continue
+                count, total = self._spans.get(span['span'], (0, 0.0))
+                self._spans[span['span']] = (count + 1, total + span['seconds'])
+            self._payloads.update(run.payloads)
+            self._counters.update(run.counters)
+
+    def prometheus(self):
+        """Text exposition format: span summaries, last payload sizes and cache counters"""
+        p = self.prefix
+        with self._lock:
+            lines = [
+                f'# HELP {p}_runs_total Dashboard script runs.',
+                f'# TYPE {p}_runs_total counter',
+                f'{p}_runs_total {self.runs}',
+                f'# HELP {p}_span_seconds Time spent in each instrumented stage.',
+                f'# TYPE {p}_span_seconds summary',
+            ]
+            for name, (count, total) in sorted(self._spans.items()):
+                lines.append(f'{p}_span_seconds_count{{span="{_label(name)}"}} {count}')
+                lines.append(f'{p}_span_seconds_sum{{span="{_label(name)}"}} {total:.6f}')
+            lines += [f'# HELP {p}_payload_bytes Size of the last chart or table sent to the browser.',
+                      f'# TYPE {p}_payload_bytes gauge']
+            lines += [f'{p}_payload_bytes{{name="{_label(name)}"}} {size}' for name, size in sorted(self._payloads.items())]
+            lines += [f'# HELP {p}_cache_events_total Cache lookups by cache and outcome.',
+                      f'# TYPE {p}_cache_events_total counter']
+            for name, value in sorted(self._counters.items()):
+                cache, _, outcome = name.rpartition('_')
+                lines.append(f'{p}_cache_events_total{{cache="{_label(cache)}",outcome="{_label(outcome)}"}} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,67 @@
+"""Parallel account loading and the consolidated multi-account frames"""
+import os
+
+import pytest
+
+from portfolio.accounts import Account, AccountLoader, parse_accounts
+from portfolio.engine import (
+    ACCOUNT_COLUMN, account_breakdown, combine_accounts, compute_metrics, process_data, sample_portfolio,
+)
+
+
+def write_account(root, name, open_df, closed_df):
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    open_df.to_csv(os.path.join(path, 'open_positions.csv'), index=False)
+    closed_df.to_csv(os.path.join(path, 'closed_positions.csv'), index=False)
+    return Account(name, None, 'file', path)
+
+
+def split_sample():
+    """The sample portfolio cut into two accounts"""
+    open_df, closed_df = sample_portfolio()
+    return {'Broker A': (open_df.iloc[:3], closed_df.iloc[:2]),
+            'Broker B': (open_df.iloc[3:], closed_df.iloc[2:])}
+
+
+def test_parse_accounts():
+    assert parse_accounts(None)[0].source == 'sheets'
+    accounts = parse_accounts([{'name': 'Main', 'spreadsheet': 'Sheet'}, {'source': 'file', 'path': '/data/ira.xlsx'}])
+    assert accounts == [Account('Main', 'Sheet'), Account('ira.xlsx', None, 'file', '/data/ira.xlsx')]
+
+
+def test_breakdown_matches_the_metrics_of_each_account():
+    frames = {name: process_data(*pair)[:2] for name, pair in split_sample().items()}
+    open_df, closed_df = combine_accounts(frames)
+    assert open_df[ACCOUNT_COLUMN].cat.categories.tolist() == ['Broker A', 'Broker B']
+    assert len(open_df) == sum(len(pair[0]) for pair in frames.values())
+
+    breakdown = account_breakdown(open_df, closed_df)
+    for name, (account_open, account_closed) in frames.items():
+        metrics = compute_metrics(account_open, account_closed)
+        row = breakdown.loc[name]
+        for key in ('open_invested', 'open_pl', 'closed_invested', 'closed_pl', 'possible_pl'):
+            assert row[key] == pytest.approx(metrics[key])
+        assert row['active_positions'] == len(account_open)
+        assert row['completed_trades'] == len(account_closed)
+
+
+def test_loader_reads_every_account_and_reports_failures(tmp_path):
+    root = str(tmp_path)
+    accounts = [write_account(root, name, *pair) for name, pair in split_sample().items()]
+    accounts.append(Account('Missing', None, 'file', os.path.join(root, 'nowhere')))
+    loader = AccountLoader(None, os.path.join(root, 'snapshots'), max_workers=3)
+
+    frames, notices, errors, pending = loader.load(accounts, timeout=30)
+    assert sorted(frames) == ['Broker A', 'Broker B']
+    assert list(errors) == ['Missing'] and not notices and not pending
+    assert len(frames['Broker B'][0]) == 2
+
+    # Unchanged files are served from the snapshot, changed ones are read again
+    assert not loader.update(accounts[0])
+    open_df, closed_df = split_sample()['Broker A']
+    positions = os.path.join(accounts[0].path, 'open_positions.csv')
+    open_df.iloc[:1].to_csv(positions, index=False)
+    os.utime(positions, ns=(0, 0))
+    frames, _, _, _ = loader.load(accounts[:1], timeout=30)
+    assert len(frames['Broker A'][0]) == 1
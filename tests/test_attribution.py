@@ -0,0 +1,90 @@
+"""Brinson-Fachler attribution and the segment valuation it rests on"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio.attribution import (
+    TOTAL, attribution_summary, benchmark_returns, brinson, portfolio_segments,
+)
+from portfolio.engine import process_data, sample_portfolio
+from portfolio.prices import PriceStore
+
+TODAY = pd.Timestamp('2024-06-30')
+
+
+def sector_benchmark(industries, weights=None):
+    """Daily random-walk levels per industry over the sample's holding span"""
+    rng = np.random.default_rng(3)
+    days = pd.bdate_range('2022-12-01', TODAY)
+    frames = []
+    for i, industry in enumerate(industries):
+        frames.append(pd.DataFrame({
+            'Date': days,
+            'Industry': industry,
+            'Close': 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, len(days)))),
+            'Weight': np.nan if weights is None else weights[i],
+        }))
+    return pd.concat(frames, ignore_index=True).sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def test_gains_add_up_to_the_total_pl():
+    open_df, closed_df, _ = process_data(*sample_portfolio())
+    segments, bounds = portfolio_segments(open_df, closed_df, 'M', TODAY)
+    total = open_df['Profit/Loss'].sum() + closed_df['Profit/Loss Booked'].sum()
+    assert segments['Gain'].sum() == pytest.approx(total)
+    assert len(bounds) == segments['Period'].max() + 2
+
+
+def test_gains_follow_stored_closes(tmp_path):
+    open_df = pd.DataFrame({'Stock Name': ['ABC'], 'Industry': ['Tech'], 'Buying Date': ['2024-01-02'],
+                            'Buying Price': [100.0], 'Investment Amount': [1000.0], 'Profit/Loss': [0.0]})
+    store = PriceStore(str(tmp_path))
+    days = pd.bdate_range('2023-12-01', TODAY)
+    close = np.linspace(90, 150, len(days))
+    store.write_frame('ABC', pd.DataFrame({'Date': days, 'Open': close, 'High': close, 'Low': close,
+                                           'Close': close, 'Volume': 1.0}))
+    segments, _ = portfolio_segments(open_df, open_df.iloc[:0], 'M', TODAY, store)
+    # Ten shares from the buying price, worth the last close before today
+    assert segments['Gain'].sum() == pytest.approx(10 * close[days < TODAY][-1] - 1000)
+
+
+@pytest.mark.parametrize('period', ['M', 'Q'])
+def test_effects_add_up_to_the_active_return(period):
+    open_df, closed_df, _ = process_data(*sample_portfolio())
+    # E-commerce is left out of the index, and Energy is in it but not held
+    benchmark = sector_benchmark(['Technology', 'Automotive', 'Energy'], [0.5, 0.3, 0.2])
+    attribution = brinson(open_df, closed_df, benchmark, period, TODAY)
+    assert not attribution.empty
+    effects = attribution[['Allocation', 'Selection', 'Interaction']].sum(axis=1)
+    assert attribution['Active'].to_numpy() == pytest.approx(effects.to_numpy())
+
+    summary = attribution_summary(attribution)
+    active = summary['Portfolio Return'] - summary['Benchmark Return']
+    assert summary['Active'].to_numpy() == pytest.approx(active.to_numpy())
+    weights = attribution.groupby('Period')[['Portfolio Weight', 'Benchmark Weight']].sum()
+    assert weights.to_numpy() == pytest.approx(1)
+
+
+def test_a_single_index_is_all_selection():
+    open_df, closed_df, _ = process_data(*sample_portfolio())
+    benchmark = sector_benchmark([TOTAL])
+    attribution = brinson(open_df, closed_df, benchmark, 'Q', TODAY)
+    assert attribution['Allocation'].to_numpy() == pytest.approx(0)
+    assert attribution['Interaction'].to_numpy() == pytest.approx(0)
+    summary = attribution_summary(attribution)
+    assert summary['Selection'].to_numpy() == pytest.approx(
+        (summary['Portfolio Return'] - summary['Benchmark Return']).to_numpy())
+
+
+@pytest.mark.parametrize('weights, expected', [
+    ([0.5, np.nan, np.nan], [0.5, 0.25, 0.25]),
+    ([50, np.nan, np.nan], [0.5, 0.25, 0.25]),
+    ([np.nan, np.nan, np.nan], [1 / 3, 1 / 3, 1 / 3]),
+    ([2, 1, 1], [0.5, 0.25, 0.25]),
+])
+def test_missing_weights_share_what_the_given_ones_leave(weights, expected):
+    benchmark = sector_benchmark(['A', 'B', 'C'], weights)
+    bounds = pd.date_range('2024-01-01', periods=3, freq='MS')
+    result = benchmark_returns(benchmark, bounds)
+    first = result[result['Period'] == 0].set_index('Industry')['Benchmark Weight']
+    assert first[['A', 'B', 'C']].to_numpy() == pytest.approx(expected)
@@ -0,0 +1,79 @@
+"""Date, industry and ticker selection through the PortfolioIndex"""
+import numpy as np
+import pandas as pd
+
+from portfolio.filters import PortfolioIndex, filter_key, is_filtered
+from portfolio.sources import Filters
+
+NO_FILTERS = Filters((), (), None, None)
+
+
+def frames():
+    open_df = pd.DataFrame({
+        'Stock Name': pd.Categorical(['ABC', 'XYZ', 'ABC', 'DEF', 'XYZ']),
+        'Industry': pd.Categorical(['Tech', 'Energy', 'Tech', None, 'Energy']),
+        'Buying Date': pd.to_datetime(['2024-03-01', '2024-01-01', None, '2024-02-01', '2024-03-01']),
+        'Investment Amount': [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+    closed_df = pd.DataFrame({
+        'Stock Name': ['ABC', 'DEF'],
+        'Industry': ['Tech', 'Tech'],
+        'Selling Date': pd.to_datetime(['2024-01-15', '2024-04-01']),
+        'Profit/Loss Booked': [10.0, 20.0],
+    })
+    return open_df, closed_df
+
+
+def amounts(index, filters):
+    open_df, _ = index.select(filters)
+    return open_df['Investment Amount'].tolist()
+
+
+def test_nothing_filtered_returns_the_frames_themselves():
+    open_df, closed_df = frames()
+    index = PortfolioIndex(open_df, closed_df)
+    assert not is_filtered(NO_FILTERS)
+    assert filter_key(NO_FILTERS) == ''
+    selected = index.select(NO_FILTERS)
+    assert selected[0] is open_df and selected[1] is closed_df
+
+
+def test_date_range_includes_both_ends_and_skips_undated_rows():
+    index = PortfolioIndex(*frames())
+    assert amounts(index, Filters((), (), '2024-02-01', '2024-03-01')) == [1.0, 4.0, 5.0]
+    assert amounts(index, Filters((), (), '2024-02-02', None)) == [1.0, 5.0]
+    assert amounts(index, Filters((), (), None, '2024-01-01')) == [2.0]
+    assert amounts(index, Filters((), (), '2025-01-01', None)) == []
+
+
+def test_date_range_matches_a_plain_comparison():
+    rng = np.random.default_rng(2)
+    days = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 400, 2000), unit='D')
+    df = pd.DataFrame({'Buying Date': days, 'Investment Amount': np.arange(2000.0)})
+    index = PortfolioIndex(df, df.iloc[:0])
+    for _ in range(20):
+        start, end = sorted(pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 400, 2), unit='D'))
+        expected = df.loc[(df['Buying Date'] >= start) & (df['Buying Date'] <= end), 'Investment Amount']
+        assert amounts(index, Filters((), (), start, end)) == expected.tolist()
+
+
+def test_categories_combine_with_the_date_range():
+    index = PortfolioIndex(*frames())
+    assert amounts(index, Filters(['Tech'], (), None, None)) == [1.0, 3.0]
+    assert amounts(index, Filters(['Energy'], ['XYZ'], '2024-02-01', None)) == [5.0]
+    # Values missing from the frame select nothing rather than everything
+    assert amounts(index, Filters(['Retail'], (), None, None)) == []
+    _, closed_df = index.select(Filters(['Tech'], ['DEF'], None, None))
+    assert closed_df['Profit/Loss Booked'].tolist() == [20.0]
+
+
+def test_options_and_bounds_span_both_frames():
+    index = PortfolioIndex(*frames())
+    assert index.options('Stock Name') == ['ABC', 'DEF', 'XYZ']
+    assert [str(day) for day in index.date_bounds()] == ['2024-01-01', '2024-04-01']
+
+
+def test_repeated_selections_are_reused():
+    index = PortfolioIndex(*frames())
+    filters = Filters(['Tech'], (), None, None)
+    assert index.select(filters) is index.select(Filters(['Tech'], [], None, None))
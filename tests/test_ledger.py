@@ -0,0 +1,127 @@
+"""Lot matching and reconciliation in the transaction ledger"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio.ledger import Ledger
+
+TODAY = '2024-06-30'
+
+
+def transactions(rows):
+    return pd.DataFrame(rows, columns=['Date', 'Symbol', 'Side', 'Quantity', 'Price', 'Fees', 'Industry'])
+
+
+# Two lots of ABC at 100 and 130, then a sale that spans both
+TRADES = transactions([
+    ['2024-01-02', 'ABC', 'Buy', 10, 100.0, 0, 'Tech'],
+    ['2024-02-01', 'ABC', 'Buy', 10, 130.0, 0, 'Tech'],
+    ['2024-03-01', 'ABC', 'Sell', 15, 150.0, 0, 'Tech'],
+    ['2024-01-15', 'XYZ', 'Buy', 5, 40.0, 10, 'Energy'],
+])
+PRICES = {'ABC': 160.0, 'XYZ': 50.0}
+
+
+def test_fifo_sells_the_oldest_lot_first():
+    closed = Ledger(TRADES, 'fifo').closed_positions()
+    assert closed['Quantity'].tolist() == [10, 5]
+    assert closed['Investment Amount'].tolist() == [1000, 650]
+    assert closed['Buying Date'].dt.strftime('%Y-%m-%d').tolist() == ['2024-01-02', '2024-02-01']
+    assert closed['Profit/Loss Booked'].sum() == pytest.approx(15 * 150 - 1650)
+
+
+def test_lifo_sells_the_newest_lot_first():
+    ledger = Ledger(TRADES, 'lifo')
+    closed = ledger.closed_positions()
+    assert closed['Quantity'].tolist() == [10, 5]
+    assert closed['Investment Amount'].tolist() == [1300, 500]
+    assert closed['Buying Date'].dt.strftime('%Y-%m-%d').tolist() == ['2024-02-01', '2024-01-02']
+    held = ledger.open_positions(PRICES, TODAY)
+    abc = held[held['Stock Name'] == 'ABC']
+    assert abc['Quantity'].tolist() == [5]
+    assert abc['Buying Price'].tolist() == [100]
+
+
+def test_average_cost_sells_at_the_running_average():
+    ledger = Ledger(TRADES, 'average')
+    closed = ledger.closed_positions()
+    assert closed['Quantity'].tolist() == [15]
+    assert closed['Investment Amount'].tolist() == pytest.approx([15 * 115])
+    held = ledger.open_positions(PRICES, TODAY)
+    abc = held[held['Stock Name'] == 'ABC'].iloc[0]
+    assert abc['Quantity'] == 5
+    assert abc['Buying Price'] == pytest.approx(115)
+    # Dated by the oldest lot a first-in-first-out sale leaves held
+    assert abc['Buying Date'] == pd.Timestamp('2024-02-01')
+
+
+def test_fees_are_part_of_the_cost():
+    held = Ledger(TRADES).open_positions(PRICES, TODAY)
+    xyz = held[held['Stock Name'] == 'XYZ'].iloc[0]
+    assert xyz['Investment Amount'] == 210
+    assert xyz['Profit/Loss'] == pytest.approx(5 * 50 - 210)
+
+
+def test_matching_agrees_with_a_lot_by_lot_replay():
+    rng = np.random.default_rng(1)
+    rows, held = [], {}
+    for day in pd.date_range('2020-01-01', periods=400):
+        symbol = rng.choice(['AAA', 'BBB', 'CCC'])
+        quantity = float(rng.integers(1, 20))
+        side = 'Sell' if held.get(symbol, 0) >= quantity and rng.random() < 0.4 else 'Buy'
+        held[symbol] = held.get(symbol, 0) + (quantity if side == 'Buy' else -quantity)
+        rows.append([day, symbol, side, quantity, float(rng.uniform(10, 100)), 0, None])
+    trades = transactions(rows)
+
+    for method, pick in (('fifo', 0), ('lifo', -1)):
+        lots = {}
+        expected = {}
+        for _, day, symbol, side, quantity, price, _, _ in trades.itertuples():
+            if side == 'Buy':
+                lots.setdefault(symbol, []).append([quantity, price])
+                continue
+            while quantity > 0:
+                lot = lots[symbol][pick]
+                take = min(lot[0], quantity)
+                expected[symbol] = expected.get(symbol, 0) + take * lot[1]
+                lot[0] -= take
+                quantity -= take
+                if lot[0] == 0:
+                    lots[symbol].pop(pick)
+        closed = Ledger(trades, method).closed_positions()
+        cost = closed.groupby('Stock Name', observed=True)['Investment Amount'].sum()
+        assert cost.to_dict() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('method', ['fifo', 'lifo', 'average'])
+def test_reconcile_accounts_for_every_rupee(method):
+    result = Ledger(TRADES, method).reconcile(PRICES)
+    assert result['bought'] == 1000 + 1300 + 210
+    assert result['proceeds'] == 15 * 150
+    assert result['cost_difference'] == pytest.approx(0, abs=1e-9)
+    assert result['realized_difference'] == pytest.approx(0, abs=1e-9)
+    # Realized plus unrealized is the same whichever lots were sold
+    total = result['realized_pl'] + result['unrealized_pl']
+    assert total == pytest.approx(15 * 150 + 5 * 160 + 5 * 50 - 2510)
+
+
+def test_reconcile_compares_with_the_sheet():
+    sheet = pd.DataFrame({'Profit/Loss Booked': [500.0, 100.0]})
+    result = Ledger(TRADES).reconcile(PRICES, sheet)
+    assert result['sheet_realized_pl'] == 600
+    assert result['sheet_difference'] == pytest.approx(600 - 600)
+
+
+def test_overselling_is_rejected():
+    trades = transactions([
+        ['2024-01-02', 'ABC', 'Buy', 10, 100.0, 0, None],
+        ['2024-01-03', 'ABC', 'Sell', 11, 100.0, 0, None],
+    ])
+    with pytest.raises(ValueError, match='exceeds the 10 shares held'):
+        Ledger(trades)
+
+
+def test_negative_quantities_are_sells_without_a_side_column():
+    trades = TRADES.drop(columns='Side')
+    trades.loc[2, 'Quantity'] = -15
+    assert Ledger(trades).closed_positions()['Quantity'].sum() == 15
@@ -0,0 +1,66 @@
+"""Batched XIRR and the per-position and portfolio returns built on it"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio.returns import DAYS_PER_YEAR, portfolio_xirr, position_xirr, xirr
+
+
+def npv(amounts, years, rate):
+    return float(np.sum(np.asarray(amounts) / (1 + rate) ** np.asarray(years)))
+
+
+def test_one_buy_one_sell_is_the_annualized_multiple():
+    rates = xirr([0, 0, 1, 1], [-1000, 1100, -500, 250], [0, 1, 0, 2])
+    assert rates == pytest.approx([0.10, 0.5 ** 0.5 - 1])
+
+
+def test_many_groups_converge_to_a_zero_npv():
+    rng = np.random.default_rng(0)
+    n = 500
+    groups = np.repeat(np.arange(n), 3)
+    amounts = np.column_stack([-rng.uniform(100, 1000, n), -rng.uniform(0, 500, n), rng.uniform(50, 3000, n)]).ravel()
+    years = np.column_stack([np.zeros(n), rng.uniform(0, 1, n), rng.uniform(1, 5, n)]).ravel()
+    rates = xirr(groups, amounts, years)
+    assert not np.isnan(rates).any()
+    for group in range(0, n, 50):
+        flows = groups == group
+        assert npv(amounts[flows], years[flows], rates[group]) == pytest.approx(0, abs=1e-6)
+
+
+def test_groups_newton_cannot_settle_fall_back_to_bisection():
+    # Doubling in a day annualizes to 2 ** 365, far outside Newton's first guesses
+    day = 1 / DAYS_PER_YEAR
+    rate = xirr([0, 0], [-100, 200], [0, day])[0]
+    assert np.log1p(rate) == pytest.approx(365 * np.log(2))
+
+    # Two sign changes: any root the bisection settles on must zero the NPV
+    amounts, years = [-100, 230, -132], [0, 1, 2]
+    rate = xirr([0, 0, 0], amounts, years)[0]
+    assert npv(amounts, years, rate) == pytest.approx(0, abs=1e-6)
+
+
+def test_a_position_written_down_to_zero_is_minus_100_percent():
+    rates = position_xirr([1000, 1000], [0, 0], pd.to_datetime(['2024-01-01', '2024-01-01']),
+                          pd.to_datetime(['2025-01-01', '2024-01-01']))
+    assert rates.tolist() == [-1.0, -1.0]
+
+
+def test_a_same_day_round_trip_has_no_rate():
+    rates = position_xirr([1000], [1100], pd.to_datetime(['2024-03-01']), pd.to_datetime(['2024-03-01']))
+    assert np.isnan(rates[0])
+
+
+def test_groups_without_money_in_and_out_have_no_rate():
+    rates = xirr([0, 1], [500, 0], [1, 1], n_groups=3)
+    assert np.isnan(rates).all()
+
+
+def test_portfolio_xirr_values_open_positions_today():
+    open_df = pd.DataFrame({'Investment Amount': [1000.0], 'Profit/Loss': [100.0],
+                            'Buying Date': pd.to_datetime(['2024-01-01'])})
+    closed_df = pd.DataFrame({'Investment Amount': [1000.0], 'Selling Value': [1100.0],
+                              'Buying Date': pd.to_datetime(['2024-01-01']),
+                              'Selling Date': pd.to_datetime(['2024-12-31'])})
+    rate = portfolio_xirr(open_df, closed_df, today='2024-12-31')
+    assert rate == pytest.approx(1.1 ** (DAYS_PER_YEAR / 365) - 1)
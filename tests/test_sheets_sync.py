@@ -0,0 +1,137 @@
+"""IncrementalSheetSync against a local fake of gspread's values_batch_get"""
+import re
+
+from gspread.utils import a1_to_rowcol
+
+from portfolio.sheets_sync import IncrementalSheetSync
+
+HEADER = ['Stock Name', 'Industry', 'Investment Amount']
+SHEET = 'Open Positions'
+
+
+class FakeSpreadsheet:
+    """Worksheets as lists of rows, answering A1 ranges the way the Sheets API does"""
+
+    def __init__(self, worksheets):
+        self.worksheets = worksheets
+        self.requests = []
+
+    def values_batch_get(self, ranges):
+        self.requests.append(list(ranges))
+        return {'valueRanges': [{'values': self._values(name)} for name in ranges]}
+
+    def _values(self, range_name):
+        title, _, cells = range_name.partition('!')
+        rows = self.worksheets[title.strip("'")]
+        first, last, columns = 1, len(rows), slice(None)
+        match = re.fullmatch(r'([A-Z]*)(\d*):([A-Z]*)(\d*)', cells)
+        if match:
+            start_col, start_row, end_col, end_row = match.groups()
+            first = int(start_row or 1)
+            last = int(end_row) if end_row else len(rows)
+            if start_col:
+                columns = slice(a1_to_rowcol(f'{start_col}1')[1] - 1, a1_to_rowcol(f'{end_col}1')[1])
+        values = [list(row[columns]) for row in rows[first - 1:last]]
+        # Like the API, trailing blank cells and rows are left out
+        values = [row[:max([i + 1 for i, cell in enumerate(row) if cell != ''], default=0)] for row in values]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+
+def positions(count):
+    return [HEADER] + [[f'S{i}', 'Tech', str(i * 100)] for i in range(count)]
+
+
+def synced(rows, **options):
+    spreadsheet = FakeSpreadsheet({SHEET: rows})
+    sync = IncrementalSheetSync(spreadsheet, worksheets=(SHEET,), tail_rows=20, **options)
+    sync.sync()
+    return spreadsheet, sync
+
+
+def expected(rows):
+    return [row[0] for row in rows[1:]]
+
+
+def test_append_only_fetches_the_tail():
+    rows = positions(200)
+    spreadsheet, sync = synced(rows)
+    rows.append(['NEW', 'Energy', '500'])
+
+    frame = sync.sync()[SHEET]
+
+    assert frame['Stock Name'].tolist() == expected(rows)
+    assert frame['Investment Amount'].iloc[-1] == 500
+    assert len(spreadsheet.requests) == 2
+    assert spreadsheet.requests[-1][-1].endswith('!A182:C')
+
+
+def test_tail_edit_is_merged():
+    rows = positions(200)
+    spreadsheet, sync = synced(rows)
+    rows[195][2] = '123'
+
+    frame = sync.sync()[SHEET]
+
+    assert frame['Investment Amount'].iloc[194] == 123
+    assert len(spreadsheet.requests) == 2
+
+
+def test_delete_above_the_window_plus_append_reads_everything():
+    rows = positions(200)
+    spreadsheet, sync = synced(rows)
+    # A sale deletes an old row and a buy appends one, so the row count is unchanged
+    del rows[11]
+    rows.append(['NEW', 'Energy', '500'])
+
+    frame = sync.sync()[SHEET]
+
+    assert frame['Stock Name'].tolist() == expected(rows)
+    assert 'S10' not in set(frame['Stock Name']) and 'S150' in set(frame['Stock Name'])
+    assert spreadsheet.requests[-1] == [f"'{SHEET}'"]
+
+
+def test_rows_removed_from_the_tail_read_everything():
+    rows = positions(200)
+    spreadsheet, sync = synced(rows)
+    del rows[-3:]
+
+    frame = sync.sync()[SHEET]
+
+    assert frame['Stock Name'].tolist() == expected(rows)
+    assert spreadsheet.requests[-1] == [f"'{SHEET}'"]
+
+
+def test_header_change_reads_everything():
+    rows = positions(50)
+    spreadsheet, sync = synced(rows)
+    rows[0] = HEADER + ['Notes']
+    rows[5].append('watch')
+
+    frame = sync.sync()[SHEET]
+
+    assert list(frame.columns) == HEADER + ['Notes']
+    assert frame['Notes'].iloc[4] == 'watch'
+    assert spreadsheet.requests[-1] == [f"'{SHEET}'"]
+
+
+def test_every_nth_sync_reads_everything():
+    rows = positions(50)
+    spreadsheet, sync = synced(rows, full_every=2)
+    for _ in range(3):
+        sync.sync()
+
+    full = [f"'{SHEET}'"]
+    assert [request == full for request in spreadsheet.requests] == [True, False, False, True]
+
+
+def test_unchanged_revision_skips_the_request():
+    rows = positions(10)
+    spreadsheet = FakeSpreadsheet({SHEET: rows})
+    spreadsheet.get_lastUpdateTime = lambda: '2024-01-01T00:00:00Z'
+    sync = IncrementalSheetSync(spreadsheet, worksheets=(SHEET,))
+    sync.sync()
+
+    assert sync.sync()[SHEET]['Stock Name'].tolist() == expected(rows)
+    assert len(spreadsheet.requests) == 1
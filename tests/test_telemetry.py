@@ -0,0 +1,57 @@
+"""Timing spans, payload sizes and their Prometheus exposition"""
+import json
+import logging
+
+from portfolio.telemetry import Registry, Run
+
+
+def test_nested_spans_are_recorded_under_their_parent():
+    run = Run()
+    with run.span('load'):
+        pass
+    with run.span('render:analytics'):
+        with run.span('build:equity_curve'):
+            pass
+    assert [(span['span'], span['depth']) for span in run.spans] == [
+        ('load', 0), ('render:analytics', 0), ('render:analytics/build:equity_curve', 1)]
+    outer, inner = run.spans[1:]
+    assert outer['seconds'] >= inner['seconds'] >= 0
+
+
+def test_payloads_are_only_measured_on_request():
+    sizes = []
+    Run().payload('chart', lambda: sizes.append(1) or 10)
+    assert not sizes
+    run = Run(measure_payloads=True)
+    run.payload('chart', lambda: 10)
+    assert run.payloads == {'chart': 10}
+
+
+def test_records_log_as_json_lines(caplog):
+    run = Run(measure_payloads=True)
+    with run.span('load'):
+        run.payload('table', lambda: 5)
+    run.count('frames_hit', 3)
+    target = logging.getLogger('test_telemetry')
+    run.log(target)
+    assert not caplog.records
+    with caplog.at_level(logging.INFO, logger='test_telemetry'):
+        run.log(target)
+    kinds = [json.loads(record.getMessage())['kind'] for record in caplog.records]
+    assert kinds == ['span', 'payload', 'counter']
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    for _ in range(2):
+        run = Run(measure_payloads=True)
+        with run.span('render:"overview"'):
+            pass
+        run.payload('chart', lambda: 42)
+        run.count('frames_hit', 7)
+        registry.record(run)
+    text = registry.prometheus()
+    assert 'portfolio_runs_total 2\n' in text
+    assert 'portfolio_span_seconds_count{span="render:\\"overview\\""} 2\n' in text
+    assert 'portfolio_payload_bytes{name="chart"} 42\n' in text
+    assert 'portfolio_cache_events_total{cache="frames",outcome="hit"} 7\n' in text